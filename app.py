@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, send_from_directory, request
+from flask import Flask, jsonify, send_from_directory, request, Response
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
@@ -21,7 +21,8 @@ from routes.chatbot_routes import chatbot_bp
 from routes.fcm_routes import fcm_bp
 from routes.admin_routes import admin_bp
 
-from utils.database import init_db
+from utils.database import init_db, ping_db
+from utils import ml_model
 
 app = Flask(__name__)
 
@@ -87,6 +88,16 @@ def add_cors_headers(response):
 # ================= DB INIT =================
 init_db()
 
+# Officers created before workload counters existed are left out of
+# auto-assignment until they have one
+from utils import database
+from utils.assignment_engine import ensure_officer_loads
+if database.db is not None:
+    try:
+        ensure_officer_loads(database.db)
+    except Exception as e:
+        print(f"⚠️ Officer workload backfill failed: {e}")
+
 # ================= REGISTER BLUEPRINTS =================
 app.register_blueprint(auth_bp, url_prefix="/api/auth")
 app.register_blueprint(complaint_bp, url_prefix="/api/complaints")
@@ -129,6 +140,38 @@ def index():
 def health():
     return jsonify({"status": "healthy"})
 
+# ================= READINESS =================
+# Load balancer probe: 200 only once the model, DB and outbound clients
+# are initialised in this worker (see gunicorn.conf.py for warmup).
+@app.route("/ready")
+def ready():
+    from utils.firebase_service import firebase_service
+    from utils import image_analyzer
+    from utils.scoring_engine import get_scoring_engine
+
+    checks = {
+        "database"  : ping_db(),
+        "firebase"  : firebase_service.is_ready(),
+        "cloudinary": bool(cloudinary.config().cloud_name),
+    }
+    # The model and Gemini only gate readiness when a scoring stage uses them
+    stages = {stage.name for stage in get_scoring_engine().stages}
+    if "ml_text" in stages:
+        checks["model"] = ml_model.is_ready()
+    if "gemini_image" in stages:
+        checks["gemini"] = image_analyzer.is_configured()
+    is_ready = all(checks.values())
+    return jsonify({
+        "status": "ready" if is_ready else "not_ready",
+        "checks": checks,
+    }), 200 if is_ready else 503
+
+# ================= METRICS =================
+@app.route("/metrics")
+def metrics_endpoint():
+    from utils.metrics import metrics
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
 # ================= ERRORS =================
 @app.errorhandler(404)
 def not_found(error):
@@ -144,6 +187,10 @@ def file_too_large(error):
 
 # ================= RUN =================
 if __name__ == "__main__":
+    # Under gunicorn this runs in post_fork (gunicorn.conf.py), never in the master
+    from utils.complaint_pipeline import start_recovery_sweeper
+    start_recovery_sweeper()
+
     port = int(os.environ.get("PORT", 5000))
     debug_mode = os.getenv("FLASK_DEBUG", "False") == "True"
 
@@ -0,0 +1,70 @@
+"""
+Near-duplicate lookup cost and recall of utils.duplicate_detector: index
+N synthetic complaints spread over a city, then time fingerprinting and
+lookup for reworded reports of indexed complaints (should match) and for
+reports of a different issue at the same spot (should not).
+
+Run from the repo root:
+    python -m benchmarks.bench_duplicates [N]
+"""
+
+import random
+import sys
+import time
+
+from utils.duplicate_detector import DuplicateDetector, Fingerprint
+from benchmarks.bench_urgency_matcher import DEFAULT_DATA, load_texts
+
+CITY = (12.85, 77.45, 0.3)      # lat, lon, span in degrees
+
+
+def reword(text, rng):
+    words = text.split()
+    i = rng.randrange(len(words))
+    return " ".join(words[:i] + ["please"] + words[i:])
+
+
+def main():
+    n     = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng   = random.Random(5)
+    texts = load_texts(DEFAULT_DATA)
+
+    detector = DuplicateDetector(max_items=n)
+    points   = []
+    for i in range(n):
+        base = rng.randrange(len(texts))
+        text = f"{texts[base]} near house {i}"
+        lat  = CITY[0] + rng.random() * CITY[2]
+        lon  = CITY[1] + rng.random() * CITY[2]
+        detector.add(str(i), Fingerprint.of(text, lat, lon), "roads")
+        points.append((base, text, lat, lon))
+
+    hits, false_hits, fp_ms, find_ms = 0, 0, [], []
+    for i in rng.sample(range(n), 500):
+        base, text, lat, lon = points[i]
+        other = rng.choice([t for j, t in enumerate(texts) if j != base])
+        for query, expect in ((reword(text, rng), str(i)), (other, None)):
+            start = time.perf_counter()
+            fp    = Fingerprint.of(query, lat + 0.0003, lon - 0.0003)
+            fp_ms.append((time.perf_counter() - start) * 1000)
+            start   = time.perf_counter()
+            matches = detector.find(fp, "roads")
+            find_ms.append((time.perf_counter() - start) * 1000)
+            ids = [m["complaint_id"] for m in matches]
+            if expect is not None:
+                hits += expect in ids
+            else:
+                # Only a neighbour reporting a different issue is a false match
+                false_hits += any(texts[points[int(c)][0]] != other for c in ids)
+
+    fp_ms.sort()
+    find_ms.sort()
+    print(f"\n{n} indexed complaints, 500 reworded + 500 unrelated queries")
+    print(f"  recall (reworded found)  : {hits / 500:.1%}")
+    print(f"  unrelated flagged        : {false_hits / 500:.1%}")
+    print(f"  fingerprint p50 / p99    : {fp_ms[len(fp_ms) // 2]:.3f} / {fp_ms[int(len(fp_ms) * 0.99)]:.3f} ms")
+    print(f"  lookup p50 / p99         : {find_ms[len(find_ms) // 2]:.3f} / {find_ms[int(len(find_ms) * 0.99)]:.3f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Local image severity analysis: the original full decode + thumbnail +
+separate reductions versus draft-mode decoding with one statistics pass,
+one image at a time and through the batch API. Reports how often the two
+paths give a different boost (draft decoding changes pixels slightly).
+
+Run from the repo root over a folder of sample images:
+    python -m benchmarks.bench_local_image path/to/images [category]
+Without a folder, synthetic 3000x2000 JPEGs are generated in a temp dir.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.urgency_engine import (
+    analyze_images_urgency_local,
+    _decode_for_analysis,
+    _image_stats,
+    _local_boost,
+)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+# Original implementation, kept here as the baseline
+def legacy_local_boost(path, category):
+    img = Image.open(path).convert('RGB')
+    img.thumbnail((400, 400))
+    img_array = np.array(img)
+
+    avg_brightness = np.mean(img_array)
+    darkness_score = (255 - avg_brightness) / 255
+    gray = np.mean(img_array, axis=2)
+    contrast = np.std(gray) / 128
+    color_std = np.std(img_array, axis=(0, 1)).mean() / 128
+    dark_pixels = np.sum(np.mean(img_array, axis=2) < 80) / (img_array.shape[0] * img_array.shape[1])
+
+    return _local_boost({
+        "darkness": darkness_score, "contrast": contrast,
+        "color_std": color_std, "dark_pixels": dark_pixels,
+    }, category)
+
+
+def synthetic_images(directory, count=24, size=(3000, 2000)):
+    rng   = random.Random(3)
+    paths = []
+    for i in range(count):
+        base  = np.full((size[1] // 8, size[0] // 8, 3), rng.randint(20, 220), dtype=np.uint8)
+        noise = np.random.default_rng(i).integers(0, rng.randint(10, 120), base.shape, dtype=np.uint8)
+        img   = Image.fromarray(base + noise).resize(size)
+        path  = os.path.join(directory, f"sample_{i:02d}.jpg")
+        img.save(path, quality=90)
+        paths.append(path)
+    return paths
+
+
+def _per_image_ms(fn, paths, rounds=3):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(paths)
+    return (time.perf_counter() - start) / (rounds * len(paths)) * 1000
+
+
+def main():
+    category = sys.argv[2] if len(sys.argv) > 2 else "roads"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 1:
+            folder = sys.argv[1]
+            paths  = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            paths = synthetic_images(tmp)
+        if not paths:
+            sys.exit("No images found")
+
+        legacy = [legacy_local_boost(p, category) for p in paths]
+        new    = [_local_boost(_image_stats(_decode_for_analysis(p)), category) for p in paths]
+        batch  = analyze_images_urgency_local(paths, category)
+        assert new == batch, "Batch API differs from single-image path"
+        differ = sum(a != b for a, b in zip(legacy, new))
+
+        before = _per_image_ms(lambda ps: [legacy_local_boost(p, category) for p in ps], paths)
+        single = _per_image_ms(lambda ps: analyze_images_urgency_local(ps, category, max_workers=1), paths)
+        pooled = _per_image_ms(lambda ps: analyze_images_urgency_local(ps, category), paths)
+
+    print(f"\n{len(paths)} images, category '{category}'")
+    print(f"  boost differs from legacy : {differ}/{len(paths)}")
+    print(f"  legacy                    : {before:>8.2f} ms/image")
+    print(f"  draft + one pass          : {single:>8.2f} ms/image  ({before / single:.2f}x)")
+    print(f"  batch API (thread pool)   : {pooled:>8.2f} ms/image  ({before / pooled:.2f}x)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Throughput benchmark: single-item predict vs the micro-batcher.
+
+Run from the repo root:
+    python -m benchmarks.bench_microbatch --requests 2000 --concurrency 32
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import ml_model
+from utils.inference_batcher import MicroBatcher
+
+SAMPLE_TEXTS = [
+    "There is a large pothole on the main road causing accidents",
+    "Sewage water overflowing near the market for three days",
+    "Broken streetlight",
+    "Garbage not collected in our street for a week, very bad smell",
+    "Exposed live wire hanging from the electric pole near the school",
+    "Water pipe burst and flooding the whole street",
+    "pothole",
+    "Drain blocked after rain, water entering houses",
+]
+
+
+def _run(label, fn, n_requests, concurrency):
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(n_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fn, texts))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {n_requests / elapsed:>10.1f} req/s   ({elapsed * 1000:.1f} ms total)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=ml_model.BATCH_MAX_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=ml_model.BATCH_MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    # Warm up both paths so the first forward pass doesn't skew results
+    ml_model._predict_single(SAMPLE_TEXTS[0])
+    ml_model._score_cleaned([ml_model.clean_text(t) for t in SAMPLE_TEXTS])
+
+    print(f"\n{args.requests} requests, concurrency={args.concurrency}\n")
+
+    single = _run("single-item predict", ml_model._predict_single, args.requests, args.concurrency)
+
+    batcher = MicroBatcher(
+        lambda texts: ml_model._score_cleaned([ml_model.clean_text(t) for t in texts]),
+        max_batch_size=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+    )
+    batched = _run(
+        f"micro-batched ({args.max_batch}/{args.max_wait_ms}ms)",
+        batcher.submit, args.requests, args.concurrency
+    )
+
+    stats = batcher.stats()
+    print(f"\nAverage batch size: {stats['avg_batch_size']:.1f} over {stats['batches_run']} batches")
+    print(f"Speed-up: {single / batched:.2f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Speed and agreement of the three urgency scorers on a labelled corpus:
+priority_engine.calculate_urgency (regex rules), urgency_engine.calculate_urgency
+(keyword analyzer, text only) and ml_model (UrgencyModel, uncached path).
+
+For each scorer: throughput, per-item p50/p99 latency, peak Python memory
+during a pass (tracemalloc, so native tensor memory is not counted), and
+MAE / Pearson / Spearman against the corpus labels. Then pairwise Pearson
+and Spearman correlation and mean absolute difference between scorers.
+A scorer whose dependencies are missing (e.g. torch) is skipped.
+
+Run from the repo root:
+    python -m benchmarks.bench_scorers [--data corpus.jsonl] [--rounds 20] [--json report.json]
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "complaints_heldout.jsonl")
+
+
+def load_corpus(path):
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    # The app sends title-case categories ("Roads", "Water Supply")
+    return [(r["text"], r.get("category", "").title(), r.get("urgency")) for r in rows]
+
+
+def load_scorers():
+    """name → fn(text, category) -> int, for every scorer that can be imported."""
+    scorers = {}
+
+    from utils import priority_engine
+    scorers["priority_engine"] = lambda text, category: priority_engine.calculate_urgency(category, text)
+
+    from utils import urgency_engine
+    scorers["urgency_engine"] = lambda text, category: urgency_engine.calculate_urgency(text, category)
+
+    try:
+        from utils import ml_model
+        ml_model.warmup()
+        # Uncached single-text path: the score cache would otherwise time dict lookups
+        scorers["ml_model"] = lambda text, category: ml_model._predict_single(text)
+    except (ImportError, FileNotFoundError) as e:
+        print(f"⚠️  Skipping ml_model: {e}")
+
+    return scorers
+
+
+def _ranks(values):
+    order = np.argsort(values, kind="mergesort")
+    ranks = np.empty(len(values), dtype=np.float64)
+    sorted_vals = values[order]
+    i = 0
+    while i < len(values):
+        j = i
+        while j + 1 < len(values) and sorted_vals[j + 1] == sorted_vals[i]:
+            j += 1
+        ranks[order[i:j + 1]] = (i + j) / 2
+        i = j + 1
+    return ranks
+
+
+def pearson(a, b):
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    if a.std() == 0 or b.std() == 0:
+        return None
+    return float(np.corrcoef(a, b)[0, 1])
+
+
+def spearman(a, b):
+    return pearson(_ranks(np.asarray(a, dtype=np.float64)), _ranks(np.asarray(b, dtype=np.float64)))
+
+
+def measure(fn, corpus, rounds):
+    # calculate_urgency prints its reasoning; discard it while timing
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        tracemalloc.start()
+        scores = [fn(text, category) for text, category, _ in corpus]
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        start   = time.perf_counter()
+        for _ in range(rounds):
+            for text, category, _ in corpus:
+                t0 = time.perf_counter()
+                fn(text, category)
+                timings.append((time.perf_counter() - t0) * 1e6)
+        wall = time.perf_counter() - start
+
+    timings = np.array(timings)
+    return scores, {
+        "throughput_per_s": len(timings) / wall,
+        "latency_us": {
+            "mean": float(timings.mean()),
+            "p50" : float(np.percentile(timings, 50)),
+            "p99" : float(np.percentile(timings, 99)),
+        },
+        "peak_memory_bytes": peak,
+    }
+
+
+def label_agreement(scores, labels):
+    pairs = [(s, l) for s, l in zip(scores, labels) if l is not None]
+    if not pairs:
+        return None
+    s, l = zip(*pairs)
+    return {
+        "mae"     : float(np.abs(np.array(s) - np.array(l)).mean()),
+        "pearson" : pearson(s, l),
+        "spearman": spearman(s, l),
+    }
+
+
+def _fmt(value):
+    return "  n/a" if value is None else f"{value:+.2f}"
+
+
+def print_report(report):
+    print(f"\n{report['items']} texts, {report['rounds']} rounds")
+    print(f"\n{'scorer':<16}{'items/s':>10}{'p50':>10}{'p99':>10}{'peak mem':>11}"
+          f"{'MAE':>7}{'r':>7}{'rho':>7}")
+    for name, r in report["scorers"].items():
+        lat, lab = r["latency_us"], r["labels"] or {}
+        print(f"{name:<16}{r['throughput_per_s']:>10.0f}{lat['p50']:>8.1f}us{lat['p99']:>8.1f}us"
+              f"{r['peak_memory_bytes'] / 1024:>9.1f}KB"
+              f"{lab.get('mae', float('nan')):>7.1f}{_fmt(lab.get('pearson')):>7}{_fmt(lab.get('spearman')):>7}")
+
+    print(f"\n{'pair':<34}{'r':>7}{'rho':>7}{'mean |Δ|':>10}")
+    for p in report["pairs"]:
+        print(f"{p['a'] + ' / ' + p['b']:<34}{_fmt(p['pearson']):>7}{_fmt(p['spearman']):>7}"
+              f"{p['mean_abs_diff']:>10.1f}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA, help="JSONL with text, category and urgency label")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    corpus  = load_corpus(args.data)
+    labels  = [label for _, _, label in corpus]
+    scorers = load_scorers()
+
+    report = {"items": len(corpus), "rounds": args.rounds, "scorers": {}, "pairs": []}
+    scores = {}
+    for name, fn in scorers.items():
+        scores[name], stats = measure(fn, corpus, args.rounds)
+        stats["labels"] = label_agreement(scores[name], labels)
+        report["scorers"][name] = stats
+
+    for a, b in itertools.combinations(scores, 2):
+        report["pairs"].append({
+            "a"            : a,
+            "b"            : b,
+            "pearson"      : pearson(scores[a], scores[b]),
+            "spearman"     : spearman(scores[a], scores[b]),
+            "mean_abs_diff": float(np.abs(np.array(scores[a]) - np.array(scores[b])).mean()),
+        })
+
+    print_report(report)
+
+    if args.json:
+        report["scores"] = scores
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.json}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Stemming fallback in UrgencyAnalyzer.match_keywords: stemming every n-gram
+that misses the keyword table (previous behaviour) versus one lookup in the
+pre-stemmed keyword index. Outputs are checked for equality on the
+held-out complaints and on longer descriptions built from them, then both
+are timed per complaint.
+
+Run from the repo root:
+    python -m benchmarks.bench_stem_index
+"""
+
+import random
+import time
+
+from utils.keyword_rules import keyword_rules, stem_word
+from utils.urgency_engine import urgency_analyzer
+from benchmarks.bench_urgency_matcher import DEFAULT_DATA, EXTRA_TEXTS, load_texts, long_description
+
+
+def stem_on_miss(description):
+    """Previous implementation, kept here as the baseline."""
+    rules      = keyword_rules.get()
+    keyword_db = rules.urgency_keywords
+
+    def _stemmed_keyword(token):
+        stemmed = stem_word(token, rules.stemming_rules)
+        if stemmed != token and stemmed in keyword_db:
+            return stemmed
+        return None
+
+    matches = rules.matcher.find_all(urgency_analyzer.split_words(description),
+                                     fallback=_stemmed_keyword, accept=keyword_db.__contains__)
+    return [
+        {"word": token if exact else f"{token} (→ {keyword})",
+         "severity": keyword_db[keyword]["severity"], "boost": keyword_db[keyword]["boost"]}
+        for _, _, token, keyword, exact in matches
+    ]
+
+
+def _per_call_us(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+def main():
+    rng   = random.Random(11)
+    texts = load_texts(DEFAULT_DATA) + EXTRA_TEXTS
+
+    print(f"\n{'corpus':<18}  {'stem on miss':>12}  {'stem index':>11}  speed-up")
+    for label, words in (("held-out", None), ("50 words", 50), ("500 words", 500)):
+        batch = texts if words is None else [long_description(texts, words, rng) for _ in range(30)]
+        for text in batch:
+            assert stem_on_miss(text) == urgency_analyzer.match_keywords(text), text
+
+        rounds = 200 if words is None else max(1, 4000 // words)
+        before = _per_call_us(stem_on_miss, batch, rounds)
+        after  = _per_call_us(urgency_analyzer.match_keywords, batch, rounds)
+        print(f"{label:<18}  {before:>10.1f}us  {after:>9.1f}us  {before / after:>6.2f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
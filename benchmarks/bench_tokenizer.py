@@ -0,0 +1,80 @@
+"""
+Per-text cost of cleaning + encoding: the original clean_text/encode_text
+versus utils.tokenizer.Tokenizer, at several batch sizes.
+
+Run from the repo root:
+    python -m benchmarks.bench_tokenizer
+"""
+
+import pickle
+import re
+import time
+
+import numpy as np
+
+from utils.ml_model import VOCAB_PATH, CONFIG_PATH
+from utils.tokenizer import Tokenizer
+
+SAMPLE_TEXTS = [
+    "There is a large pothole on the main road causing accidents!!",
+    "Sewage water overflowing near the market for 3 days",
+    "Broken streetlight",
+    "Garbage not collected for a week, very bad smell everywhere in the colony",
+]
+
+with open(VOCAB_PATH, 'rb') as f:
+    vocab = pickle.load(f)
+with open(CONFIG_PATH, 'rb') as f:
+    MAX_LEN = pickle.load(f)['max_len']
+
+
+# Original implementation, kept here as the baseline
+def legacy_clean_text(text):
+    text = str(text).lower()
+    text = re.sub(r'[^a-z\s]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_encode_text(text):
+    tokens = text.split()
+    encoded = [vocab.get(w, vocab["<UNK>"]) for w in tokens]
+    if len(encoded) < MAX_LEN:
+        encoded += [vocab["<PAD>"]] * (MAX_LEN - len(encoded))
+    else:
+        encoded = encoded[:MAX_LEN]
+    return encoded
+
+
+def _per_text_us(fn, batch, total_texts=50000):
+    rounds = max(1, total_texts // len(batch))
+    start  = time.perf_counter()
+    for _ in range(rounds):
+        fn(batch)
+    return (time.perf_counter() - start) / (rounds * len(batch)) * 1e6
+
+
+def main():
+    tokenizer = Tokenizer(vocab, MAX_LEN)
+
+    def legacy(batch):
+        return np.array([legacy_encode_text(legacy_clean_text(t)) for t in batch])
+
+    def vectorised(batch):
+        return tokenizer.encode_batch([tokenizer.clean(t) for t in batch])
+
+    # Same output before timing anything
+    check = SAMPLE_TEXTS * 8
+    assert (legacy(check) == vectorised(check)).all(), "Tokenizer output differs from legacy encoder"
+
+    print(f"\n{'batch':>6}  {'legacy':>10}  {'tokenizer':>10}  speed-up")
+    for batch_size in (1, 8, 32, 256, 1024):
+        batch = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] for i in range(batch_size)]
+        before = _per_text_us(legacy, batch)
+        after  = _per_text_us(vectorised, batch)
+        print(f"{batch_size:>6}  {before:>8.2f}us  {after:>8.2f}us  {before / after:>6.2f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Keyword matching in utils.urgency_engine: the original per-call analyzer
+(new UrgencyAnalyzer + every unigram/bigram/trigram string looked up) versus
+the shared analyzer's word-level Aho-Corasick pass, on descriptions of
+increasing length. Outputs are checked for equality before timing.
+
+Run from the repo root:
+    python -m benchmarks.bench_urgency_matcher
+"""
+
+import json
+import os
+import random
+import time
+
+from utils.urgency_engine import UrgencyAnalyzer, urgency_analyzer
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "complaints_heldout.jsonl")
+
+# Inflected / multi-word forms that exercise the stemming fallback
+EXTRA_TEXTS = [
+    "Gas leaks near the school, pipe bursts every night and sewage overflows!",
+    "Live wires hanging, electric shocks reported, many people hurt since weeks",
+    "Dangerous cracked footpath; potholes on the main roads, dirty waters everywhere",
+]
+
+
+def legacy_analyze_text(description, category):
+    """Original implementation, kept here as the baseline."""
+    analyzer = UrgencyAnalyzer()
+    tokens   = analyzer.tokenize(description)
+
+    matched_keywords = []
+    for token in tokens:
+        if token in analyzer.keyword_db:
+            data = analyzer.keyword_db[token]
+            matched_keywords.append({"word": token, "severity": data["severity"], "boost": data["boost"]})
+            continue
+        stemmed = analyzer.stem_word(token)
+        if stemmed != token and stemmed in analyzer.keyword_db:
+            data = analyzer.keyword_db[stemmed]
+            matched_keywords.append({"word": f"{token} (→ {stemmed})", "severity": data["severity"], "boost": data["boost"]})
+    return matched_keywords
+
+
+def load_texts(path):
+    with open(path) as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+def long_description(texts, words, rng):
+    out = []
+    while len(out) < words:
+        out.extend(rng.choice(texts).split())
+    return " ".join(out[:words])
+
+
+def _per_call_us(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text, "roads")
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1e6
+
+
+def main():
+    rng   = random.Random(7)
+    texts = load_texts(DEFAULT_DATA) + EXTRA_TEXTS
+
+    for text in texts:
+        assert legacy_analyze_text(text, "roads") == urgency_analyzer.match_keywords(text), text
+
+    print(f"\n{'words':>6}  {'legacy':>11}  {'automaton':>11}  speed-up")
+    for words in (10, 50, 200, 1000, 5000):
+        batch = [long_description(texts, words, rng) for _ in range(20)]
+        for text in batch:
+            assert legacy_analyze_text(text, "roads") == urgency_analyzer.match_keywords(text)
+
+        rounds = max(1, 2000 // words)
+        before = _per_call_us(legacy_analyze_text, batch, rounds)
+        after  = _per_call_us(lambda t, c: urgency_analyzer.match_keywords(t), batch, rounds)
+        print(f"{words:>6}  {before:>9.1f}us  {after:>9.1f}us  {before / after:>6.2f}x")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare the fp32 urgency model with its int8 / fp16-embedding variant on a
+held-out set of complaint texts: per-item latency, weight memory and score
+drift, for each available backend (torch, numpy).
+
+Run from the repo root:
+    python -m benchmarks.eval_quantized [--backend torch|numpy|all] [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+
+from utils.ml_model import load_backend, VOCAB_PATH, CONFIG_PATH
+from utils.tokenizer import Tokenizer
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "complaints_heldout.jsonl")
+
+
+def load_texts(path):
+    with open(path) as f:
+        return [json.loads(line)["text"] for line in f if line.strip()]
+
+
+def per_item_latency_us(backend, encoded, rounds):
+    timings = []
+    for _ in range(rounds):
+        for i in range(len(encoded)):
+            start = time.perf_counter()
+            backend.predict(encoded[i:i + 1])
+            timings.append((time.perf_counter() - start) * 1e6)
+    timings = np.array(timings)
+    return {
+        "mean": float(timings.mean()),
+        "p50" : float(np.percentile(timings, 50)),
+        "p99" : float(np.percentile(timings, 99)),
+    }
+
+
+def clamp(raw):
+    return np.clip(np.round(raw), 0, 100)
+
+
+def evaluate(name, vocab_size, encoded, rounds):
+    fp32 = load_backend(name, vocab_size, "fp32")
+    int8 = load_backend(name, vocab_size, "int8")
+
+    raw_fp32 = np.array(fp32.predict(encoded))
+    raw_int8 = np.array(int8.predict(encoded))
+    score_diff = np.abs(clamp(raw_fp32) - clamp(raw_int8))
+
+    return {
+        "backend": name,
+        "items"  : len(encoded),
+        "latency_us": {
+            "fp32": per_item_latency_us(fp32, encoded, rounds),
+            "int8": per_item_latency_us(int8, encoded, rounds),
+        },
+        "weight_bytes": {
+            "fp32": fp32.weight_bytes(),
+            "int8": int8.weight_bytes(),
+        },
+        "drift": {
+            "raw_mean_abs"  : float(np.abs(raw_fp32 - raw_int8).mean()),
+            "raw_max_abs"   : float(np.abs(raw_fp32 - raw_int8).max()),
+            "score_mean_abs": float(score_diff.mean()),
+            "score_max_abs" : float(score_diff.max()),
+            "scores_changed": int((score_diff > 0).sum()),
+        },
+    }
+
+
+def print_report(r):
+    lat, mem, drift = r["latency_us"], r["weight_bytes"], r["drift"]
+    print(f"\n── {r['backend']} backend ({r['items']} held-out texts) ──")
+    print(f"   {'':<14}{'fp32':>12}{'int8':>12}")
+    for key in ("mean", "p50", "p99"):
+        print(f"   latency {key:<6}{lat['fp32'][key]:>10.1f}us{lat['int8'][key]:>10.1f}us")
+    print(f"   weights       {mem['fp32'] / 1024:>10.1f}KB{mem['int8'] / 1024:>10.1f}KB")
+    print(f"   score drift   mean {drift['score_mean_abs']:.2f}, max {drift['score_max_abs']:.0f}, "
+          f"changed {drift['scores_changed']}/{r['items']} "
+          f"(raw max {drift['raw_max_abs']:.3f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="all", choices=["all", "torch", "numpy"])
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    with open(VOCAB_PATH, 'rb') as f:
+        vocab = pickle.load(f)
+    with open(CONFIG_PATH, 'rb') as f:
+        config = pickle.load(f)
+
+    tokenizer = Tokenizer(vocab, config['max_len'])
+    texts     = load_texts(args.data)
+    encoded   = tokenizer.encode_batch([tokenizer.clean(t) for t in texts])
+
+    names   = ["torch", "numpy"] if args.backend == "all" else [args.backend]
+    reports = []
+    for name in names:
+        try:
+            report = evaluate(name, config['vocab_size'], encoded, args.rounds)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"⚠️  Skipping {name} backend: {e}")
+            continue
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n📝 Report written to {args.json}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Export models/urgency_model.pth to a plain NumPy weight file so workers
+can run with ML_BACKEND=numpy and no torch install.
+
+Command: python export_numpy_weights.py [output.npz]
+"""
+
+import os
+import sys
+import numpy as np
+import torch
+
+from utils.numpy_backend import WEIGHT_KEYS
+
+MODELS_DIR  = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODEL_PATH  = os.path.join(MODELS_DIR, 'urgency_model.pth')
+output_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(MODELS_DIR, 'urgency_model.npz')
+
+state_dict = torch.load(MODEL_PATH, map_location=torch.device('cpu'))
+
+missing = [k for k in WEIGHT_KEYS if k not in state_dict]
+if missing:
+    print(f"❌ State dict is missing: {', '.join(missing)}")
+    sys.exit(1)
+
+np.savez(output_path, **{k: state_dict[k].detach().cpu().numpy() for k in WEIGHT_KEYS})
+
+print("✅ NumPy weights exported successfully!")
+print(f"   Source : {MODEL_PATH}")
+print(f"   Output : {output_path}")
+for k in WEIGHT_KEYS:
+    print(f"   {k:<18}: {tuple(state_dict[k].shape)}")
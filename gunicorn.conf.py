@@ -0,0 +1,24 @@
+# gunicorn.conf.py — picked up automatically by `gunicorn app:app`
+import os
+
+# GUNICORN_PRELOAD=True loads the app (and the model) once in the master
+# so workers share the memory; otherwise each worker warms up after fork.
+preload_app = os.getenv("GUNICORN_PRELOAD", "False") == "True"
+
+
+def when_ready(server):
+    if preload_app:
+        from utils.ml_model import warmup
+        warmup()
+        server.log.info("Urgency model warmed up in master")
+
+
+def post_fork(server, worker):
+    from utils.ml_model import warmup
+    warmup()
+    server.log.info(f"Urgency model warmed up in worker {worker.pid}")
+
+    # Re-runs complaints a crashed worker left "processing". Started only
+    # here: threads and pools must never run in the master
+    from utils.complaint_pipeline import start_recovery_sweeper
+    start_recovery_sweeper()
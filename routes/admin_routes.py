@@ -6,6 +6,7 @@ from datetime import datetime
 import bcrypt
 from utils.database import get_db
 from middleware.auth_middleware import token_required
+from utils.assignment_engine import apply_transition, complaint_officer_id, reconcile_officer_loads, LOAD_FIELD
 import cloudinary.uploader
 
 admin_bp = Blueprint("admin", __name__)
@@ -110,6 +111,7 @@ def create_officer(current_user):
         "badge_number": badge_number,
         "overall_rating": 0,
         "total_ratings" : 0,
+        LOAD_FIELD    : 0,
         "created_by"  : str(current_user["user_id"]),
         "created_at"  : datetime.utcnow(),
     }
@@ -134,6 +136,9 @@ def delete_officer(current_user, officer_id):
             return jsonify({"error": "Officer not found"}), 404
 
         db.users.delete_one({"_id": ObjectId(officer_id)})
+        if officer.get("fcm_topic"):
+            from utils.officer_topics import resubscribe
+            resubscribe(db, officer, None, None)
         return jsonify({"message": "Officer removed successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -303,22 +308,154 @@ def assign_complaint(current_user, complaint_id):
             }}
         }
     )
+    apply_transition(
+        db,
+        complaint_officer_id(complaint), complaint.get("status"),
+        officer_info["officer_id"], "in_progress",
+    )
 
     # Notify officer
     try:
         from utils.firebase_service import firebase_service
+        from utils import notification_outbox
         if officer.get("fcm_token"):
-            firebase_service.notify_new_complaint(
-                officer_tokens=[officer["fcm_token"]],
+            title, body, data = firebase_service.new_complaint_message(
                 complaint_id=complaint_id,
                 category=complaint.get("category", ""),
                 location=complaint.get("location", ""),
                 urgency=complaint.get("urgency", 0)
             )
+            notification_outbox.enqueue(db, [officer["fcm_token"]], title, body, data, kind="new_complaint")
     except Exception as e:
         print(f"Notification error: {e}")
 
     return jsonify({
         "message"         : "Complaint assigned successfully",
         "assigned_officer": officer_info,
-    }), 200
\ No newline at end of file
+    }), 200
+
+
+@admin_bp.route("/officers/reconcile-load", methods=["POST"])
+@token_required
+def reconcile_officer_load(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    db = get_db()
+    try:
+        summary = reconcile_officer_loads(db)
+        return jsonify({"message": "Officer workloads reconciled", **summary}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ================= NOTIFICATION OUTBOX =================
+@admin_bp.route("/notifications/outbox", methods=["GET"])
+@token_required
+def get_notification_outbox(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    from utils.notification_outbox import outbox_stats
+    db = get_db()
+    try:
+        return jsonify(outbox_stats(db)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/notifications/topics/sync", methods=["POST"])
+@token_required
+def sync_notification_topics(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    from utils.officer_topics import sync_officer_topics
+    db = get_db()
+    try:
+        summary = sync_officer_topics(db)
+        return jsonify({"message": "Officer topic subscriptions synced", **summary}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ================= URGENCY MODEL REGISTRY =================
+@admin_bp.route("/models", methods=["GET"])
+@token_required
+def get_models(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    from utils.model_registry import registry, shadow_recorder
+    return jsonify({
+        **registry.status(),
+        "shadow_summary": shadow_recorder.summary(),
+    }), 200
+
+
+@admin_bp.route("/models/activate", methods=["POST"])
+@token_required
+def activate_model(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    from utils.model_registry import registry
+    db   = get_db()
+    data = request.get_json() or {}
+
+    version = data.get("version")
+    if not version:
+        return jsonify({"error": "version is required"}), 400
+    try:
+        registry.publish(db, active=version)
+        return jsonify({"message": f"Model '{version}' is loading and will be swapped in on every worker"}), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/models/shadow", methods=["POST"])
+@token_required
+def set_shadow_model(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    from utils.model_registry import registry
+    db   = get_db()
+    data = request.get_json() or {}
+
+    version = data.get("version")  # null turns shadow scoring off
+    try:
+        registry.publish(db, shadow=version)
+        message = f"Shadow scoring with '{version}'" if version else "Shadow scoring disabled"
+        return jsonify({"message": message}), 202
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@admin_bp.route("/models/shadow-report", methods=["GET"])
+@token_required
+def shadow_report(current_user):
+    if current_user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+    db = get_db()
+    try:
+        pipeline = [
+            {"$group": {
+                "_id"          : {"active": "$active_version", "shadow": "$shadow_version"},
+                "items"        : {"$sum": 1},
+                "mean_abs_diff": {"$avg": {"$abs": {"$subtract": ["$active_score", "$shadow_score"]}}},
+                "max_abs_diff" : {"$max": {"$abs": {"$subtract": ["$active_score", "$shadow_score"]}}},
+                "active_ms"    : {"$avg": "$active_ms"},
+                "shadow_ms"    : {"$avg": "$shadow_ms"},
+            }},
+        ]
+        report = [{
+            "active_version"    : r["_id"]["active"],
+            "shadow_version"    : r["_id"]["shadow"],
+            "items"             : r["items"],
+            "mean_abs_diff"     : round(r["mean_abs_diff"] or 0, 3),
+            "max_abs_diff"      : r["max_abs_diff"],
+            "active_ms_per_item": round(r["active_ms"] or 0, 3),
+            "shadow_ms_per_item": round(r["shadow_ms"] or 0, 3),
+        } for r in db.model_shadow_scores.aggregate(pipeline)]
+        return jsonify({"report": report}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
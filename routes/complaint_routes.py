@@ -1,12 +1,19 @@
 from flask import Blueprint, request, jsonify
 from bson import ObjectId
 from datetime import datetime
+from io import BytesIO
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from utils.database import get_db
-from utils.ml_model import predict_score             # ✅ ML Model
-from utils.image_analyzer import analyze_complaint_image  # ✅ Gemini Vision
-from utils.firebase_service import firebase_service
+from utils.complaint_pipeline import (
+    ASYNC_SUBMISSION, PIPELINE_STUCK_AFTER, UPLOAD_TIMEOUT, enqueue_complaint, get_upload_executor,
+    new_owner_token,
+    reserve_pipeline_slot, release_pipeline_slot,
+    upload_image, score_complaint, apply_late_stages, notify_officers,
+    find_open_duplicate, link_duplicate, attach_duplicate_image,
+)
+from utils.duplicate_detector import DUPLICATE_DETECTION, Fingerprint, duplicate_detector
+from utils.assignment_engine import auto_assign_officer, apply_transition, complaint_officer_id
 from middleware.auth_middleware import token_required
-import cloudinary.uploader
 import os
 
 complaint_bp = Blueprint("complaint", __name__)
@@ -26,33 +33,9 @@ def submit_complaint(current_user):
         if not all([category, description, location]):
             return jsonify({"error": "Missing required fields"}), 400
 
-        image_url = None
-
-        # ✅ CLOUDINARY IMAGE UPLOAD
-        if "image" in request.files:
-            file = request.files["image"]
-            if file.filename != "":
-                result = cloudinary.uploader.upload(
-                    file,
-                    folder="citycare_complaints"
-                )
-                image_url = result.get("secure_url")
-
-        # ✅ ML MODEL — text se urgency score
-        text_score   = predict_score(description)
-
-        # ✅ GEMINI VISION — image se boost (agar image hai)
-        image_boost  = 0
-        image_note   = ""
-        if image_url:
-            image_result = analyze_complaint_image(image_url)
-            image_boost  = image_result["boost"]
-            image_note   = image_result["analysis"]
-
-
-        urgency = max(0, min(100, text_score + image_boost))
-
-        print(f"📊 Text={text_score} + Image={image_boost} → Final={urgency}")
+        image_file = None
+        if "image" in request.files and request.files["image"].filename != "":
+            image_file = request.files["image"]
 
         complaint = {
             "user_id"    : ObjectId(current_user["user_id"]),
@@ -61,9 +44,9 @@ def submit_complaint(current_user):
             "location"   : location,
             "latitude"   : float(latitude) if latitude else None,
             "longitude"  : float(longitude) if longitude else None,
-            "image_url"  : image_url,
+            "image_url"  : None,
             "status"     : "pending",
-            "urgency"    : urgency,
+            "urgency"    : 0,
             "created_at" : datetime.utcnow(),
             "timeline"   : [
                 {
@@ -75,69 +58,99 @@ def submit_complaint(current_user):
             ]
         }
 
+        # 🔁 NEAR-DUPLICATE — link to the open report of the same issue
+        # instead of running upload, scoring and notification again
+        fingerprint = None
+        if DUPLICATE_DETECTION:
+            fingerprint = Fingerprint.of(description, complaint["latitude"], complaint["longitude"])
+            original    = find_open_duplicate(db, fingerprint, category)
+            if original:
+                complaint_id = link_duplicate(db, complaint, original)
+                # The photo may show what the first report didn't; upload it
+                # off the request and attach it to both records
+                if image_file:
+                    get_upload_executor().submit(
+                        attach_duplicate_image, complaint_id, str(original["_id"]), image_file.read()
+                    )
+                return jsonify({
+                    "message"      : "Complaint linked to an existing report of the same issue",
+                    "complaint_id" : complaint_id,
+                    "duplicate_of" : str(original["_id"]),
+                    "urgency"      : complaint["urgency"],
+                    "image_pending": bool(image_file),
+                }), 201
+            if fingerprint:
+                complaint["dedupe"] = fingerprint.to_doc()
+
+        # ⏳ ASYNC MODE — insert now, heavy stages run in the worker pool
+        if ASYNC_SUBMISSION:
+            # Refuse before inserting anything if this worker's queue is full
+            if not reserve_pipeline_slot():
+                return jsonify({"error": "Too many complaints are being processed, please retry shortly"}), \
+                    503, {"Retry-After": "10"}
+
+            # Read the upload before the request ends; the stream is closed afterwards
+            image_bytes = image_file.read() if image_file else None
+
+            complaint["processing"] = {
+                "state"      : "processing",
+                "started_at" : datetime.utcnow().isoformat(),
+                "lease_until": datetime.utcnow() + PIPELINE_STUCK_AFTER,
+                "owner"      : new_owner_token(),
+                "has_image"  : bool(image_bytes),
+                "stages"     : {},
+            }
+            try:
+                result = db.complaints.insert_one(complaint)
+            except Exception:
+                release_pipeline_slot()
+                raise
+            complaint_id = str(result.inserted_id)
+            duplicate_detector.add(complaint_id, fingerprint, category, complaint["created_at"])
+
+            enqueue_complaint(complaint_id, complaint["processing"]["owner"], image_bytes)
+
+            return jsonify({
+                "message"     : "Complaint accepted for processing",
+                "complaint_id": complaint_id,
+                "status_url"  : f"/api/complaints/{complaint_id}",
+                "processing"  : "processing",
+            }), 202
+
+        # ✅ CLOUDINARY IMAGE UPLOAD (overlaps with scoring)
+        # Keep the bytes so Gemini analyses them without a second download
+        image_bytes   = image_file.read() if image_file else None
+        upload_future = get_upload_executor().submit(upload_image, BytesIO(image_bytes)) if image_bytes else None
+
+        # ✅ ML MODEL + GEMINI VISION
+        scores, pending = score_complaint(description, None, image_bytes, category)
+        urgency = scores["urgency"]
+
+        try:
+            complaint["image_url"] = upload_future.result(timeout=UPLOAD_TIMEOUT) if upload_future else None
+        except FutureTimeoutError:
+            upload_future.cancel()
+            print(f"⚠️ Image upload exceeded {UPLOAD_TIMEOUT:.0f}s, complaint not saved")
+            return jsonify({"error": "Image upload timed out, please try again"}), 504
+
+        complaint["urgency"]             = urgency
+        complaint["image_score_pending"] = scores["image_pending"]
+        complaint["scoring"]             = scores
+
         result       = db.complaints.insert_one(complaint)
         complaint_id = str(result.inserted_id)
+        duplicate_detector.add(complaint_id, fingerprint, category, complaint["created_at"])
 
-        # ── AUTO-ASSIGN officer by department ──────────────────────
-        CATEGORY_DEPT = {
-            "roads": "roads", "road": "roads", "pothole": "roads",
-            "water": "water",
-            "drainage": "drainage", "flood": "drainage",
-            "electricity": "electricity", "power": "electricity", "streetlight": "electricity",
-            "sanitation": "sanitation", "garbage": "sanitation", "waste": "sanitation",
-            "safety": "safety", "crime": "safety",
-            "environment": "environment", "pollution": "environment",
-            "health": "health",
-            "infrastructure": "infrastructure",
-            "transport": "transport",
-        }
+        # Image missed the scoring deadline — its boost is applied when it lands
+        if pending:
+            apply_late_stages(complaint_id, scores, pending)
 
-        dept = CATEGORY_DEPT.get(category.lower().strip(), None)
-        assigned_officer_info = None
-
-        if dept:
-            dept_officers = list(db.users.find({"role": "officer", "department": dept}))
-            if dept_officers:
-                def officer_load(o):
-                    return db.complaints.count_documents({
-                        "assigned_officer.officer_id": str(o["_id"]),
-                        "status": {"$in": ["pending", "in_progress"]}
-                    })
-                best_officer = min(dept_officers, key=officer_load)
-                assigned_officer_info = {
-                    "officer_id"  : str(best_officer["_id"]),
-                    "name"        : best_officer.get("name", ""),
-                    "badge_number": best_officer.get("badge_number", ""),
-                    "department"  : best_officer.get("department", ""),
-                }
-                db.complaints.update_one(
-                    {"_id": result.inserted_id},
-                    {"$set": {"assigned_officer": assigned_officer_info, "status": "in_progress"},
-                     "$push": {"timeline": {"status": "Assigned", "date": datetime.utcnow().isoformat(), "done": True, "by": f"Auto → {best_officer.get('name', '')}"}}}
-                )
+        # ── AUTO-ASSIGN officer by department ──────────────────────
+        assigned_officer_info = auto_assign_officer(db, result.inserted_id, category)
 
         # 🔥 NOTIFY OFFICERS
         try:
-            if assigned_officer_info:
-                assigned_doc = db.users.find_one({"_id": ObjectId(assigned_officer_info["officer_id"])})
-                if assigned_doc and assigned_doc.get("fcm_token"):
-                    firebase_service.notify_new_complaint(
-                        officer_tokens=[assigned_doc["fcm_token"]],
-                        complaint_id=complaint_id, category=category,
-                        location=location, urgency=urgency
-                    )
-            else:
-                officers = list(db.users.find(
-                    {"role": "officer", "fcm_token": {"$exists": True, "$ne": None}},
-                    {"fcm_token": 1}
-                ))
-                officer_tokens = [o["fcm_token"] for o in officers]
-                if officer_tokens:
-                    firebase_service.notify_new_complaint(
-                        officer_tokens=officer_tokens,
-                        complaint_id=complaint_id, category=category,
-                        location=location, urgency=urgency
-                    )
+            notify_officers(db, complaint_id, category, location, urgency, assigned_officer_info)
         except Exception as e:
             print(f"Notification error: {e}")
 
@@ -145,6 +158,7 @@ def submit_complaint(current_user):
             "message"          : "Complaint submitted successfully",
             "complaint_id"     : complaint_id,
             "urgency"          : urgency,
+            "image_pending"    : scores["image_pending"],
             "assigned_officer" : assigned_officer_info,
         }), 201
 
@@ -186,6 +200,11 @@ def get_complaint(current_user, complaint_id):
             "timeline"            : complaint.get("timeline", []),
             "assignedOfficer"     : assigned if assigned else None,
             "resolutionConfirmed" : complaint.get("resolution_confirmed", False),
+            "processingState"     : complaint.get("processing", {}).get("state", "completed"),
+            "processingStages"    : complaint.get("processing", {}).get("stages", {}),
+            "imageScorePending"   : complaint.get("image_score_pending", False),
+            "duplicateOf"         : str(complaint["duplicate_of"]) if complaint.get("duplicate_of") else None,
+            "duplicateCount"      : complaint.get("duplicate_count", 0),
         }
 
         return jsonify(formatted), 200
@@ -344,6 +363,11 @@ def confirm_resolution(current_user, complaint_id):
                         "by"    : f"Citizen Rejected: {reason}"
                     }}}
             )
+            apply_transition(
+                db,
+                complaint_officer_id(complaint), complaint.get("status"),
+                complaint_officer_id(complaint), "in_progress",
+            )
 
             # Notify officer
             try:
@@ -351,12 +375,14 @@ def confirm_resolution(current_user, complaint_id):
                 if assigned.get("officer_id"):
                     officer = db.users.find_one({"_id": ObjectId(assigned["officer_id"])})
                     if officer and officer.get("fcm_token"):
-                        from utils.firebase_service import firebase_service
-                        firebase_service.send_notification(
-                            token  = officer["fcm_token"],
+                        from utils import notification_outbox
+                        notification_outbox.enqueue(
+                            db,
+                            tokens = [officer["fcm_token"]],
                             title  = "Resolution Rejected ❌",
                             body   = f"Citizen rejected your resolution. Reason: {reason or 'Not specified'}",
-                            data   = {"complaint_id": complaint_id, "type": "resolution_rejected"}
+                            data   = {"complaint_id": complaint_id, "type": "resolution_rejected"},
+                            kind   = "resolution_rejected"
                         )
             except Exception as e:
                 print(f"Notification error: {e}")
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from bson import ObjectId
 from utils.database import get_db
 from middleware.auth_middleware import token_required
+from utils.officer_topics import resubscribe
 
 fcm_bp = Blueprint("fcm", __name__)
 
@@ -18,25 +19,32 @@ def register_fcm_token(current_user):
         if not fcm_token:
             return jsonify({"error": "FCM token is required"}), 400
 
-        # Update user's FCM token
-        result = db.users.update_one(
+        # Update user's FCM token (returns the previous document)
+        user = db.users.find_one_and_update(
             {"_id": ObjectId(current_user["user_id"])},
             {
                 "$set": {
                     "fcm_token": fcm_token,
                     "fcm_token_updated_at": current_user.get("timestamp")
                 }
-            }
+            },
+            projection={"role": 1, "department": 1, "fcm_token": 1, "fcm_topic": 1}
         )
 
-        if result.matched_count == 0:
+        if user is None:
             return jsonify({"error": "User not found"}), 404
 
         print(f"✅ FCM token registered for user {current_user['user_id']}")
 
+        # Officers receive broadcasts through their department's topic
+        topic = None
+        if user.get("role") == "officer":
+            topic = resubscribe(db, user, fcm_token, user.get("department"))
+
         return jsonify({
             "message": "FCM token registered successfully",
-            "token_registered": True
+            "token_registered": True,
+            "topic": topic
         }), 200
 
     except Exception as e:
@@ -51,19 +59,23 @@ def unregister_fcm_token(current_user):
     db = get_db()
 
     try:
-        result = db.users.update_one(
+        user = db.users.find_one_and_update(
             {"_id": ObjectId(current_user["user_id"])},
             {
                 "$unset": {
                     "fcm_token": "",
                     "fcm_token_updated_at": ""
                 }
-            }
+            },
+            projection={"role": 1, "fcm_token": 1, "fcm_topic": 1}
         )
 
-        if result.matched_count == 0:
+        if user is None:
             return jsonify({"error": "User not found"}), 404
 
+        if user.get("fcm_topic"):
+            resubscribe(db, user, None, None)
+
         print(f"✅ FCM token unregistered for user {current_user['user_id']}")
 
         return jsonify({
@@ -3,6 +3,9 @@ from bson import ObjectId
 from datetime import datetime
 from utils.database import get_db
 from utils.firebase_service import firebase_service
+from utils import notification_outbox
+from utils.officer_topics import resubscribe
+from utils.assignment_engine import apply_transition, complaint_officer_id
 from middleware.auth_middleware import token_required
 import cloudinary.uploader
 import os
@@ -86,10 +89,16 @@ def update_officer_profile(current_user):
         if not update_data:
             return jsonify({"error": "No valid fields to update"}), 400
 
-        db.users.update_one(
+        officer = db.users.find_one_and_update(
             {"_id": ObjectId(current_user["user_id"])},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"department": 1, "fcm_token": 1, "fcm_topic": 1}
         )
+
+        # Move the officer's device to the new department's topic
+        if officer and "department" in update_data and officer.get("fcm_token"):
+            resubscribe(db, officer, officer["fcm_token"], update_data["department"])
+
         return jsonify({"message": "Profile updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -275,6 +284,12 @@ def update_complaint_status(current_user, complaint_id):
         }
     )
 
+    apply_transition(
+        db,
+        complaint_officer_id(complaint), complaint.get("status"),
+        officer_info["officer_id"], status,
+    )
+
     db.officer_activities.insert_one({
         "officer_id": str(current_user["user_id"]),
         "complaint_id": complaint_id,
@@ -299,20 +314,21 @@ def update_complaint_status(current_user, complaint_id):
                 token_preview = citizen["fcm_token"][:30]
                 print(f"   Token preview     : {token_preview}...")
 
-                success = firebase_service.notify_status_update(
-                    user_token=citizen["fcm_token"],
+                title, body, data = firebase_service.status_update_message(
                     complaint_id=complaint_id,
                     new_status=status,
                     category=complaint.get("category", "Your")
                 )
-                print(f"   FCM result        : {'✅ Sent' if success else '❌ Failed'}")
+                queued = notification_outbox.enqueue(db, [citizen["fcm_token"]], title, body, data,
+                                                     kind="status_update")
+                print(f"   FCM result        : {'📮 Queued' if queued else '❌ Not queued'}")
             else:
                 print(f"   ⚠️ Skipping — citizen has no FCM token registered")
                 print(f"   This means the citizen has never logged in on a device,")
                 print(f"   or logged out before the officer updated the status.")
 
         except Exception as e:
-            print(f"⚠️ Error sending status notification: {e}")
+            print(f"⚠️ Error queueing status notification: {e}")
 
     return jsonify({
         "message": "Status updated successfully",
@@ -377,17 +393,18 @@ def submit_complaint_feedback(current_user, complaint_id):
 
         try:
             if officer.get("fcm_token"):
-                success = firebase_service.notify_feedback_received(
-                    officer_token=officer["fcm_token"],
+                title, body, data = firebase_service.feedback_received_message(
                     complaint_id=complaint_id,
                     rating=rating,
                     category=complaint.get("category", "a")
                 )
-                print(f"{'✅ Feedback notification sent' if success else '⚠️ Feedback notification failed'}")
+                queued = notification_outbox.enqueue(db, [officer["fcm_token"]], title, body, data,
+                                                     kind="feedback_received")
+                print(f"{'📮 Feedback notification queued' if queued else '⚠️ Feedback notification not queued'}")
             else:
                 print("⚠️ Officer has no FCM token")
         except Exception as e:
-            print(f"⚠️ Error sending feedback notification: {e}")
+            print(f"⚠️ Error queueing feedback notification: {e}")
 
         return jsonify({
             "message": "Feedback submitted successfully",
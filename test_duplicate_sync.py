@@ -0,0 +1,70 @@
+"""
+DuplicateDetector.sync() must index complaints inserted out of created_at
+order: the sync submit path stamps created_at before upload and scoring,
+so a slow request can be inserted after a faster one that started later.
+
+Run: python -m pytest -q test_duplicate_sync.py   (or python test_duplicate_sync.py)
+"""
+
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from utils.duplicate_detector import DuplicateDetector, Fingerprint
+
+
+class _Cursor(list):
+    def sort(self, key, direction):
+        return _Cursor(sorted(self, key=lambda d: d[key], reverse=direction < 0))
+
+
+class _Complaints:
+    """Just enough of a pymongo collection for sync()."""
+
+    def __init__(self):
+        self.docs = []
+
+    def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+
+    def find(self, query, projection=None):
+        since = query["_id"]["$gt"]
+        return _Cursor(d for d in self.docs if d["_id"] > since and "dedupe" in d)
+
+
+class _DB:
+    def __init__(self):
+        self.complaints = _Complaints()
+
+
+def _complaint(description, created_at, lat=12.9716, lon=77.5946):
+    fp = Fingerprint.of(description, lat, lon)
+    return {"description": description, "category": "roads", "created_at": created_at,
+            "latitude": lat, "longitude": lon, "dedupe": fp.to_doc()}, fp
+
+
+def test_sync_indexes_complaints_inserted_out_of_order():
+    db     = _DB()
+    reader = DuplicateDetector()
+    now    = datetime.utcnow()
+
+    slow, slow_fp = _complaint("huge pothole near the bus stop on mg road", now - timedelta(seconds=8))
+    fast, _       = _complaint("streetlight not working outside house 42", now - timedelta(seconds=2))
+
+    # The faster request (started later) is inserted and synced first...
+    db.complaints.insert_one(fast)
+    reader.sync(db, force=True)
+    assert reader.find(slow_fp, "roads") == []
+
+    # ...then the slower one lands with an older created_at
+    db.complaints.insert_one(slow)
+    reader.sync(db, force=True)
+
+    matches = reader.find(slow_fp, "roads")
+    assert [m["complaint_id"] for m in matches] == [str(slow["_id"])]
+
+
+if __name__ == "__main__":
+    test_sync_indexes_complaints_inserted_out_of_order()
+    print("ok")
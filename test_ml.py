@@ -1,6 +1,48 @@
-from utils.ml_model import predict_score
-print(predict_score("There is a large pothole on the main road causing accidents"))
-print(predict_score("Sewage water overflowing "))
-print(predict_score("Broken streetlight"))
+"""
+Urgency model checks. The NumPy backend must match the torch model it was
+exported from (python export_numpy_weights.py); the check is skipped when
+torch or the exported weights are not available.
 
-print(predict_score("pothole"))
\ No newline at end of file
+Run: python -m pytest -q test_ml.py   (or python test_ml.py to print sample scores)
+"""
+
+import os
+
+import pytest
+
+SAMPLE_TEXTS = [
+    "There is a large pothole on the main road causing accidents",
+    "Sewage water overflowing ",
+    "Broken streetlight",
+    "pothole",
+]
+
+PARITY_TEXTS = SAMPLE_TEXTS + [
+    "",
+    "Exposed live wire sparking near the school gate, children at risk",
+]
+
+
+def test_numpy_backend_matches_torch():
+    pytest.importorskip("torch")
+    from utils.ml_model import clean_text, encode_text, registry, MODEL_PATH, NUMPY_WEIGHTS_PATH
+    from utils.torch_backend import TorchBackend
+    from utils.numpy_backend import NumpyBackend
+
+    if not os.path.exists(NUMPY_WEIGHTS_PATH):
+        pytest.skip(f"{NUMPY_WEIGHTS_PATH} not found; run python export_numpy_weights.py")
+
+    encoded   = [encode_text(clean_text(t)) for t in PARITY_TEXTS]
+    torch_out = TorchBackend.from_state_dict(MODEL_PATH, registry.get().vocab_size).predict(encoded)
+    numpy_out = NumpyBackend.from_npz(NUMPY_WEIGHTS_PATH).predict(encoded)
+
+    max_diff = max(abs(a - b) for a, b in zip(torch_out, numpy_out))
+    print(f"Torch vs NumPy max abs diff: {max_diff:.2e}")
+    assert max_diff < 1e-4, "NumPy backend diverges from torch"
+    assert [round(a) for a in torch_out] == [round(b) for b in numpy_out]
+
+
+if __name__ == "__main__":
+    from utils.ml_model import predict_score
+    for text in SAMPLE_TEXTS:
+        print(predict_score(text))
@@ -0,0 +1,145 @@
+"""
+Officer open-workload counters (users.open_complaints) must follow a
+complaint through assignment, resolution and a citizen's rejection, and
+reconcile_officer_loads() must repair counters that drifted anyway.
+
+Run: python -m pytest -q test_officer_loads.py   (or python test_officer_loads.py)
+"""
+
+from bson import ObjectId
+
+from utils.assignment_engine import (
+    LOAD_FIELD, OPEN_STATUSES, apply_transition, complaint_officer_id, reconcile_officer_loads,
+)
+
+
+def _get(doc, path):
+    for key in path.split("."):
+        doc = (doc or {}).get(key)
+    return doc
+
+
+class _Users:
+    """Just enough of a pymongo collection for the counter helpers."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+
+    def find(self, query, projection=None):
+        return [d for d in self.docs.values() if d.get("role") == query["role"]]
+
+    def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        at_least = query.get(LOAD_FIELD, {}).get("$gte")
+        if doc is None or (at_least is not None and doc.get(LOAD_FIELD, 0) < at_least):
+            return
+        for field, delta in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + delta
+        doc.update(update.get("$set", {}))
+
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.update_one(op._filter, op._doc)
+
+
+class _Complaints:
+    def __init__(self):
+        self.docs = []
+
+    def aggregate(self, pipeline):
+        # The $match/$group used by reconcile_officer_loads()
+        counts = {}
+        for doc in self.docs:
+            officer_id = _get(doc, "assigned_officer.officer_id")
+            if doc.get("status") in OPEN_STATUSES and officer_id:
+                counts[officer_id] = counts.get(officer_id, 0) + 1
+        return [{"_id": k, "count": n} for k, n in counts.items()]
+
+
+class _DB:
+    def __init__(self):
+        self.users      = _Users()
+        self.complaints = _Complaints()
+
+
+def _officer(db, **fields):
+    officer = {"role": "officer", "department": "roads", LOAD_FIELD: 0, **fields}
+    db.users.insert_one(officer)
+    return officer
+
+
+def _move(db, complaint, officer_id, status):
+    """Update a complaint the way the routes do, then apply the counter transition."""
+    old_officer, old_status = complaint_officer_id(complaint), complaint.get("status")
+    if officer_id:
+        complaint["assigned_officer"] = {"officer_id": officer_id}
+    complaint["status"] = status
+    apply_transition(db, old_officer, old_status, officer_id, status)
+
+
+def test_assign_resolve_reject_keeps_counter_in_step():
+    db        = _DB()
+    officer   = _officer(db)
+    oid       = str(officer["_id"])
+    complaint = {"status": "pending"}
+    db.complaints.docs.append(complaint)
+
+    _move(db, complaint, oid, "in_progress")    # admin assigns
+    assert officer[LOAD_FIELD] == 1
+    _move(db, complaint, oid, "resolved")       # officer resolves
+    assert officer[LOAD_FIELD] == 0
+    _move(db, complaint, oid, "in_progress")    # citizen rejects the resolution
+    assert officer[LOAD_FIELD] == 1
+    _move(db, complaint, oid, "in_progress")    # a repeated update is not counted twice
+    assert officer[LOAD_FIELD] == 1
+
+    assert reconcile_officer_loads(db)["corrected"] == 0
+
+
+def test_reassignment_moves_the_load():
+    db        = _DB()
+    first     = _officer(db)
+    second    = _officer(db)
+    complaint = {"status": "pending"}
+
+    _move(db, complaint, str(first["_id"]), "in_progress")
+    _move(db, complaint, str(second["_id"]), "in_progress")
+    assert (first[LOAD_FIELD], second[LOAD_FIELD]) == (0, 1)
+
+
+def test_counter_never_goes_negative():
+    db        = _DB()
+    officer   = _officer(db)
+    complaint = {"status": "in_progress", "assigned_officer": {"officer_id": str(officer["_id"])}}
+
+    _move(db, complaint, str(officer["_id"]), "resolved")
+    assert officer[LOAD_FIELD] == 0
+
+
+def test_reconcile_repairs_drift_and_backfills_missing_counters():
+    db       = _DB()
+    drifted  = _officer(db, **{LOAD_FIELD: 5})
+    missing  = _officer(db)
+    accurate = _officer(db, **{LOAD_FIELD: 1})
+    del missing[LOAD_FIELD]
+
+    for officer, status in [(drifted, "in_progress"), (drifted, "resolved"),
+                            (missing, "pending"), (accurate, "in_progress")]:
+        db.complaints.docs.append({"status": status, "assigned_officer": {"officer_id": str(officer["_id"])}})
+
+    summary = reconcile_officer_loads(db)
+
+    assert summary["corrected"] == 2
+    assert (drifted[LOAD_FIELD], missing[LOAD_FIELD], accurate[LOAD_FIELD]) == (1, 1, 1)
+
+
+if __name__ == "__main__":
+    test_assign_resolve_reject_keeps_counter_in_step()
+    test_reassignment_moves_the_load()
+    test_counter_never_goes_negative()
+    test_reconcile_repairs_drift_and_backfills_missing_counters()
+    print("ok")
@@ -0,0 +1,160 @@
+# utils/assignment_engine.py
+
+from datetime import datetime
+from typing import Optional, Dict
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+# Complaint category → officer department
+CATEGORY_DEPT = {
+    "roads": "roads", "road": "roads", "pothole": "roads",
+    "water": "water",
+    "drainage": "drainage", "flood": "drainage",
+    "electricity": "electricity", "power": "electricity", "streetlight": "electricity",
+    "sanitation": "sanitation", "garbage": "sanitation", "waste": "sanitation",
+    "safety": "safety", "crime": "safety",
+    "environment": "environment", "pollution": "environment",
+    "health": "health",
+    "infrastructure": "infrastructure",
+    "transport": "transport",
+}
+
+# Statuses that count towards an officer's open workload
+OPEN_STATUSES = ["pending", "in_progress"]
+
+# Counter kept on each officer's users document
+LOAD_FIELD = "open_complaints"
+
+
+def department_for_category(category: str) -> Optional[str]:
+    return CATEGORY_DEPT.get((category or "").lower().strip(), None)
+
+
+# ── Counter maintenance ───────────────────────────────────────────
+def adjust_load(db, officer_id: Optional[str], delta: int):
+    """Atomically move an officer's open-workload counter by delta (never below 0)."""
+    if not officer_id or not delta:
+        return
+    query = {"_id": ObjectId(officer_id)}
+    if delta < 0:
+        query[LOAD_FIELD] = {"$gte": -delta}
+    db.users.update_one(query, {"$inc": {LOAD_FIELD: delta}})
+
+
+def apply_transition(db, old_officer_id: Optional[str], old_status: Optional[str],
+                     new_officer_id: Optional[str], new_status: Optional[str]):
+    """
+    Update workload counters for a complaint moving from
+    (old_officer, old_status) to (new_officer, new_status).
+    Covers assignment, reassignment, resolution and reopening.
+    """
+    was_open = bool(old_officer_id) and old_status in OPEN_STATUSES
+    is_open  = bool(new_officer_id) and new_status in OPEN_STATUSES
+    same     = old_officer_id == new_officer_id
+
+    if was_open and (not is_open or not same):
+        adjust_load(db, old_officer_id, -1)
+    if is_open and (not was_open or not same):
+        adjust_load(db, new_officer_id, 1)
+
+
+def complaint_officer_id(complaint: Dict) -> Optional[str]:
+    return (complaint.get("assigned_officer") or {}).get("officer_id")
+
+
+# ── Auto-assignment ───────────────────────────────────────────────
+def claim_least_loaded_officer(db, dept: str) -> Optional[Dict]:
+    """
+    Pick the least-loaded officer of a department and reserve one unit of
+    workload for them in a single indexed find-and-modify. Officers without
+    a counter yet are skipped: a missing field sorts first and would
+    attract every complaint until backfilled (see ensure_officer_loads).
+    """
+    return db.users.find_one_and_update(
+        {"role": "officer", "department": dept, LOAD_FIELD: {"$exists": True}},
+        {"$inc": {LOAD_FIELD: 1}},
+        sort=[(LOAD_FIELD, 1)],
+        projection={"name": 1, "badge_number": 1, "department": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def auto_assign_officer(db, complaint_oid: ObjectId, category: str) -> Optional[Dict]:
+    """Assign the least-loaded officer of the category's department."""
+    dept = department_for_category(category)
+    if not dept:
+        return None
+
+    best_officer = claim_least_loaded_officer(db, dept)
+    if not best_officer:
+        return None
+
+    assigned_officer_info = {
+        "officer_id"  : str(best_officer["_id"]),
+        "name"        : best_officer.get("name", ""),
+        "badge_number": best_officer.get("badge_number", ""),
+        "department"  : best_officer.get("department", ""),
+    }
+    result = db.complaints.update_one(
+        {"_id": complaint_oid},
+        {"$set": {"assigned_officer": assigned_officer_info, "status": "in_progress"},
+         "$push": {"timeline": {"status": "Assigned", "date": datetime.utcnow().isoformat(), "done": True, "by": f"Auto → {best_officer.get('name', '')}"}}}
+    )
+    if result.matched_count == 0:
+        # Complaint vanished between insert and assignment — give the slot back
+        adjust_load(db, assigned_officer_info["officer_id"], -1)
+        return None
+
+    return assigned_officer_info
+
+
+# ── Reconciliation ────────────────────────────────────────────────
+def reconcile_officer_loads(db) -> Dict:
+    """
+    Recompute every officer's open-workload counter from the complaints
+    collection and fix any drift. Returns a summary of corrected officers.
+    """
+    pipeline = [
+        {"$match": {
+            "status": {"$in": OPEN_STATUSES},
+            "assigned_officer.officer_id": {"$exists": True, "$ne": None},
+        }},
+        {"$group": {"_id": "$assigned_officer.officer_id", "count": {"$sum": 1}}},
+    ]
+    actual = {row["_id"]: row["count"] for row in db.complaints.aggregate(pipeline)}
+
+    ops     = []
+    drifted = []
+    for officer in db.users.find({"role": "officer"}, {LOAD_FIELD: 1}):
+        officer_id = str(officer["_id"])
+        expected   = actual.get(officer_id, 0)
+        stored     = officer.get(LOAD_FIELD)
+        if stored != expected:
+            ops.append(UpdateOne({"_id": officer["_id"]}, {"$set": {LOAD_FIELD: expected}}))
+            drifted.append({"officer_id": officer_id, "stored": stored, "actual": expected})
+
+    if ops:
+        db.users.bulk_write(ops, ordered=False)
+
+    print(f"🔧 Officer load reconciliation: {len(drifted)} counter(s) corrected")
+    return {"corrected": len(drifted), "officers": drifted}
+
+
+def ensure_officer_loads(db) -> Dict:
+    """
+    Startup backfill: if any officer has no workload counter (existing
+    officers before counters were introduced), reconcile them all so they
+    enter auto-assignment with their real open workload.
+    """
+    missing = db.users.count_documents({"role": "officer", LOAD_FIELD: {"$exists": False}})
+    if not missing:
+        return {"corrected": 0, "officers": []}
+    print(f"🔧 {missing} officer(s) have no workload counter — backfilling")
+    return reconcile_officer_loads(db)
+
+
+if __name__ == "__main__":
+    # Cron-friendly entry point: python -m utils.assignment_engine
+    from utils.database import get_db
+    reconcile_officer_loads(get_db())
@@ -0,0 +1,92 @@
+# utils/circuit_breaker.py
+
+import threading
+import time
+
+from utils.metrics import metrics
+
+CLOSED    = "closed"
+OPEN      = "open"
+HALF_OPEN = "half_open"
+
+# Gauge encoding for circuit_breaker_state
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for an outbound dependency.
+
+    closed    → calls go through; `failure_threshold` failures in a row trip it
+    open      → allow() is False until `reset_timeout` seconds have passed
+    half_open → one probe call is let through; success closes the breaker,
+                failure re-opens it for another `reset_timeout`
+
+    Exposed as circuit_breaker_state{name=...} (0 closed, 1 half-open,
+    2 open) and circuit_breaker_trips_total{name=...}.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.name              = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout     = reset_timeout
+
+        self._lock           = threading.Lock()
+        self._state          = CLOSED
+        self._failures       = 0
+        self._opened_at      = 0.0
+        self._probe_inflight = False
+
+        metrics.register_gauge("circuit_breaker_state", lambda: _STATE_VALUE[self.state],
+                               labels={"name": name})
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """True if a call may be attempted now."""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = HALF_OPEN
+                self._probe_inflight = False
+            # Half-open: only one probe at a time
+            if self._probe_inflight:
+                return False
+            self._probe_inflight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"✅ Circuit '{self.name}' closed")
+            self._state          = CLOSED
+            self._failures       = 0
+            self._probe_inflight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures      += 1
+            self._probe_inflight = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"⚠️ Circuit '{self.name}' opened after {self._failures} failure(s)")
+                    metrics.inc("circuit_breaker_trips_total", labels={"name": self.name})
+                self._state     = OPEN
+                self._opened_at = time.monotonic()
+
+    def status(self) -> dict:
+        return {
+            "name"             : self.name,
+            "state"            : self.state,
+            "failures"         : self._failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout"    : self.reset_timeout,
+        }
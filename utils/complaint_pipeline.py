@@ -0,0 +1,515 @@
+# utils/complaint_pipeline.py
+
+import os
+import threading
+import time
+import traceback
+import uuid
+from io import BytesIO
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import cloudinary.uploader
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from utils.database import get_db
+from utils.scoring_engine import get_scoring_engine
+from utils.firebase_service import firebase_service
+from utils import notification_outbox
+from utils.officer_topics import broadcast_targets
+from utils.assignment_engine import auto_assign_officer, OPEN_STATUSES
+from utils.duplicate_detector import duplicate_detector, Fingerprint
+from utils.metrics import metrics
+
+# ── Configuration ─────────────────────────────────────────────────
+# ASYNC_COMPLAINT_SUBMISSION=True → /submit inserts the complaint in a
+# "processing" state, returns 202 and finishes the heavy stages here.
+ASYNC_SUBMISSION = os.getenv("ASYNC_COMPLAINT_SUBMISSION", "False") == "True"
+PIPELINE_WORKERS = int(os.getenv("COMPLAINT_PIPELINE_WORKERS", "4"))
+
+# Complaints queued or running per worker; /submit answers 503 beyond this
+PIPELINE_QUEUE_SIZE = int(os.getenv("COMPLAINT_PIPELINE_QUEUE_SIZE", "100"))
+
+# A complaint still "processing" this long after a worker picked it up was
+# lost (worker restart or crash); the sweep re-runs it, and gives up after
+# PIPELINE_MAX_ATTEMPTS runs
+PIPELINE_STUCK_AFTER   = timedelta(seconds=float(os.getenv("COMPLAINT_PIPELINE_STUCK_SECONDS", "600")))
+PIPELINE_SWEEP_SEC     = float(os.getenv("COMPLAINT_PIPELINE_SWEEP_SECONDS", "60"))
+PIPELINE_MAX_ATTEMPTS  = int(os.getenv("COMPLAINT_PIPELINE_MAX_ATTEMPTS", "3"))
+
+# Sync /submit uploads to Cloudinary on its own pool (never the scoring
+# pool, where slow uploads would push text scoring past its timeout) and
+# waits at most UPLOAD_TIMEOUT_SECONDS for the URL
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+UPLOAD_TIMEOUT = float(os.getenv("UPLOAD_TIMEOUT_SECONDS", "20"))
+
+# Pools and queue slots are per process: anything created before a
+# gunicorn fork is rebuilt in the worker (the parent's threads don't exist there)
+_executor        = None
+_upload_executor = None
+_slots           = None
+_pool_pid        = None
+
+
+def _check_fork():
+    global _executor, _upload_executor, _slots, _pool_pid
+    if _pool_pid != os.getpid():
+        _executor, _upload_executor = None, None
+        _slots    = threading.BoundedSemaphore(PIPELINE_QUEUE_SIZE)
+        _pool_pid = os.getpid()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    _check_fork()
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PIPELINE_WORKERS,
+            thread_name_prefix="complaint-pipeline"
+        )
+    return _executor
+
+
+def get_upload_executor() -> ThreadPoolExecutor:
+    global _upload_executor
+    _check_fork()
+    if _upload_executor is None:
+        _upload_executor = ThreadPoolExecutor(
+            max_workers=UPLOAD_WORKERS,
+            thread_name_prefix="image-upload"
+        )
+    return _upload_executor
+
+
+# ── Stages (shared by the sync and async submission paths) ────────
+
+
+def upload_image(file) -> Optional[str]:
+    """Upload a complaint image (FileStorage or file-like) to Cloudinary."""
+    # The HTTP timeout frees the upload thread even if nobody waits for it
+    result = cloudinary.uploader.upload(file, folder="citycare_complaints", timeout=UPLOAD_TIMEOUT)
+    return result.get("secure_url")
+
+
+def score_complaint(description: str, image_url: Optional[str],
+                    image_bytes: Optional[bytes] = None,
+                    category: Optional[str] = None) -> Tuple[Dict, Dict[str, Future]]:
+    """
+    Urgency from the configured scoring stages (see utils/scoring_engine.py;
+    by default the ML text model plus the Gemini image boost). When the
+    image bytes are already in memory they are analysed directly instead
+    of being downloaded again from Cloudinary.
+
+    Returns (scores, pending). scores["image_pending"] is True when an image
+    stage missed its budget; pass pending to apply_late_stages() once the
+    complaint is saved so its result is applied when it lands.
+    """
+    scores, pending = get_scoring_engine().score({
+        "description": description,
+        "category"   : category,
+        "image_url"  : image_url,
+        "image_bytes": image_bytes,
+    })
+    scores["image_pending"] = bool(pending)
+    return scores, pending
+
+
+def apply_late_stages(complaint_id: str, scores: Dict, pending: Dict[str, Future]):
+    """
+    Follow-up for a complaint saved with image_score_pending: once every
+    pending stage has finished, recombine the urgency with their results
+    and clear the flag.
+    """
+    oid       = ObjectId(complaint_id)
+    late      = {}
+    remaining = [len(pending)]
+    lock      = threading.Lock()
+
+    def _finish():
+        update = {
+            "urgency"            : get_scoring_engine().rescore(scores, late),
+            "image_score_pending": False,
+        }
+        for name, record in late.items():
+            update[f"scoring.stages.{name}"] = record
+        try:
+            get_db().complaints.update_one({"_id": oid, "image_score_pending": True}, {"$set": update})
+            metrics.inc("scoring_late_image_applied_total")
+            print(f"🖼️ Late scoring applied to {complaint_id}: urgency={update['urgency']}")
+        except Exception as e:
+            print(f"⚠️ Could not apply late scoring ({complaint_id}): {e}")
+
+    def _on_done(name: str, future: Future):
+        try:
+            late[name] = {**future.result(), "status": "late"}
+        except Exception as e:
+            print(f"⚠️ Late scoring stage {name} failed ({complaint_id}): {e}")
+        with lock:
+            remaining[0] -= 1
+            done = remaining[0] == 0
+        if done:
+            _finish()
+
+    for name, future in pending.items():
+        future.add_done_callback(lambda f, name=name: _on_done(name, f))
+
+
+def find_open_duplicate(db, fingerprint: Optional[Fingerprint], category: str) -> Optional[Dict]:
+    """
+    The open complaint a new one near-duplicates, if any. The LSH lookup
+    is in-process; only the best candidates are confirmed open in MongoDB.
+    """
+    if fingerprint is None:
+        return None
+    duplicate_detector.sync(db)
+
+    for match in duplicate_detector.find(fingerprint, category)[:3]:
+        original = db.complaints.find_one(
+            {"_id": ObjectId(match["complaint_id"]), "status": {"$in": OPEN_STATUSES}},
+            {"urgency": 1, "status": 1, "assigned_officer": 1}
+        )
+        if original:
+            original["similarity"] = match["similarity"]
+            return original
+        # Closed since it was indexed — it can't absorb new reports
+        duplicate_detector.discard(match["complaint_id"])
+    return None
+
+
+def link_duplicate(db, complaint: Dict, original: Dict) -> str:
+    """
+    Save a near-duplicate report linked to its open original instead of
+    running upload, scoring, assignment and notification again. The
+    original counts the extra report so officers see one work item.
+    """
+    now = datetime.utcnow()
+    complaint.update({
+        "status"      : "duplicate",
+        "duplicate_of": original["_id"],
+        "similarity"  : round(original["similarity"], 3),
+        "urgency"     : original.get("urgency", 0),
+    })
+    complaint["timeline"].append({
+        "status": "Merged",
+        "date"  : now.isoformat(),
+        "done"  : True,
+        "by"    : "System (duplicate report)"
+    })
+    result = db.complaints.insert_one(complaint)
+
+    db.complaints.update_one(
+        {"_id": original["_id"]},
+        {"$inc" : {"duplicate_count": 1},
+         "$push": {"duplicate_ids": result.inserted_id},
+         "$set" : {"last_reported_at": now}}
+    )
+    metrics.inc("duplicate_complaints_total")
+    print(f"🔁 Complaint {result.inserted_id} linked to {original['_id']} "
+          f"(similarity {original['similarity']:.2f})")
+    return str(result.inserted_id)
+
+
+def attach_duplicate_image(duplicate_id: str, original_id: str, image_bytes: bytes) -> Optional[str]:
+    """
+    Upload the photo of a linked duplicate report (run on the upload pool)
+    and keep it: on the duplicate itself, in the original's
+    duplicate_images, and as the original's image_url if it had none.
+    """
+    try:
+        image_url = upload_image(BytesIO(image_bytes))
+    except Exception as e:
+        print(f"⚠️ Duplicate image upload error ({duplicate_id}): {e}")
+        return None
+
+    db = get_db()
+    db.complaints.update_one({"_id": ObjectId(duplicate_id)}, {"$set": {"image_url": image_url}})
+    db.complaints.update_one({"_id": ObjectId(original_id)}, {"$push": {"duplicate_images": image_url}})
+    db.complaints.update_one({"_id": ObjectId(original_id), "image_url": None}, {"$set": {"image_url": image_url}})
+    return image_url
+
+
+def notify_officers(db, complaint_id: str, category: str, location: str,
+                    urgency: int, assigned_officer_info: Optional[Dict]) -> int:
+    """
+    Queue a new-complaint notification for the assigned officer, or for
+    every officer if unassigned (one send per department topic, plus direct
+    sends to officers not subscribed to one). Returns the number of targets.
+    """
+    topics = []
+    if assigned_officer_info:
+        assigned_doc = db.users.find_one({"_id": ObjectId(assigned_officer_info["officer_id"])}, {"fcm_token": 1})
+        officer_tokens = [assigned_doc.get("fcm_token")] if assigned_doc else []
+    else:
+        topics, officer_tokens = broadcast_targets(db)
+
+    title, body, data = firebase_service.new_complaint_message(complaint_id, category, location, urgency)
+    return notification_outbox.enqueue(db, officer_tokens, title, body, data, kind="new_complaint", topics=topics)
+
+
+# ── Async pipeline ────────────────────────────────────────────────
+# Every run of the pipeline holds the complaint under processing.owner, a
+# token set at insert and replaced by the sweep when it re-queues a stuck
+# complaint. All pipeline writes are conditional on it, so a run that was
+# superseded (its lease ran out while it was still working) stops at its
+# next write instead of racing the new run.
+class PipelineSuperseded(Exception):
+    """The complaint is no longer "processing" under this run's owner token."""
+
+
+def new_owner_token() -> str:
+    return uuid.uuid4().hex
+
+
+def _owned(complaint_oid: ObjectId, owner: Optional[str]) -> Dict:
+    return {"_id": complaint_oid, "processing.state": "processing", "processing.owner": owner}
+
+
+def _owned_update(db, complaint_oid: ObjectId, owner: Optional[str], update: Dict):
+    if db.complaints.update_one(_owned(complaint_oid, owner), update).matched_count == 0:
+        raise PipelineSuperseded(str(complaint_oid))
+
+
+def _renew_lease(db, complaint_oid: ObjectId, owner: Optional[str]) -> Dict:
+    complaint = db.complaints.find_one_and_update(
+        _owned(complaint_oid, owner),
+        {"$set": {"processing.lease_until": datetime.utcnow() + PIPELINE_STUCK_AFTER}},
+    )
+    if complaint is None:
+        raise PipelineSuperseded(str(complaint_oid))
+    return complaint
+
+
+def _record_stage(db, complaint_oid: ObjectId, owner: Optional[str], stage: str, status: str, **fields):
+    _owned_update(db, complaint_oid, owner, {"$set": {f"processing.stages.{stage}": {
+        "status"     : status,
+        "finished_at": datetime.utcnow().isoformat(),
+        **fields
+    }}})
+
+
+def process_complaint(complaint_id: str, image_bytes: Optional[bytes] = None, owner: Optional[str] = None):
+    """
+    Run upload → scoring → assignment → notification for a complaint that
+    was inserted in the "processing" state. Every stage writes its result
+    to processing.stages.<stage> so clients can poll GET /api/complaints/<id>.
+    Raises PipelineSuperseded as soon as `owner` no longer holds the complaint.
+    """
+    db  = get_db()
+    oid = ObjectId(complaint_id)
+
+    # Renew the lease now that a worker holds the complaint
+    complaint = _renew_lease(db, oid, owner)
+
+    category    = complaint.get("category", "")
+    description = complaint.get("description", "")
+    location    = complaint.get("location", "")
+    processing  = complaint.get("processing", {})
+    done        = {name for name, stage in processing.get("stages", {}).items() if stage.get("status") == "done"}
+    failed      = False
+
+    # 1️⃣ Upload (a re-run after a restart has no bytes: reuse the URL, or
+    # report the image lost if it never reached Cloudinary)
+    image_url = complaint.get("image_url")
+    if image_url:
+        _record_stage(db, oid, owner, "upload", "done", image_url=image_url)
+    elif image_bytes:
+        try:
+            image_url = upload_image(BytesIO(image_bytes))
+        except Exception as e:
+            print(f"⚠️ Pipeline upload error ({complaint_id}): {e}")
+            _record_stage(db, oid, owner, "upload", "failed", error=str(e))
+            failed = True
+        else:
+            _owned_update(db, oid, owner, {"$set": {"image_url": image_url}})
+            _record_stage(db, oid, owner, "upload", "done", image_url=image_url)
+    elif processing.get("has_image"):
+        _record_stage(db, oid, owner, "upload", "failed", error="image lost before upload (worker restarted)")
+        failed = True
+    else:
+        _record_stage(db, oid, owner, "upload", "skipped")
+
+    # 2️⃣ Scoring
+    urgency = 0
+    _renew_lease(db, oid, owner)
+    try:
+        scores, pending = score_complaint(description, image_url, image_bytes, category)
+    except Exception as e:
+        print(f"⚠️ Pipeline scoring error ({complaint_id}): {e}")
+        _record_stage(db, oid, owner, "scoring", "failed", error=str(e))
+        failed = True
+    else:
+        urgency = scores["urgency"]
+        _owned_update(db, oid, owner, {"$set": {"urgency": urgency, "scoring": scores,
+                                                "image_score_pending": scores["image_pending"]}})
+        _record_stage(db, oid, owner, "scoring", "done", **scores)
+        if pending:
+            apply_late_stages(complaint_id, scores, pending)
+
+    # 3️⃣ Assignment (not repeated on a re-run — it moves workload counters;
+    # the lease is checked right before so a superseded run cannot assign)
+    assigned_officer_info = complaint.get("assigned_officer")
+    if "assignment" not in done:
+        _renew_lease(db, oid, owner)
+        try:
+            assigned_officer_info = auto_assign_officer(db, oid, category)
+        except Exception as e:
+            print(f"⚠️ Pipeline assignment error ({complaint_id}): {e}")
+            _record_stage(db, oid, owner, "assignment", "failed", error=str(e))
+            failed = True
+        else:
+            _record_stage(db, oid, owner, "assignment", "done", assigned_officer=assigned_officer_info)
+
+    # 4️⃣ Notification
+    if "notification" not in done:
+        _renew_lease(db, oid, owner)
+        try:
+            queued = notify_officers(db, complaint_id, category, location, urgency, assigned_officer_info)
+        except Exception as e:
+            print(f"⚠️ Pipeline notification error ({complaint_id}): {e}")
+            _record_stage(db, oid, owner, "notification", "failed", error=str(e))
+            failed = True
+        else:
+            _record_stage(db, oid, owner, "notification", "done", queued=queued)
+
+    state = "failed" if failed else "completed"
+    _owned_update(db, oid, owner, {
+        "$set": {
+            "processing.state"      : state,
+            "processing.finished_at": datetime.utcnow().isoformat(),
+        },
+        "$unset": {"processing.lease_until": "", "processing.owner": ""}
+    })
+    print(f"✅ Pipeline finished for {complaint_id}: {state}")
+
+
+def _run_safely(complaint_id: str, image_bytes: Optional[bytes], owner: Optional[str]):
+    try:
+        process_complaint(complaint_id, image_bytes, owner)
+    except PipelineSuperseded:
+        # Re-queued by the sweep (or finished/deleted meanwhile); the
+        # current owner reports the outcome
+        metrics.inc("complaint_pipeline_superseded_total")
+        print(f"⚠️ Pipeline run for {complaint_id} was superseded, stopping")
+    except Exception as e:
+        print(f"❌ Pipeline crashed for {complaint_id}: {e}")
+        traceback.print_exc()
+        try:
+            get_db().complaints.update_one(
+                _owned(ObjectId(complaint_id), owner),
+                {"$set": {"processing.state": "failed", "processing.error": str(e)},
+                 "$unset": {"processing.lease_until": "", "processing.owner": ""}}
+            )
+        except Exception:
+            pass
+    finally:
+        _slots.release()
+
+
+def reserve_pipeline_slot() -> bool:
+    """
+    Take one of the PIPELINE_QUEUE_SIZE slots before inserting an async
+    complaint; False means the worker is saturated and /submit should 503.
+    The slot is handed to enqueue_complaint(), or given back with
+    release_pipeline_slot() if the complaint is never enqueued.
+    """
+    _check_fork()
+    if _slots.acquire(blocking=False):
+        return True
+    metrics.inc("complaint_pipeline_rejected_total")
+    return False
+
+
+def release_pipeline_slot():
+    _slots.release()
+
+
+def enqueue_complaint(complaint_id: str, owner: str, image_bytes: Optional[bytes] = None):
+    """
+    Hand a freshly inserted complaint (holding a reserved slot) to the
+    worker pool; `owner` is the processing.owner token it was stored with.
+    """
+    return _get_executor().submit(_run_safely, complaint_id, image_bytes, owner)
+
+
+# ── Recovery of complaints lost with a worker ─────────────────────
+def recover_stuck_complaints(db, limit: int = 50) -> Dict:
+    """
+    Re-queue complaints whose worker died mid-pipeline (still "processing"
+    with an expired lease, or none and older than PIPELINE_STUCK_AFTER),
+    or mark them failed after PIPELINE_MAX_ATTEMPTS runs. Each one is
+    claimed atomically, so every worker can sweep at the same time.
+    """
+    requeued, abandoned = 0, 0
+    while requeued + abandoned < limit:
+        now   = datetime.utcnow()
+        owner = new_owner_token()
+        if not reserve_pipeline_slot():
+            break   # saturated; the next sweep picks up the rest
+        complaint = db.complaints.find_one_and_update(
+            {"processing.state": "processing",
+             "$or": [{"processing.lease_until": {"$lt": now}},
+                     {"processing.lease_until": {"$exists": False}, "created_at": {"$lt": now - PIPELINE_STUCK_AFTER}}]},
+            {"$set": {"processing.lease_until": now + PIPELINE_STUCK_AFTER, "processing.owner": owner},
+             "$inc": {"processing.attempts": 1}},
+            projection={"processing.attempts": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if complaint is None:
+            release_pipeline_slot()
+            break
+
+        complaint_id = str(complaint["_id"])
+        # attempts counts re-runs; the original run is not counted
+        if complaint["processing"]["attempts"] >= PIPELINE_MAX_ATTEMPTS:
+            release_pipeline_slot()
+            db.complaints.update_one(
+                _owned(complaint["_id"], owner),
+                {"$set": {"processing.state": "failed", "processing.error": "abandoned after worker restarts",
+                          "processing.finished_at": now.isoformat()},
+                 "$unset": {"processing.lease_until": "", "processing.owner": ""}}
+            )
+            abandoned += 1
+            print(f"❌ Pipeline gave up on {complaint_id} after {PIPELINE_MAX_ATTEMPTS} re-runs")
+            continue
+
+        enqueue_complaint(complaint_id, owner)
+        requeued += 1
+        print(f"🔁 Pipeline re-queued stuck complaint {complaint_id}")
+
+    if requeued or abandoned:
+        metrics.inc("complaint_pipeline_requeued_total", requeued)
+        metrics.inc("complaint_pipeline_abandoned_total", abandoned)
+    return {"requeued": requeued, "abandoned": abandoned}
+
+
+_sweeper_lock = threading.Lock()
+_sweeper_pid  = None
+
+
+def start_recovery_sweeper():
+    """
+    Sweep for stuck complaints every PIPELINE_SWEEP_SEC, once per process.
+    Call it from a serving process (gunicorn post_fork, or `python app.py`),
+    never from the gunicorn master.
+    """
+    global _sweeper_pid
+    if not ASYNC_SUBMISSION or _sweeper_pid == os.getpid():
+        return
+    with _sweeper_lock:
+        if _sweeper_pid == os.getpid():
+            return
+
+        def _loop():
+            while True:
+                try:
+                    db = get_db()
+                    if db is not None:
+                        recover_stuck_complaints(db)
+                except Exception as e:
+                    print(f"⚠️ Pipeline recovery sweep failed: {e}")
+                time.sleep(PIPELINE_SWEEP_SEC)
+
+        threading.Thread(target=_loop, name="complaint-pipeline-sweeper", daemon=True).start()
+        _sweeper_pid = os.getpid()
@@ -53,6 +53,16 @@ def get_db():
         init_db()
     return db
 
+def ping_db() -> bool:
+    """True when the MongoDB connection is initialised and answering."""
+    if client is None or db is None:
+        return False
+    try:
+        client.admin.command('ping')
+        return True
+    except Exception:
+        return False
+
 def create_indexes():
     global db
 
@@ -61,12 +71,30 @@ def create_indexes():
         db.users.create_index('email', unique=True)
         db.users.create_index('phone')
         db.users.create_index('role')
+        # Least-loaded officer lookup for auto-assignment
+        db.users.create_index([('role', 1), ('department', 1), ('open_complaints', 1)])
 
         # Complaints collection indexes
         db.complaints.create_index('user_id')
         db.complaints.create_index('status')
         db.complaints.create_index('category')
         db.complaints.create_index('created_at')
+        db.complaints.create_index([('assigned_officer.officer_id', 1), ('status', 1)])
+        # Async pipeline recovery sweep
+        db.complaints.create_index([('processing.state', 1), ('processing.lease_until', 1)])
+
+        # Gemini image analysis cache — documents expire at expires_at
+        db.image_analysis_cache.create_index('expires_at', expireAfterSeconds=0)
+
+        # Shadow model comparisons — queried per candidate, expire at expires_at
+        db.model_shadow_scores.create_index([('shadow_version', 1), ('created_at', -1)])
+        db.model_shadow_scores.create_index('expires_at', expireAfterSeconds=0)
+
+        # Notification outbox — dispatcher claims, monitoring, expiry of finished messages
+        db.notification_outbox.create_index([('status', 1), ('next_attempt_at', 1)])
+        db.notification_outbox.create_index([('status', 1), ('created_at', 1)])
+        db.notification_outbox.create_index([('status', 1), ('delivered_at', -1)])
+        db.notification_outbox.create_index('expires_at', expireAfterSeconds=0)
 
         print("✅ Database indexes created")
     except Exception as e:
@@ -0,0 +1,258 @@
+# utils/duplicate_detector.py
+
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+
+from utils.keyword_rules import split_words
+from utils.metrics import metrics
+
+# ── Configuration ─────────────────────────────────────────────────
+# A new complaint is a duplicate of a recent open one in the same category
+# when their descriptions' estimated Jaccard similarity is at least
+# DUPLICATE_THRESHOLD and they lie in the same or a neighbouring geohash
+# cell (precision 7 ≈ 150 m). Complaints without coordinates are never
+# matched.
+DUPLICATE_DETECTION = os.getenv("DUPLICATE_DETECTION", "True") == "True"
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+DUPLICATE_WINDOW    = timedelta(hours=float(os.getenv("DUPLICATE_WINDOW_HOURS", "72")))
+DUPLICATE_MAX_ITEMS = int(os.getenv("DUPLICATE_MAX_ITEMS", "50000"))
+DUPLICATE_SYNC_SEC  = float(os.getenv("DUPLICATE_SYNC_SECONDS", "30"))
+# Each sync re-reads this much before the newest complaint it has seen, so
+# ObjectIds from other workers that land slightly out of order (clock skew,
+# one-second timestamp resolution) are still picked up
+DUPLICATE_SYNC_OVERLAP = timedelta(seconds=float(os.getenv("DUPLICATE_SYNC_OVERLAP_SECONDS", "30")))
+GEOHASH_PRECISION   = int(os.getenv("DUPLICATE_GEOHASH_PRECISION", "7"))
+
+NUM_PERM = 64
+BANDS    = 16           # 16 bands x 4 rows: pairs at Jaccard 0.6 collide in some band ~89% of the time
+ROWS     = NUM_PERM // BANDS
+
+_MERSENNE = (1 << 61) - 1
+_rng      = np.random.RandomState(20240611)
+_PERM_A   = _rng.randint(1, 1 << 31, size=NUM_PERM).astype(np.uint64)
+_PERM_B   = _rng.randint(0, 1 << 31, size=NUM_PERM).astype(np.uint64)
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+# ── Geohash ───────────────────────────────────────────────────────
+def geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def _cell_size(precision: int):
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def neighbour_cells(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> List[str]:
+    """The point's geohash cell and the 8 around it."""
+    dlat, dlon = _cell_size(precision)
+    cells = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            cell = geohash(max(-90.0, min(90.0, lat + i * dlat)),
+                           (lon + j * dlon + 180.0) % 360.0 - 180.0, precision)
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+# ── MinHash ───────────────────────────────────────────────────────
+def shingles(text: str) -> List[int]:
+    """32-bit hashes of the word unigrams and bigrams of a description."""
+    words = split_words(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return list({zlib.crc32(g.encode("utf-8")) for g in grams})
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    hashes = shingles(text)
+    if not hashes:
+        return None
+    h = np.array(hashes, dtype=np.uint64)[:, None]
+    return ((h * _PERM_A + _PERM_B) % _MERSENNE).min(axis=0)
+
+
+def band_keys(signature: np.ndarray) -> List[bytes]:
+    return [signature[b * ROWS:(b + 1) * ROWS].tobytes() for b in range(BANDS)]
+
+
+class Fingerprint:
+    """MinHash signature, LSH band keys and geohash cell of one complaint."""
+
+    __slots__ = ("signature", "bands", "cell", "lat", "lon")
+
+    def __init__(self, signature: np.ndarray, lat: float, lon: float):
+        self.signature = signature
+        self.bands     = band_keys(signature)
+        self.cell      = geohash(lat, lon)
+        self.lat       = lat
+        self.lon       = lon
+
+    @classmethod
+    def of(cls, description: str, latitude: Optional[float], longitude: Optional[float]) -> Optional["Fingerprint"]:
+        if latitude is None or longitude is None:
+            return None
+        signature = minhash(description or "")
+        return cls(signature, latitude, longitude) if signature is not None else None
+
+    def to_doc(self) -> Dict:
+        """Stored on the complaint as `dedupe` so other workers can index it."""
+        return {"signature": [int(v) for v in self.signature], "cell": self.cell}
+
+    def similarity(self, other: "Fingerprint") -> float:
+        return float(np.count_nonzero(self.signature == other.signature)) / NUM_PERM
+
+
+class DuplicateDetector:
+    """
+    In-process LSH index of recent complaints, partitioned by geohash cell.
+
+    Buckets are keyed by (cell, band, band rows), so a lookup touches at
+    most 9 cells x 16 bands dict entries and compares signatures only with
+    complaints that share a band nearby. Entries older than the window or
+    beyond DUPLICATE_MAX_ITEMS are evicted oldest first.
+
+    Each worker keeps its own index and pulls complaints indexed by other
+    workers from MongoDB (the `dedupe` field) every DUPLICATE_SYNC_SECONDS.
+    Progress is tracked by _id, which is assigned at insert time, not by
+    created_at, which the sync submit path sets seconds before the insert.
+    """
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD, window: timedelta = DUPLICATE_WINDOW,
+                 max_items: int = DUPLICATE_MAX_ITEMS):
+        self.threshold = threshold
+        self.window    = window
+        self.max_items = max_items
+
+        self._lock      = threading.Lock()
+        self._entries   = OrderedDict()     # complaint_id → (fingerprint, category, created_at)
+        self._buckets   = {}                # (cell, band, band rows) → set of complaint_ids
+        self._synced_id = None              # _id of the newest complaint pulled from MongoDB
+        self._sync_mono = 0.0
+
+        metrics.register_gauge("duplicate_index_size", lambda: len(self._entries))
+
+    # ── index maintenance ────────────────────────────────────────
+    def _bucket_keys(self, fp: Fingerprint, cell: str):
+        return [(cell, band, key) for band, key in enumerate(fp.bands)]
+
+    def _remove(self, complaint_id: str):
+        fp, _, _ = self._entries.pop(complaint_id)
+        for key in self._bucket_keys(fp, fp.cell):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(complaint_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _evict(self, now: datetime):
+        cutoff = now - self.window
+        while self._entries:
+            oldest_id, (_, _, created_at) = next(iter(self._entries.items()))
+            if created_at >= cutoff and len(self._entries) <= self.max_items:
+                break
+            self._remove(oldest_id)
+
+    def add(self, complaint_id: str, fp: Optional[Fingerprint], category: str,
+            created_at: Optional[datetime] = None):
+        if fp is None:
+            return
+        created_at = created_at or datetime.utcnow()
+        with self._lock:
+            if complaint_id in self._entries:
+                return
+            self._entries[complaint_id] = (fp, (category or "").lower(), created_at)
+            for key in self._bucket_keys(fp, fp.cell):
+                self._buckets.setdefault(key, set()).add(complaint_id)
+            self._evict(datetime.utcnow())
+
+    def discard(self, complaint_id: str):
+        with self._lock:
+            if complaint_id in self._entries:
+                self._remove(complaint_id)
+
+    # ── lookup ───────────────────────────────────────────────────
+    def find(self, fp: Optional[Fingerprint], category: str) -> List[Dict]:
+        """
+        Candidates for `fp` in the same category, most similar first:
+        [{"complaint_id", "similarity"}] with similarity >= threshold.
+        """
+        if fp is None:
+            return []
+        start    = time.perf_counter()
+        category = (category or "").lower()
+
+        with self._lock:
+            seen = set()
+            for cell in neighbour_cells(fp.lat, fp.lon):
+                for key in self._bucket_keys(fp, cell):
+                    seen.update(self._buckets.get(key, ()))
+
+            matches = []
+            for complaint_id in seen:
+                other, other_category, _ = self._entries[complaint_id]
+                if other_category != category:
+                    continue
+                similarity = fp.similarity(other)
+                if similarity >= self.threshold:
+                    matches.append({"complaint_id": complaint_id, "similarity": similarity})
+
+        metrics.observe("duplicate_lookup_ms", (time.perf_counter() - start) * 1000)
+        return sorted(matches, key=lambda m: -m["similarity"])
+
+    # ── cross-worker sync ────────────────────────────────────────
+    def sync(self, db, force: bool = False):
+        """Pull complaints indexed by other workers since the last sync."""
+        now_mono = time.monotonic()
+        if db is None or (not force and now_mono - self._sync_mono < DUPLICATE_SYNC_SEC):
+            return
+        self._sync_mono = now_mono
+
+        if self._synced_id is None:
+            since = ObjectId.from_datetime(datetime.utcnow() - self.window)
+        else:
+            since = ObjectId.from_datetime(self._synced_id.generation_time - DUPLICATE_SYNC_OVERLAP)
+        try:
+            docs = db.complaints.find(
+                {"_id": {"$gt": since}, "dedupe": {"$exists": True}},
+                {"dedupe": 1, "category": 1, "created_at": 1, "latitude": 1, "longitude": 1},
+            ).sort("_id", 1)
+            for doc in docs:
+                # add() skips complaints already indexed (the overlap re-reads some)
+                fp = Fingerprint(np.array(doc["dedupe"]["signature"], dtype=np.uint64),
+                                 doc["latitude"], doc["longitude"])
+                self.add(str(doc["_id"]), fp, doc.get("category", ""), doc["created_at"])
+                if self._synced_id is None or doc["_id"] > self._synced_id:
+                    self._synced_id = doc["_id"]
+        except Exception as e:
+            print(f"⚠️ Duplicate index sync failed: {e}")
+
+
+duplicate_detector = DuplicateDetector()
@@ -2,9 +2,61 @@
 import os
 import json
 import tempfile
+import threading
+import time
 import requests
-from typing import List, Dict, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+
+from utils.metrics import metrics
+
+FCM_SCOPES = ["https://www.googleapis.com/auth/firebase.messaging"]
+
+# Refresh the cached OAuth token this long before it expires
+TOKEN_REFRESH_MARGIN = timedelta(seconds=float(os.getenv("FCM_TOKEN_REFRESH_MARGIN_SECONDS", "300")))
+
+# Outbound HTTP to FCM: one keep-alive pool per process
+FCM_BASE_URL        = os.getenv("FCM_BASE_URL", "https://fcm.googleapis.com")
+FCM_POOL_SIZE       = int(os.getenv("FCM_POOL_SIZE", "20"))
+FCM_CONNECT_TIMEOUT = float(os.getenv("FCM_CONNECT_TIMEOUT", "3"))
+FCM_READ_TIMEOUT    = float(os.getenv("FCM_READ_TIMEOUT", "10"))
+FCM_MAX_RETRIES     = int(os.getenv("FCM_MAX_RETRIES", "2"))
+
+# Topic subscriptions are managed through the Instance ID API
+FCM_IID_URL = os.getenv("FCM_IID_URL", "https://iid.googleapis.com")
+
+# send_to_multiple(): concurrent sends on a bounded pool, all within a deadline
+FCM_FANOUT_CONCURRENT = os.getenv("FCM_FANOUT_CONCURRENT", "True") == "True"
+FCM_FANOUT_WORKERS    = int(os.getenv("FCM_FANOUT_WORKERS", "8"))
+FCM_FANOUT_DEADLINE   = float(os.getenv("FCM_FANOUT_DEADLINE_SECONDS", "10"))
+
+
+def _build_session(pool_size: int = FCM_POOL_SIZE, max_retries: int = FCM_MAX_RETRIES) -> requests.Session:
+    """
+    Keep-alive session for FCM sends. Connection errors, 429 and 5xx are
+    retried up to max_retries times with exponential backoff (honouring
+    Retry-After), as FCM recommends for these responses. Read errors and
+    timeouts are not: FCM may already have accepted the message, and a
+    resend would notify twice (the notification outbox retries those).
+    """
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=max_retries,
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 
 def _write_firebase_credentials() -> Optional[str]:
@@ -32,31 +84,67 @@ def _write_firebase_credentials() -> Optional[str]:
 class FirebaseService:
     def __init__(self):
         self.credentials_path = _write_firebase_credentials()
-        self.fcm_url = "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
+        self.fcm_url = FCM_BASE_URL + "/v1/projects/{project_id}/messages:send"
+        self.session = _build_session()
+
+        # Read once; send_notification() no longer touches the credentials file
+        self.project_id = self._read_project_id()
+
+        # One service-account credential per process; its token is shared by
+        # every thread and only refreshed when close to expiry
+        self._credentials = None
+        self._token_lock  = threading.Lock()
+
+        self._fanout_executor = None
+        self._fanout_pid      = None
+
+    def is_ready(self) -> bool:
+        return self.credentials_path is not None
+
+    def _token_fresh(self) -> bool:
+        creds = self._credentials
+        if creds is None or not creds.token or creds.expiry is None:
+            return False
+        # google-auth expiry is a naive UTC datetime
+        return creds.expiry - TOKEN_REFRESH_MARGIN > datetime.utcnow()
 
     def _get_access_token(self) -> Optional[str]:
         if not self.credentials_path:
             print("❌ No Firebase credentials available")
             return None
-        try:
-            from google.auth.transport.requests import Request
-            from google.oauth2 import service_account
-
-            credentials = service_account.Credentials.from_service_account_file(
-                self.credentials_path,
-                scopes=["https://www.googleapis.com/auth/firebase.messaging"]
-            )
-            credentials.refresh(Request())
-            return credentials.token
-
-        except FileNotFoundError:
-            print(f"❌ Firebase credentials file not found: {self.credentials_path}")
-            return None
-        except Exception as e:
-            print(f"❌ Error getting Firebase access token: {e}")
-            return None
 
-    def _get_project_id(self) -> Optional[str]:
+        if self._token_fresh():
+            return self._credentials.token
+
+        with self._token_lock:
+            # Another thread may have refreshed while we waited
+            if self._token_fresh():
+                return self._credentials.token
+            try:
+                from google.auth.transport.requests import Request
+                from google.oauth2 import service_account
+
+                if self._credentials is None:
+                    self._credentials = service_account.Credentials.from_service_account_file(
+                        self.credentials_path, scopes=FCM_SCOPES
+                    )
+
+                start = time.perf_counter()
+                self._credentials.refresh(Request())
+                metrics.observe("fcm_token_refresh_ms", (time.perf_counter() - start) * 1000)
+                metrics.inc("fcm_token_refreshes_total")
+                return self._credentials.token
+
+            except FileNotFoundError:
+                metrics.inc("fcm_token_refresh_failures_total")
+                print(f"❌ Firebase credentials file not found: {self.credentials_path}")
+                return None
+            except Exception as e:
+                metrics.inc("fcm_token_refresh_failures_total")
+                print(f"❌ Error getting Firebase access token: {e}")
+                return None
+
+    def _read_project_id(self) -> Optional[str]:
         if not self.credentials_path:
             return None
         try:
@@ -66,6 +154,9 @@ class FirebaseService:
             print(f"❌ Error reading project ID: {e}")
             return None
 
+    def _get_project_id(self) -> Optional[str]:
+        return self.project_id
+
     def send_notification(
             self,
             token: str,
@@ -73,20 +164,47 @@ class FirebaseService:
             body: str,
             data: Optional[Dict] = None
     ) -> bool:
+        return self.send_notification_result(token, title, body, data)["ok"]
 
+    def send_notification_result(
+            self,
+            token: str,
+            title: str,
+            body: str,
+            data: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Send one message and report what happened:
+        {"ok": bool, "status": HTTP status or None, "error": str or None}.
+        FCM answers 404 (UNREGISTERED) for tokens that should be dropped.
+        """
         if not token:
             print("⚠️ No FCM token provided")
-            return False
+            return {"ok": False, "status": None, "error": "no_token"}
+        return self._send({"token": token}, title, body, data)
 
+    def send_to_topic_result(
+            self,
+            topic: str,
+            title: str,
+            body: str,
+            data: Optional[Dict] = None
+    ) -> Dict:
+        """One send reaching every device subscribed to `topic`; same result shape."""
+        if not topic:
+            return {"ok": False, "status": None, "error": "no_topic"}
+        return self._send({"topic": topic}, title, body, data)
+
+    def _send(self, target: Dict, title: str, body: str, data: Optional[Dict]) -> Dict:
         access_token = self._get_access_token()
         if not access_token:
             print("⚠️ Could not get Firebase access token")
-            return False
+            return {"ok": False, "status": None, "error": "no_access_token"}
 
         project_id = self._get_project_id()
         if not project_id:
             print("⚠️ Could not get Firebase project ID")
-            return False
+            return {"ok": False, "status": None, "error": "no_project_id"}
 
         try:
             url = self.fcm_url.format(project_id=project_id)
@@ -107,7 +225,7 @@ class FirebaseService:
 
             message = {
                 "message": {
-                    "token": token,
+                    **target,
 
                     # ✅ NOTIFICATION PAYLOAD - Makes it appear in system tray
                     "notification": {
@@ -149,25 +267,129 @@ class FirebaseService:
             }
 
             print(f"📤 Sending FCM notification:")
-            print(f"   Token: {token[:30]}...")
+            if "token" in target:
+                print(f"   Token: {target['token'][:30]}...")
+            else:
+                print(f"   Topic: {target['topic']}")
             print(f"   Title: {title}")
             print(f"   Body: {body}")
 
-            response = requests.post(url, headers=headers, json=message)
+            response = self.session.post(url, headers=headers, json=message,
+                                         timeout=(FCM_CONNECT_TIMEOUT, FCM_READ_TIMEOUT))
 
+            metrics.inc("fcm_sends_total", labels={"status": str(response.status_code)})
             if response.status_code == 200:
                 print(f"✅ Notification sent successfully!")
-                return True
+                return {"ok": True, "status": 200, "error": None}
             else:
                 print(f"❌ Failed to send notification: {response.status_code}")
                 print(f"   Response: {response.text}")
-                return False
+                return {"ok": False, "status": response.status_code, "error": response.text[:200]}
 
         except Exception as e:
             print(f"❌ Error sending notification: {e}")
             import traceback
             traceback.print_exc()
-            return False
+            return {"ok": False, "status": None, "error": str(e)}
+
+    # ================= TOPIC SUBSCRIPTIONS =================
+
+    def _manage_topic(self, action: str, tokens: List[str], topic: str) -> List[str]:
+        """
+        Instance ID batchAdd / batchRemove, 1000 tokens per call.
+        Returns the tokens it succeeded for.
+        """
+        tokens = [t for t in tokens if t]
+        if not tokens or not topic:
+            return []
+        access_token = self._get_access_token()
+        if not access_token:
+            return []
+
+        url = f"{FCM_IID_URL}/iid/v1:{action}"
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+            "access_token_auth": "true",
+        }
+        done = []
+        for i in range(0, len(tokens), 1000):
+            chunk = tokens[i:i + 1000]
+            try:
+                response = self.session.post(
+                    url, headers=headers,
+                    json={"to": f"/topics/{topic}", "registration_tokens": chunk},
+                    timeout=(FCM_CONNECT_TIMEOUT, FCM_READ_TIMEOUT)
+                )
+                metrics.inc("fcm_topic_requests_total", labels={"action": action, "status": str(response.status_code)})
+                if response.status_code != 200:
+                    print(f"❌ Topic {action} for '{topic}' failed: {response.status_code} {response.text[:200]}")
+                    continue
+                results = response.json().get("results", [])
+                done += [t for t, r in zip(chunk, results) if "error" not in r]
+            except Exception as e:
+                print(f"❌ Topic {action} for '{topic}' failed: {e}")
+        return done
+
+    def subscribe_to_topic(self, tokens: List[str], topic: str) -> List[str]:
+        return self._manage_topic("batchAdd", tokens, topic)
+
+    def unsubscribe_from_topic(self, tokens: List[str], topic: str) -> List[str]:
+        return self._manage_topic("batchRemove", tokens, topic)
+
+    def _get_fanout_executor(self) -> ThreadPoolExecutor:
+        # Rebuilt after a fork: the parent's worker threads don't exist in the child
+        if self._fanout_executor is None or self._fanout_pid != os.getpid():
+            self._fanout_executor = ThreadPoolExecutor(
+                max_workers=FCM_FANOUT_WORKERS,
+                thread_name_prefix="fcm-fanout"
+            )
+            self._fanout_pid = os.getpid()
+        return self._fanout_executor
+
+    def fan_out(
+            self,
+            tokens: List[str],
+            title: str,
+            body: str,
+            data: Optional[Dict] = None,
+            deadline: float = FCM_FANOUT_DEADLINE
+    ) -> Dict[str, Dict]:
+        """
+        Send one message to many tokens on a bounded worker pool and return
+        {token: send_notification_result(...)}. Sends still queued when
+        `deadline` seconds have passed are cancelled and reported with error
+        "deadline_unsent"; ones already in flight finish alone and are
+        reported with error "deadline" (FCM may still accept them).
+        """
+        tokens = list(dict.fromkeys(t for t in tokens if t))
+        start  = time.perf_counter()
+
+        if not FCM_FANOUT_CONCURRENT or len(tokens) <= 1:
+            results = {t: self.send_notification_result(t, title, body, data) for t in tokens}
+        else:
+            executor = self._get_fanout_executor()
+            futures  = {executor.submit(self.send_notification_result, t, title, body, data): t for t in tokens}
+            done, not_done = wait(futures, timeout=deadline)
+
+            results = {}
+            for future, token in futures.items():
+                if future in done:
+                    try:
+                        results[token] = future.result()
+                    except Exception as e:
+                        results[token] = {"ok": False, "status": None, "error": str(e)}
+                else:
+                    error = "deadline_unsent" if future.cancel() else "deadline"
+                    results[token] = {"ok": False, "status": None, "error": error}
+            if not_done:
+                metrics.inc("fcm_fanout_deadline_missed_total", len(not_done))
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.observe("fcm_fanout_ms", elapsed_ms)
+        sent = sum(r["ok"] for r in results.values())
+        print(f"📊 Sent to {sent}/{len(tokens)} devices in {elapsed_ms:.0f} ms")
+        return results
 
     def send_to_multiple(
             self,
@@ -176,25 +398,16 @@ class FirebaseService:
             body: str,
             data: Optional[Dict] = None
     ) -> int:
-        """Send notification to multiple tokens"""
-        success_count = 0
-        for token in tokens:
-            if self.send_notification(token, title, body, data):
-                success_count += 1
-        print(f"📊 Sent to {success_count}/{len(tokens)} devices")
-        return success_count
+        """Send notification to multiple tokens; returns how many were delivered"""
+        results = self.fan_out(tokens, title, body, data)
+        return sum(r["ok"] for r in results.values())
 
-    # ================= HELPER METHODS =================
+    # ================= MESSAGE BUILDERS =================
+    # (title, body, data) for each notification type, shared by the
+    # notify_* helpers below and by utils/notification_outbox.
 
-    def notify_new_complaint(
-            self,
-            officer_tokens: List[str],
-            complaint_id: str,
-            category: str,
-            location: str,
-            urgency: int
-    ) -> int:
-        """Notify officers of new complaint"""
+    @staticmethod
+    def new_complaint_message(complaint_id: str, category: str, location: str, urgency: int) -> Tuple[str, str, Dict]:
         title = "🚨 New Complaint Received"
         body = f"{category} complaint in {location} (Urgency: {urgency})"
         data = {
@@ -204,16 +417,10 @@ class FirebaseService:
             "urgency": str(urgency),
             "timestamp": datetime.utcnow().isoformat()
         }
-        return self.send_to_multiple(officer_tokens, title, body, data)
+        return title, body, data
 
-    def notify_status_update(
-            self,
-            user_token: str,
-            complaint_id: str,
-            new_status: str,
-            category: str
-    ) -> bool:
-        """Notify citizen of complaint status update"""
+    @staticmethod
+    def status_update_message(complaint_id: str, new_status: str, category: str) -> Tuple[str, str, Dict]:
         status_messages = {
             "in_progress": "🔨 Your complaint is now being worked on!",
             "resolved": "✅ Your complaint has been resolved! Please provide feedback.",
@@ -230,6 +437,44 @@ class FirebaseService:
             "category": category,
             "timestamp": datetime.utcnow().isoformat()
         }
+        return title, body, data
+
+    @staticmethod
+    def feedback_received_message(complaint_id: str, rating: int, category: str) -> Tuple[str, str, Dict]:
+        stars = "⭐" * rating
+        title = f"📊 Feedback Received {stars}"
+        body = f"You received a {rating}-star rating for {category} complaint"
+        data = {
+            "type": "feedback_received",
+            "complaint_id": complaint_id,
+            "rating": str(rating),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        return title, body, data
+
+    # ================= HELPER METHODS =================
+
+    def notify_new_complaint(
+            self,
+            officer_tokens: List[str],
+            complaint_id: str,
+            category: str,
+            location: str,
+            urgency: int
+    ) -> int:
+        """Notify officers of new complaint"""
+        title, body, data = self.new_complaint_message(complaint_id, category, location, urgency)
+        return self.send_to_multiple(officer_tokens, title, body, data)
+
+    def notify_status_update(
+            self,
+            user_token: str,
+            complaint_id: str,
+            new_status: str,
+            category: str
+    ) -> bool:
+        """Notify citizen of complaint status update"""
+        title, body, data = self.status_update_message(complaint_id, new_status, category)
 
         print(f"🔔 Sending status update notification:")
         print(f"   Status: {new_status}")
@@ -245,15 +490,7 @@ class FirebaseService:
             rating: int,
             category: str
     ) -> bool:
-        stars = "⭐" * rating
-        title = f"📊 Feedback Received {stars}"
-        body = f"You received a {rating}-star rating for {category} complaint"
-        data = {
-            "type": "feedback_received",
-            "complaint_id": complaint_id,
-            "rating": str(rating),
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        title, body, data = self.feedback_received_message(complaint_id, rating, category)
         return self.send_notification(officer_token, title, body, data)
 
 
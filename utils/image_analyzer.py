@@ -3,12 +3,30 @@
 from google import genai
 from google.genai import types
 import requests
+import hashlib
 import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from typing import Optional
 from PIL import Image
 from io import BytesIO
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils import database
+from utils.metrics import metrics
 
 # ── Configure ─────────────────────────────────────────────────────
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY", ""))
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")
+client = genai.Client(api_key=GEMINI_API_KEY)
+
+
+def is_configured() -> bool:
+    """The client object always exists; it can only call Gemini with a key."""
+    return bool(GEMINI_API_KEY.strip())
 
 PROMPT = """
 You are an AI analyzing a civic complaint image for a municipal system.
@@ -25,43 +43,200 @@ Scoring guide:
 - critical → BOOST 23-30 (fire, exposed wires, collapse, gas leak)
 """
 
-def analyze_complaint_image(image_url: str) -> dict:
-    if not image_url:
+# ── Analysis cache (MongoDB image_analysis_cache, keyed by sha256 of the bytes) ──
+CACHE_TTL      = timedelta(days=float(os.getenv("IMAGE_ANALYSIS_CACHE_TTL_DAYS", "30")))
+# How long a "pending" claim on a hash lasts without renewal before others
+# take over; the owner renews it every CACHE_LEASE / 3 while Gemini runs,
+# so only a dead owner's claim expires
+CACHE_LEASE    = timedelta(seconds=float(os.getenv("IMAGE_ANALYSIS_LEASE_SECONDS", "30")))
+CACHE_POLL_SEC = 0.25
+
+FAILED_RESULT = {"boost": 0, "analysis": "Analysis failed", "severity": "unknown"}
+
+_inflight      = {}
+_inflight_lock = threading.Lock()
+
+metrics.register_gauge("image_cache_hit_ratio", lambda: _hit_ratio())
+
+
+def _hit_ratio() -> float:
+    hits   = metrics.get("image_cache_hits_total")
+    misses = metrics.get("image_cache_misses_total")
+    return hits / (hits + misses) if (hits + misses) else 0.0
+
+
+def _result_of(doc) -> dict:
+    return {"boost": doc["boost"], "analysis": doc["analysis"], "severity": doc["severity"]}
+
+
+def _call_gemini(image_bytes: bytes) -> Optional[dict]:
+    image = Image.open(BytesIO(image_bytes))
+
+    # Send to Gemini
+    metrics.inc("gemini_calls_total")
+    response = client.models.generate_content(
+        model="gemini-2.0-flash",
+        contents=[PROMPT, image]
+    )
+    text = response.text.strip()
+
+    # Parse response
+    boost    = 0
+    analysis = "Image analyzed"
+    severity = "low"
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if line.startswith("BOOST:"):
+            try:
+                boost = int(line.split(":")[1].strip())
+                boost = max(0, min(30, boost))
+            except:
+                boost = 0
+        elif line.startswith("ISSUE:"):
+            analysis = line.split(":", 1)[1].strip()
+        elif line.startswith("SEVERITY:"):
+            severity = line.split(":", 1)[1].strip().lower()
+
+    print(f"🖼️  Image → severity={severity}, boost=+{boost}, issue={analysis}")
+    return {"boost": boost, "analysis": analysis, "severity": severity}
+
+
+def _heartbeat(cache, digest: str, claim: str, stop: threading.Event):
+    """Keep our "pending" claim alive until `stop` is set or the claim is lost."""
+    while not stop.wait(CACHE_LEASE.total_seconds() / 3):
+        now     = datetime.utcnow()
+        renewed = cache.update_one(
+            {"_id": digest, "state": "pending", "claim": claim},
+            {"$set": {"lease_until": now + CACHE_LEASE, "expires_at": now + CACHE_LEASE}},
+        )
+        if renewed.matched_count == 0:
+            return
+
+
+def _analyze_with_cache(digest: str, image_bytes: bytes) -> dict:
+    """
+    Cross-worker collapse: the first worker to claim the hash calls Gemini;
+    others wait for its result until the claim's lease runs out.
+    """
+    db = database.db
+    if db is None:
+        metrics.inc("image_cache_misses_total")
+        return _call_gemini(image_bytes)
+
+    cache = db.image_analysis_cache
+    claim = uuid.uuid4().hex
+
+    while True:
+        now = datetime.utcnow()
+        try:
+            doc = cache.find_one_and_update(
+                {"_id": digest},
+                {"$setOnInsert": {
+                    "state"      : "pending",
+                    "claim"      : claim,
+                    "lease_until": now + CACHE_LEASE,
+                    "created_at" : now,
+                    "expires_at" : now + CACHE_LEASE,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE,
+            )
+        except DuplicateKeyError:
+            # Another worker inserted the claim between our read and upsert
+            time.sleep(CACHE_POLL_SEC)
+            continue
+
+        if doc is not None and doc.get("state") == "done":
+            metrics.inc("image_cache_hits_total")
+            metrics.inc("gemini_calls_saved_total")
+            print(f"🖼️  Image analysis cache hit ({digest[:12]})")
+            return _result_of(doc)
+
+        if doc is not None and doc.get("lease_until", now) > now:
+            # Another worker is analysing this image right now; its heartbeat
+            # renews the lease, and we re-read it on every poll
+            time.sleep(CACHE_POLL_SEC)
+            continue
+
+        if doc is not None:
+            # Lease expired (owner died or timed out) — take it over, unless
+            # it was renewed or taken over since we read it
+            taken = cache.update_one(
+                {"_id": digest, "state": "pending",
+                 "lease_until": {"$eq": doc.get("lease_until"), "$lte": now}},
+                {"$set": {"claim": claim, "lease_until": now + CACHE_LEASE, "expires_at": now + CACHE_LEASE}},
+            )
+            if taken.modified_count == 0:
+                continue
+
+        break
+
+    # We own the claim
+    metrics.inc("image_cache_misses_total")
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(cache, digest, claim, stop),
+                     name="image-cache-heartbeat", daemon=True).start()
+    try:
+        result = _call_gemini(image_bytes)
+    except Exception:
+        cache.delete_one({"_id": digest, "state": "pending", "claim": claim})
+        raise
+    finally:
+        stop.set()
+
+    now = datetime.utcnow()
+    cache.update_one(
+        {"_id": digest},
+        {"$set": {**result, "state": "done", "created_at": now, "expires_at": now + CACHE_TTL},
+         "$unset": {"lease_until": "", "claim": ""}},
+    )
+    return result
+
+
+def _single_flight(digest: str, image_bytes: bytes) -> dict:
+    """In-process collapse: concurrent threads with the same hash share one call."""
+    with _inflight_lock:
+        future = _inflight.get(digest)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[digest] = future
+
+    if not leader:
+        metrics.inc("image_cache_collapsed_total")
+        metrics.inc("gemini_calls_saved_total")
+        return future.result()
+
+    try:
+        result = _analyze_with_cache(digest, image_bytes)
+        future.set_result(result)
+        return result
+    except Exception as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(digest, None)
+
+
+def analyze_complaint_image(image_url: Optional[str] = None, image_bytes: Optional[bytes] = None) -> dict:
+    """
+    Gemini severity analysis of a complaint image. Pass the raw bytes when
+    they are already in memory to skip re-downloading from Cloudinary.
+    """
+    if not image_url and not image_bytes:
         return {"boost": 0, "analysis": "No image", "severity": "none"}
 
     try:
-        # Download image from Cloudinary
-        resp  = requests.get(image_url, timeout=10)
-        image = Image.open(BytesIO(resp.content))
-
-        # Send to Gemini
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[PROMPT, image]
-        )
-        text = response.text.strip()
-
-        # Parse response
-        boost    = 0
-        analysis = "Image analyzed"
-        severity = "low"
-
-        for line in text.split('\n'):
-            line = line.strip()
-            if line.startswith("BOOST:"):
-                try:
-                    boost = int(line.split(":")[1].strip())
-                    boost = max(0, min(30, boost))
-                except:
-                    boost = 0
-            elif line.startswith("ISSUE:"):
-                analysis = line.split(":", 1)[1].strip()
-            elif line.startswith("SEVERITY:"):
-                severity = line.split(":", 1)[1].strip().lower()
-
-        print(f"🖼️  Image → severity={severity}, boost=+{boost}, issue={analysis}")
-        return {"boost": boost, "analysis": analysis, "severity": severity}
+        if image_bytes is None:
+            # Download image from Cloudinary
+            resp        = requests.get(image_url, timeout=10)
+            image_bytes = resp.content
+
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return _single_flight(digest, image_bytes)
 
     except Exception as e:
         print(f"⚠️  Image analysis error: {e}")
-        return {"boost": 0, "analysis": "Analysis failed", "severity": "unknown"}
\ No newline at end of file
+        return dict(FAILED_RESULT)
@@ -0,0 +1,100 @@
+# utils/inference_batcher.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Any, Optional
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item calls for up to max_wait_ms (or until
+    max_batch_size items are waiting), runs batch_fn once on the whole
+    batch and hands each caller its own result.
+
+    batch_fn must take a list of items and return a list of results in
+    the same order.
+    """
+
+    def __init__(
+            self,
+            batch_fn: Callable[[List[Any]], List[Any]],
+            max_batch_size: int = 32,
+            max_wait_ms: float = 5.0
+    ):
+        self.batch_fn       = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait       = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue  = queue.Queue()
+        self._lock   = threading.Lock()
+        self._thread = None
+        self._pid    = None
+
+        # Simple counters for benchmarking / monitoring
+        self.batches_run     = 0
+        self.items_processed = 0
+
+    def _ensure_worker(self):
+        # Start lazily, and again after a fork (threads don't survive fork)
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._queue  = queue.Queue()
+            self._pid    = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="ml-microbatcher", daemon=True
+            )
+            self._thread.start()
+
+    def submit_async(self, item) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def submit(self, item, timeout: Optional[float] = None):
+        """Block until the batch containing item has been processed."""
+        return self.submit_async(item).result(timeout=timeout)
+
+    def _collect(self):
+        item, future = self._queue.get()
+        batch    = [(item, future)]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches_run     += 1
+            self.items_processed += len(batch)
+
+    def stats(self) -> dict:
+        return {
+            "batches_run"    : self.batches_run,
+            "items_processed": self.items_processed,
+            "avg_batch_size" : (self.items_processed / self.batches_run) if self.batches_run else 0,
+        }
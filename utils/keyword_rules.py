@@ -0,0 +1,168 @@
+# utils/keyword_rules.py
+
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List
+
+from utils.metrics import metrics
+from utils.phrase_matcher import PhraseMatcher
+from utils.score_cache import file_fingerprint
+
+# Keyword tables for both rule engines (urgency_engine, priority_engine).
+# KEYWORD_RULES_PATH points at another file; edits are picked up within
+# KEYWORD_RULES_CHECK_INTERVAL seconds without a deploy.
+RULES_PATH           = os.getenv("KEYWORD_RULES_PATH",
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "keyword_rules.json"))
+RULES_CHECK_INTERVAL = float(os.getenv("KEYWORD_RULES_CHECK_INTERVAL", "10"))
+STEM_CACHE_SIZE      = int(os.getenv("STEM_CACHE_SIZE", "8192"))
+
+# Suffixes stem_word() strips, in the order it tries them
+_STEM_SUFFIXES = ("ous", "ed", "ing", "s")
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+
+def split_words(text: str) -> List[str]:
+    """
+    Lowercase, replace punctuation with spaces and split into words.
+    A keyword matches a run of these words exactly as rf"\b{keyword}\b"
+    would on the lowercased text.
+    """
+    return _PUNCTUATION.sub(' ', text.lower().strip()).split()
+
+
+def stem_word(word: str, stemming_rules: Dict[str, str]) -> str:
+    """Apply stemming rules to normalize words"""
+    if word in stemming_rules:
+        return stemming_rules[word]
+
+    if word.endswith('ous') and len(word) > 4:
+        return word[:-3]
+    if word.endswith('ed') and len(word) > 3:
+        return word[:-2]
+    if word.endswith('ing') and len(word) > 4:
+        return word[:-3]
+    if word.endswith('s') and len(word) > 2 and not word.endswith('ss'):
+        return word[:-1]
+
+    return word
+
+
+def build_stem_index(keywords: Dict, stemming_rules: Dict[str, str]) -> Dict[str, str]:
+    """
+    Every non-keyword token that stem_word() maps onto a keyword → that
+    keyword. A token stems either through an explicit rule or by losing
+    one suffix, so its candidates are the rule entries plus each keyword
+    with each suffix appended, each confirmed with stem_word(). Looking a
+    token up here gives the same answer as stemming it and checking the
+    keyword table.
+    """
+    candidates = set(stemming_rules)
+    for keyword in keywords:
+        candidates.update(keyword + suffix for suffix in _STEM_SUFFIXES)
+
+    index = {}
+    for token in candidates:
+        if token in keywords:
+            continue
+        stemmed = stem_word(token, stemming_rules)
+        if stemmed != token and stemmed in keywords:
+            index[token] = stemmed
+    return index
+
+
+class CompiledRules:
+    """
+    One immutable version of the rule file: the per-engine tables plus a
+    single PhraseMatcher over every keyword of both engines. Each match
+    value is the keyword itself; an engine keeps the ones in its own table.
+    The stem index and stem cache belong to the snapshot, so a reload of
+    the stemming rules never serves stale stems.
+    """
+
+    def __init__(self, data: Dict, version: str):
+        urgency  = data["urgency_engine"]
+        priority = data["priority_engine"]
+
+        self.version = version
+
+        self.urgency_keywords        = urgency["keywords"]
+        self.stemming_rules          = urgency["stemming_rules"]
+        self.category_weights        = urgency["category_weights"]
+        self.base_score              = urgency["base_score"]
+        self.default_category_weight = urgency["default_category_weight"]
+
+        self.priority_weights       = priority["keyword_weights"]
+        self.category_base_score    = priority["category_base_score"]
+        self.default_category_score = priority["default_category_score"]
+
+        phrases      = set(self.urgency_keywords) | set(self.priority_weights)
+        self.matcher = PhraseMatcher({phrase: phrase for phrase in phrases}, max_words=3)
+
+        # Matching looks tokens up in the index; stem() serves other callers
+        self.stem_index = build_stem_index(self.urgency_keywords, self.stemming_rules)
+        self.stem       = lru_cache(maxsize=STEM_CACHE_SIZE)(
+            lambda word, rules=self.stemming_rules: stem_word(word, rules)
+        )
+
+
+class KeywordRules:
+    """
+    Loads and compiles the rule file, and recompiles it when its size or
+    mtime changes (checked at most every `check_interval` seconds). A bad
+    edit is reported and the previous version stays in use. Readers take
+    one snapshot with get() and use it for the whole call, so a reload
+    never mixes tables from two versions.
+    """
+
+    def __init__(self, path: str = RULES_PATH, check_interval: float = RULES_CHECK_INTERVAL):
+        self.path           = path
+        self.check_interval = check_interval
+
+        self._lock        = threading.Lock()
+        self._fingerprint = file_fingerprint([path])
+        self._compiled    = self._compile(self._fingerprint)
+        self._checked_at  = time.monotonic()
+
+        metrics.register_gauge("keyword_rules_phrases", lambda: self._compiled.matcher.size)
+
+    def _compile(self, fingerprint: str) -> CompiledRules:
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        return CompiledRules(data, fingerprint)
+
+    def get(self) -> CompiledRules:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._maybe_reload(now)
+        return self._compiled
+
+    def _maybe_reload(self, now: float):
+        if not self._lock.acquire(blocking=False):
+            return      # another thread is already checking
+        try:
+            self._checked_at = now
+            fingerprint = file_fingerprint([self.path])
+            if fingerprint == self._fingerprint:
+                return
+            try:
+                compiled = self._compile(fingerprint)
+            except Exception as e:
+                metrics.inc("keyword_rules_reload_errors_total")
+                print(f"⚠️ Keyword rules reload failed, keeping {self._compiled.version}: {e}")
+                self._fingerprint = fingerprint     # don't retry until the file changes again
+                return
+            self._compiled    = compiled
+            self._fingerprint = fingerprint
+            metrics.inc("keyword_rules_reloads_total")
+            print(f"🔄 Keyword rules reloaded ({compiled.matcher.size} phrases, {fingerprint})")
+        finally:
+            self._lock.release()
+
+
+# Shared by urgency_engine and priority_engine
+keyword_rules = KeywordRules()
@@ -0,0 +1,87 @@
+# utils/metrics.py
+
+import threading
+from typing import Callable, Dict, Optional
+
+
+def _key(name: str, labels: Optional[Dict[str, str]]):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry (counters, gauges, timing summaries)
+    rendered in Prometheus text format at GET /metrics.
+    Values are per worker process.
+    """
+
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._counters  = {}
+        self._gauges    = {}
+        self._gauge_fns = {}
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def register_gauge(self, name: str, fn: Callable[[], float], labels: Optional[Dict[str, str]] = None):
+        """Gauge whose value is read from fn() at scrape time."""
+        with self._lock:
+            self._gauge_fns[_key(name, labels)] = fn
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record one observation (e.g. a latency in ms) as name_sum / name_count."""
+        with self._lock:
+            sum_key   = _key(f"{name}_sum", labels)
+            count_key = _key(f"{name}_count", labels)
+            self._counters[sum_key]   = self._counters.get(sum_key, 0) + value
+            self._counters[count_key] = self._counters.get(count_key, 0) + 1
+
+    def get(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        key = _key(name, labels)
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            if key in self._gauges:
+                return self._gauges[key]
+            fn = self._gauge_fns.get(key)
+        return fn() if fn else 0
+
+    def _collect(self) -> Dict:
+        with self._lock:
+            values = dict(self._counters)
+            values.update(self._gauges)
+            gauge_fns = dict(self._gauge_fns)
+        for key, fn in gauge_fns.items():
+            try:
+                values[key] = fn()
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self) -> Dict[str, float]:
+        result = {}
+        for (name, labels), value in sorted(self._collect().items()):
+            label_str = ",".join(f"{k}={v}" for k, v in labels)
+            result[f"{name}{{{label_str}}}" if label_str else name] = value
+        return result
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for (name, labels), value in sorted(self._collect().items()):
+            if labels:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_str}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+metrics = Metrics()
@@ -1,80 +1,149 @@
 # utils/ml_model.py
 
-import torch
-import torch.nn as nn
-import pickle
-import re
 import os
+import time
 
-class UrgencyModel(nn.Module):
-    def __init__(self, vocab_size, embed_dim=64):
-        super(UrgencyModel, self).__init__()
-        self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
-        self.fc1 = nn.Linear(embed_dim, 32)
-        self.relu = nn.ReLU()
-        self.fc2 = nn.Linear(32, 1)
-
-    def forward(self, x):
-        embedded = self.embedding(x)
-        mask = (x != 0).float().unsqueeze(2)
-        summed = (embedded * mask).sum(1)
-        lengths = mask.sum(1).clamp(min=1)
-        averaged = summed / lengths
-        out = self.relu(self.fc1(averaged))
-        return self.fc2(out)
-
-# ── Load Model Once at Startup ────────────────────────────────────
-BASE_DIR    = os.path.dirname(os.path.abspath(__file__))
-MODELS_DIR  = os.path.join(BASE_DIR, '..', 'models')
-
-MODEL_PATH  = os.path.join(MODELS_DIR, 'urgency_model.pth')
-VOCAB_PATH  = os.path.join(MODELS_DIR, 'vocab.pkl')
-CONFIG_PATH = os.path.join(MODELS_DIR, 'model_config.pkl')
-
-# Load vocab
-with open(VOCAB_PATH, 'rb') as f:
-    vocab = pickle.load(f)
-
-# Load config
-with open(CONFIG_PATH, 'rb') as f:
-    config = pickle.load(f)
-
-MAX_LEN    = config['max_len']
-VOCAB_SIZE = config['vocab_size']
-
-# Load model
-model = UrgencyModel(VOCAB_SIZE)
-model.load_state_dict(
-    torch.load(MODEL_PATH, map_location=torch.device('cpu'))
+from utils.inference_batcher import MicroBatcher
+from utils.score_cache import ScoreCache
+from utils.tokenizer import Tokenizer
+from utils.model_registry import (
+    MODELS_DIR, MODEL_PATH, VOCAB_PATH, CONFIG_PATH,
+    ML_BACKEND, NUMPY_WEIGHTS_PATH, ML_PRECISION,
+    model_files, load_backend, LoadedModel,
+    registry, shadow_recorder,
 )
-model.eval()
 
-print("✅ Urgency model loaded successfully")
+
+def warmup():
+    """Load the model and run one dummy prediction so the first request is hot."""
+    registry.get()
+    _predict_single("warmup")
+
+
+def is_ready():
+    return registry.is_ready()
 
 # ── Helper Functions ──────────────────────────────────────────────
-def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r'[^a-z\s]', '', text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def encode_text(text):
-    tokens = text.split()
-    encoded = [vocab.get(w, vocab["<UNK>"]) for w in tokens]
-    if len(encoded) < MAX_LEN:
-        encoded += [vocab["<PAD>"]] * (MAX_LEN - len(encoded))
-    else:
-        encoded = encoded[:MAX_LEN]
-    return encoded
-
-# ── Main Predict Function ─────────────────────────────────────────
+clean_text = Tokenizer.clean
+
+
+def encode_text(text, loaded=None):
+    loaded = loaded or registry.get()
+    return loaded.tokenizer.encode(text).tolist()
+
+# ── Main Predict Functions ────────────────────────────────────────
+def _clamp_score(score):
+    return max(0, min(100, round(score)))
+
+
+def _score_cleaned(cleaned_texts, loaded=None):
+    """One forward pass over already-cleaned texts (no cache)."""
+    loaded  = loaded or registry.get()
+    encoded = loaded.tokenizer.encode_batch(cleaned_texts)
+    return [_clamp_score(score) for score in loaded.backend.predict(encoded)]
+
+
+def _predict_single(text):
+    """Uncached, unbatched single-text path."""
+    return _score_cleaned([clean_text(text)])[0]
+
+
+def _shadow_score(loaded, cleaned_texts, scores, forward_ms):
+    """
+    Re-score cache misses with the shadow model. `forward_ms` is the active
+    model's forward pass over the same texts (None when it ran inside a
+    micro-batch and cannot be attributed to these texts).
+    """
+    shadow = registry.shadow()
+    if shadow is not None and shadow is not loaded and cleaned_texts:
+        shadow_recorder.submit(_score_cleaned, shadow, loaded, cleaned_texts, scores, forward_ms)
+
+
+# ── Micro-batching ────────────────────────────────────────────────
+# ML_MICROBATCH=True → concurrent predict_score calls are coalesced
+# into one forward pass (see utils/inference_batcher.py)
+MICROBATCH_ENABLED = os.getenv("ML_MICROBATCH", "False") == "True"
+BATCH_MAX_SIZE     = int(os.getenv("ML_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS  = float(os.getenv("ML_BATCH_MAX_WAIT_MS", "5"))
+
+_batcher = None
+
+
+def _score_batch_items(items):
+    """Batch function for the micro-batcher: items are (cleaned_text, LoadedModel)."""
+    results = [None] * len(items)
+    groups  = {}
+    for i, (_, loaded) in enumerate(items):
+        groups.setdefault(id(loaded), (loaded, []))[1].append(i)
+    # Normally one group; two only if a model swap lands mid-batch
+    for loaded, indexes in groups.values():
+        scores = _score_cleaned([items[i][0] for i in indexes], loaded)
+        for i, score in zip(indexes, scores):
+            results[i] = score
+    return results
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _score_batch_items,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_MAX_WAIT_MS,
+        )
+    return _batcher
+
+
+# ── Result Cache ──────────────────────────────────────────────────
+# ML_SCORE_CACHE_SIZE=0 disables the cache. Keys include LoadedModel.version,
+# which changes when the registry reloads a model whose files changed, so
+# watching the files here only frees the stale entries early.
+SCORE_CACHE_SIZE = int(os.getenv("ML_SCORE_CACHE_SIZE", "4096"))
+
+score_cache = ScoreCache(
+    max_size=SCORE_CACHE_SIZE,
+    watch_paths=model_files(),
+    check_interval=float(os.getenv("ML_SCORE_CACHE_CHECK_INTERVAL", "30")),
+)
+
+
+def predict_scores(texts):
+    """Score many texts; cache misses share a single forward pass."""
+    if not texts:
+        return []
+    loaded  = registry.get()
+    cleaned = [clean_text(t) for t in texts]
+    keys    = [score_cache.make_key(c, loaded.version) for c in cleaned]
+    scores  = [score_cache.get(k) for k in keys]
+
+    misses = [i for i, score in enumerate(scores) if score is None]
+    if misses:
+        missed = [cleaned[i] for i in misses]
+        start  = time.perf_counter()
+        fresh  = _score_cleaned(missed, loaded)
+        _shadow_score(loaded, missed, fresh, (time.perf_counter() - start) * 1000)
+        for i, score in zip(misses, fresh):
+            scores[i] = score
+            score_cache.put(keys[i], score)
+
+    return scores
+
+
 def predict_score(text):
-    cleaned  = clean_text(text)
-    encoded  = encode_text(cleaned)
-    tensor   = torch.tensor([encoded])
+    loaded  = registry.get()
+    cleaned = clean_text(text)
+    key     = score_cache.make_key(cleaned, loaded.version)
 
-    with torch.no_grad():
-        output = model(tensor)
-        score  = output.item()
+    score = score_cache.get(key)
+    if score is None:
+        if MICROBATCH_ENABLED:
+            score      = get_batcher().submit((cleaned, loaded))
+            forward_ms = None
+        else:
+            start      = time.perf_counter()
+            score      = _score_cleaned([cleaned], loaded)[0]
+            forward_ms = (time.perf_counter() - start) * 1000
+        score_cache.put(key, score)
+        _shadow_score(loaded, [cleaned], [score], forward_ms)
 
-    return max(0, min(100, round(score)))
\ No newline at end of file
+    return score
@@ -0,0 +1,459 @@
+# utils/model_registry.py
+
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from utils.score_cache import file_fingerprint
+from utils.tokenizer import Tokenizer
+from utils.metrics import metrics
+
+# ── Model Files ───────────────────────────────────────────────────
+BASE_DIR     = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR   = os.path.join(BASE_DIR, '..', 'models')
+
+# Extra versions live in models/versions/<version>/ with the same file names
+VERSIONS_DIR = os.path.join(MODELS_DIR, 'versions')
+
+MODEL_PATH  = os.path.join(MODELS_DIR, 'urgency_model.pth')
+VOCAB_PATH  = os.path.join(MODELS_DIR, 'vocab.pkl')
+CONFIG_PATH = os.path.join(MODELS_DIR, 'model_config.pkl')
+
+# ML_BACKEND=numpy runs inference from the exported .npz weights
+# (python export_numpy_weights.py) without importing torch at all.
+ML_BACKEND         = os.getenv("ML_BACKEND", "torch").lower()
+NUMPY_WEIGHTS_PATH = os.getenv("ML_NUMPY_WEIGHTS", os.path.join(MODELS_DIR, 'urgency_model.npz'))
+
+# ML_PRECISION=int8 → int8 Linear layers + fp16 embedding table
+# (benchmarks/eval_quantized.py reports the latency/memory/drift trade-off)
+ML_PRECISION       = os.getenv("ML_PRECISION", "fp32").lower()
+
+DEFAULT_VERSION = "default"
+
+# How often each worker checks MongoDB for a new active/shadow version
+REGISTRY_SYNC_INTERVAL = float(os.getenv("ML_REGISTRY_SYNC_INTERVAL", "30"))
+
+# How often each worker checks the files of its loaded versions; a version
+# whose files changed on disk is reloaded in the background and swapped in
+MODEL_FILE_CHECK_INTERVAL = float(os.getenv("ML_MODEL_FILE_CHECK_INTERVAL", "30"))
+
+# Shadow scoring: at most this many batches waiting per worker (more are
+# dropped and counted in ml_shadow_dropped_total); stored comparisons
+# expire after ML_SHADOW_RETENTION_DAYS
+SHADOW_QUEUE_SIZE = int(os.getenv("ML_SHADOW_QUEUE_SIZE", "256"))
+SHADOW_RETENTION  = timedelta(days=float(os.getenv("ML_SHADOW_RETENTION_DAYS", "14")))
+
+
+def model_files(name=None, version=DEFAULT_VERSION):
+    """Files that make up a model version for the given backend."""
+    numpy = (name or ML_BACKEND).lower() == "numpy"
+    if version == DEFAULT_VERSION:
+        weights = NUMPY_WEIGHTS_PATH if numpy else MODEL_PATH
+        return [weights, VOCAB_PATH, CONFIG_PATH]
+
+    version_dir = os.path.join(VERSIONS_DIR, version)
+    weights     = 'urgency_model.npz' if numpy else 'urgency_model.pth'
+    return [os.path.join(version_dir, f) for f in (weights, 'vocab.pkl', 'model_config.pkl')]
+
+
+def load_backend(name=None, vocab_size=None, precision=None, weights_path=None):
+    name      = (name or ML_BACKEND).lower()
+    precision = (precision or ML_PRECISION).lower()
+    if precision not in ("fp32", "int8"):
+        raise ValueError(f"Unknown ML_PRECISION '{precision}' (expected fp32 or int8)")
+    if name == "numpy":
+        from utils.numpy_backend import NumpyBackend
+        return NumpyBackend.from_npz(weights_path or NUMPY_WEIGHTS_PATH, precision)
+    if name == "torch":
+        from utils.torch_backend import TorchBackend
+        return TorchBackend.from_state_dict(weights_path or MODEL_PATH, vocab_size, precision)
+    raise ValueError(f"Unknown ML_BACKEND '{name}' (expected torch or numpy)")
+
+
+class LoadedModel:
+    """Vocab, config and inference backend of one loaded model version."""
+
+    def __init__(self, name: str = DEFAULT_VERSION):
+        weights_path, vocab_path, config_path = model_files(version=name)
+
+        # Load vocab
+        with open(vocab_path, 'rb') as f:
+            self.vocab = pickle.load(f)
+
+        # Load config
+        with open(config_path, 'rb') as f:
+            self.config = pickle.load(f)
+
+        self.name       = name
+        self.max_len    = self.config['max_len']
+        self.vocab_size = self.config['vocab_size']
+        self.tokenizer  = Tokenizer(self.vocab, self.max_len)
+
+        # Load model
+        self.files       = [weights_path, vocab_path, config_path]
+        self.fingerprint = file_fingerprint(self.files)
+        self.backend     = load_backend(vocab_size=self.vocab_size, weights_path=weights_path)
+        self.version     = f"{name}:{self.fingerprint}-{self.backend.precision}"
+
+    def files_changed(self) -> bool:
+        return file_fingerprint(self.files) != self.fingerprint
+
+
+class ModelRegistry:
+    """
+    Holds the active model version (and an optional shadow candidate).
+
+    Nothing is loaded at import time; get() loads the default version on
+    first use and warmup() does it eagerly from a gunicorn hook. New
+    versions load on a background thread and are swapped in with a single
+    reference assignment, so requests already holding the old LoadedModel
+    finish on it and none are dropped.
+
+    Admin endpoints write the desired active/shadow versions to MongoDB
+    (model_registry collection); every worker picks them up via sync().
+    A version whose files are replaced on disk is reloaded the same way,
+    and its LoadedModel.version (which includes the file fingerprint)
+    changes with it, so score cache keys never mix old and new weights.
+    """
+
+    def __init__(self):
+        self._lock        = threading.Lock()
+        self._active      = None
+        self._shadow      = None
+        self._loaded      = {}
+        self._loading     = {}
+        self._executor    = None
+        self._pid         = None
+        self._sync_lock   = threading.Lock()
+        self._check_lock  = threading.Lock()
+        self._last_sync   = 0.0
+        self._last_check  = time.monotonic()
+
+    # ── loading ──────────────────────────────────────────────────
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Recreate after fork: the parent's loader thread doesn't exist here
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-loader")
+            self._pid      = os.getpid()
+            self._loading  = {}
+        return self._executor
+
+    def _load(self, version: str) -> LoadedModel:
+        start = time.perf_counter()
+        try:
+            loaded = LoadedModel(version)
+        except Exception:
+            with self._lock:
+                self._loading.pop(version, None)
+            raise
+        with self._lock:
+            self._loaded[version] = loaded
+            self._loading.pop(version, None)
+        backend = loaded.backend
+        print(f"✅ Urgency model '{version}' loaded successfully "
+              f"({backend.name} backend, {backend.precision}, {(time.perf_counter() - start) * 1000:.0f} ms)")
+        return loaded
+
+    def load_version(self, version: str) -> Future:
+        """Load a version in the background; returns a Future of the LoadedModel."""
+        with self._lock:
+            if version in self._loaded:
+                future = Future()
+                future.set_result(self._loaded[version])
+                return future
+            executor = self._get_executor()
+            if version not in self._loading:
+                self._loading[version] = executor.submit(self._load, version)
+            return self._loading[version]
+
+    def available_versions(self) -> List[str]:
+        versions = [DEFAULT_VERSION]
+        if os.path.isdir(VERSIONS_DIR):
+            versions += sorted(
+                d for d in os.listdir(VERSIONS_DIR)
+                if all(os.path.exists(p) for p in model_files(version=d))
+            )
+        return versions
+
+    def _check_version(self, version: str):
+        if version not in self.available_versions():
+            raise ValueError(f"Unknown model version '{version}'")
+
+    # ── active / shadow ──────────────────────────────────────────
+    def get(self) -> LoadedModel:
+        self.maybe_sync()
+        self.maybe_reload()
+        loaded = self._active
+        if loaded is None:
+            with self._lock:
+                loaded = self._active
+            if loaded is None:
+                loaded = self.load_version(DEFAULT_VERSION).result()
+                with self._lock:
+                    if self._active is None:
+                        self._active = loaded
+                    loaded = self._active
+        return loaded
+
+    def shadow(self) -> Optional[LoadedModel]:
+        return self._shadow
+
+    def is_ready(self) -> bool:
+        return self._active is not None
+
+    def activate(self, version: str, wait: bool = False) -> Future:
+        """Load version in the background, then atomically make it active."""
+        self._check_version(version)
+
+        def _swap(future: Future):
+            if future.exception() is not None:
+                print(f"❌ Could not activate model '{version}': {future.exception()}")
+                return
+            loaded = future.result()
+            with self._lock:
+                previous     = self._active
+                self._active = loaded
+                if self._shadow is loaded:
+                    self._shadow = None
+                # Keep only what is still referenced warm
+                keep = {loaded.name} | ({self._shadow.name} if self._shadow else set())
+                self._loaded = {k: v for k, v in self._loaded.items() if k in keep}
+            print(f"🔁 Active urgency model: {previous.name if previous else 'none'} → {loaded.name}")
+
+        future = self.load_version(version)
+        future.add_done_callback(_swap)
+        if wait:
+            future.result()
+        return future
+
+    def set_shadow(self, version: Optional[str], wait: bool = False) -> Optional[Future]:
+        """Score live traffic with version alongside the active model (None turns it off)."""
+        if version is None:
+            with self._lock:
+                self._shadow = None
+            return None
+        self._check_version(version)
+
+        def _attach(future: Future):
+            if future.exception() is None:
+                with self._lock:
+                    self._shadow = future.result()
+                print(f"👥 Shadow urgency model: {version}")
+
+        future = self.load_version(version)
+        future.add_done_callback(_attach)
+        if wait:
+            future.result()
+        return future
+
+    # ── model files changed on disk ──────────────────────────────
+    def maybe_reload(self):
+        if time.monotonic() - self._last_check < MODEL_FILE_CHECK_INTERVAL:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return      # another thread is already checking
+        try:
+            self._last_check = time.monotonic()
+            self.reload_changed()
+        except Exception as e:
+            print(f"⚠️ Model file check failed: {e}")
+        finally:
+            self._check_lock.release()
+
+    def reload_changed(self) -> List[str]:
+        """Reload the active/shadow versions whose files changed; returns their names."""
+        with self._lock:
+            active, shadow = self._active, self._shadow
+            changed = {m.name for m in (active, shadow) if m is not None and m.files_changed()}
+            # Drop the stale copies so load_version() reads the files again
+            for name in changed:
+                self._loaded.pop(name, None)
+
+        for name in sorted(changed):
+            print(f"♻️  Model files of '{name}' changed — reloading")
+            if active is not None and active.name == name:
+                self.activate(name)
+            if shadow is not None and shadow.name == name:
+                self.set_shadow(name)
+        return sorted(changed)
+
+    # ── cross-worker sync ────────────────────────────────────────
+    def maybe_sync(self):
+        # One thread per worker syncs; the others keep serving the current
+        # model instead of queueing behind the MongoDB read
+        if time.monotonic() - self._last_sync < REGISTRY_SYNC_INTERVAL:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return      # another thread is already syncing
+        try:
+            self._last_sync = time.monotonic()
+            self.sync()
+        except Exception as e:
+            print(f"⚠️ Model registry sync failed: {e}")
+        finally:
+            self._sync_lock.release()
+
+    def sync(self):
+        """Apply the desired active/shadow versions stored in MongoDB."""
+        from utils import database
+        if database.db is None:
+            return
+        state = database.db.model_registry.find_one({"_id": "urgency"})
+        if not state:
+            return
+
+        active = state.get("active") or DEFAULT_VERSION
+        shadow = state.get("shadow")
+        if active != (self._active.name if self._active else DEFAULT_VERSION):
+            self.activate(active)
+        if shadow != (self._shadow.name if self._shadow else None):
+            self.set_shadow(shadow)
+
+    def publish(self, db, active: Optional[str] = None, shadow: Optional[str] = "__keep__"):
+        """Store the desired state for all workers and apply it to this one."""
+        update = {"updated_at": datetime.utcnow()}
+        if active is not None:
+            self._check_version(active)
+            update["active"] = active
+        if shadow != "__keep__":
+            if shadow is not None:
+                self._check_version(shadow)
+            update["shadow"] = shadow
+        db.model_registry.update_one({"_id": "urgency"}, {"$set": update}, upsert=True)
+
+        if active is not None:
+            self.activate(active)
+        if shadow != "__keep__":
+            self.set_shadow(shadow)
+
+    def status(self) -> Dict:
+        return {
+            "active"   : self._active.version if self._active else None,
+            "shadow"   : self._shadow.version if self._shadow else None,
+            "loaded"   : sorted(self._loaded),
+            "loading"  : sorted(self._loading),
+            "available": self.available_versions(),
+        }
+
+
+registry = ModelRegistry()
+
+
+# ── Shadow scoring ────────────────────────────────────────────────
+class ShadowRecorder:
+    """
+    Re-scores live traffic with the shadow model off the request path and
+    records both scores and latencies (in-memory summary + MongoDB
+    model_shadow_scores for offline comparison). Only `max_queue` batches
+    may wait at once, so a shadow model slower than traffic sheds load
+    instead of growing memory.
+    """
+
+    def __init__(self, max_workers: int = 1, max_queue: int = SHADOW_QUEUE_SIZE):
+        self.max_workers = max_workers
+        self.max_queue   = max_queue
+        self._executor   = None
+        self._pid        = None
+        self._lock       = threading.Lock()
+        self._stats      = {}
+        self._queued     = 0
+
+        metrics.register_gauge("ml_shadow_queue_depth", lambda: self._queued)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="model-shadow")
+            self._pid      = os.getpid()
+        return self._executor
+
+    def submit(self, score_fn, shadow: LoadedModel, active: LoadedModel,
+               cleaned_texts: List[str], active_scores: List[int], active_ms: Optional[float]):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                metrics.inc("ml_shadow_dropped_total", len(cleaned_texts))
+                return
+            self._queued += 1
+        try:
+            self._get_executor().submit(
+                self._run, score_fn, shadow, active, cleaned_texts, active_scores, active_ms
+            )
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+    def _run(self, score_fn, shadow, active, cleaned_texts, active_scores, active_ms):
+        try:
+            self._record(score_fn, shadow, active, cleaned_texts, active_scores, active_ms)
+        finally:
+            with self._lock:
+                self._queued -= 1
+
+    def _record(self, score_fn, shadow, active, cleaned_texts, active_scores, active_ms):
+        try:
+            start     = time.perf_counter()
+            scores    = score_fn(cleaned_texts, shadow)
+            shadow_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            print(f"⚠️ Shadow scoring failed ({shadow.name}): {e}")
+            metrics.inc("ml_shadow_errors_total")
+            return
+
+        n = len(cleaned_texts)
+        with self._lock:
+            s = self._stats.setdefault(shadow.version, {
+                "active_version": active.version, "items": 0, "abs_diff_sum": 0.0,
+                "max_abs_diff": 0, "active_ms_sum": 0.0, "shadow_ms_sum": 0.0, "timed_items": 0,
+            })
+            s["active_version"] = active.version
+            s["items"]         += n
+            if active_ms is not None:
+                # Latency is only compared on items where both passes were timed
+                s["timed_items"]   += n
+                s["active_ms_sum"] += active_ms
+                s["shadow_ms_sum"] += shadow_ms
+            for a, b in zip(active_scores, scores):
+                s["abs_diff_sum"] += abs(a - b)
+                s["max_abs_diff"]  = max(s["max_abs_diff"], abs(a - b))
+
+        metrics.inc("ml_shadow_items_total", n)
+        metrics.observe("ml_shadow_latency_ms", shadow_ms)
+
+        from utils import database
+        if database.db is not None:
+            now = datetime.utcnow()
+            try:
+                database.db.model_shadow_scores.insert_many([{
+                    "active_version": active.version,
+                    "shadow_version": shadow.version,
+                    "text"          : text,
+                    "active_score"  : a,
+                    "shadow_score"  : b,
+                    "active_ms"     : active_ms / n if active_ms is not None else None,
+                    "shadow_ms"     : shadow_ms / n if active_ms is not None else None,
+                    "created_at"    : now,
+                    "expires_at"    : now + SHADOW_RETENTION,
+                } for text, a, b in zip(cleaned_texts, active_scores, scores)])
+            except Exception as e:
+                print(f"⚠️ Could not store shadow scores: {e}")
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                version: {
+                    "active_version"    : s["active_version"],
+                    "items"             : s["items"],
+                    "mean_abs_diff"     : s["abs_diff_sum"] / s["items"] if s["items"] else 0,
+                    "max_abs_diff"      : s["max_abs_diff"],
+                    "active_ms_per_item": s["active_ms_sum"] / s["timed_items"] if s["timed_items"] else 0,
+                    "shadow_ms_per_item": s["shadow_ms_sum"] / s["timed_items"] if s["timed_items"] else 0,
+                }
+                for version, s in self._stats.items()
+            }
+
+
+shadow_recorder = ShadowRecorder()
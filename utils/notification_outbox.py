@@ -0,0 +1,261 @@
+# utils/notification_outbox.py
+
+import os
+import random
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from utils.database import get_db
+from utils.firebase_service import firebase_service
+from utils.metrics import metrics
+
+# ── Configuration ─────────────────────────────────────────────────
+# Routes enqueue notifications into the `notification_outbox` collection
+# and return; a dispatcher claims due messages in batches and sends them.
+# The dispatcher runs as a thread in every web worker that has enqueued
+# something (OUTBOX_EMBEDDED_DISPATCHER=True) and/or as its own process:
+#     python -m utils.notification_outbox
+# Claims are leased, so any number of dispatchers can share the queue.
+# NOTIFICATION_OUTBOX=False sends inline from the request as before.
+OUTBOX_ENABLED      = os.getenv("NOTIFICATION_OUTBOX", "True") == "True"
+OUTBOX_EMBEDDED     = os.getenv("OUTBOX_EMBEDDED_DISPATCHER", "True") == "True"
+OUTBOX_BATCH_SIZE   = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_POLL_SEC     = float(os.getenv("OUTBOX_POLL_SECONDS", "1"))
+OUTBOX_LEASE        = timedelta(seconds=float(os.getenv("OUTBOX_LEASE_SECONDS", "60")))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "5"))
+OUTBOX_BACKOFF_MAX  = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "900"))
+OUTBOX_RETENTION    = timedelta(days=float(os.getenv("OUTBOX_RETENTION_DAYS", "7")))
+
+# Message states. "sending" is a leased claim; a claim whose lease ran out
+# (dispatcher crashed mid-batch) is due again and gets reclaimed.
+PENDING, SENDING, DELIVERED, DEAD = "pending", "sending", "delivered", "dead"
+
+# FCM answers these for a token or payload that will never succeed
+_PERMANENT_STATUSES = (400, 403, 404)
+
+# Not retried either: "deadline" is a send still in flight when the fan-out
+# deadline passed, which FCM may well have accepted; retrying it would
+# notify the device twice. Sends cancelled before they started
+# ("deadline_unsent") are retried like any other transient failure.
+_PERMANENT_ERRORS = ("no_token", "deadline")
+
+
+def _is_permanent(result: Dict) -> bool:
+    return result.get("status") in _PERMANENT_STATUSES or result.get("error") in _PERMANENT_ERRORS
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter after the `attempts`-th failed try."""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+# ── Producer side (routes) ────────────────────────────────────────
+def enqueue(db, tokens: List[str], title: str, body: str, data: Optional[Dict] = None,
+            kind: str = "notification", topics: Optional[List[str]] = None) -> int:
+    """
+    Queue one message for `tokens` and/or FCM `topics` with a single insert.
+    Returns the number of targets queued (0 when there is nothing to send to).
+    """
+    tokens = list(dict.fromkeys(t for t in tokens if t))
+    topics = list(dict.fromkeys(t for t in topics or [] if t))
+    if not tokens and not topics:
+        return 0
+
+    if not OUTBOX_ENABLED:
+        sent = firebase_service.send_to_multiple(tokens, title, body, data) if tokens else 0
+        return sent + sum(firebase_service.send_to_topic_result(t, title, body, data)["ok"] for t in topics)
+
+    now = datetime.utcnow()
+    db.notification_outbox.insert_one({
+        "kind"           : kind,
+        "tokens"         : tokens,
+        "topics"         : topics,
+        "recipients"     : len(tokens) + len(topics),
+        "title"          : title,
+        "body"           : body,
+        "data"           : data or {},
+        "status"         : PENDING,
+        "attempts"       : 0,
+        "delivered"      : 0,
+        "failed_tokens"  : [],
+        "created_at"     : now,
+        "next_attempt_at": now,
+    })
+    metrics.inc("notification_outbox_enqueued_total", labels={"kind": kind})
+    ensure_dispatcher()
+    return len(tokens) + len(topics)
+
+
+# ── Consumer side (dispatcher) ────────────────────────────────────
+class OutboxDispatcher:
+    """
+    Claims due messages with find_one_and_update, which sets the status to
+    "sending", bumps `attempts` and pushes next_attempt_at out by the lease,
+    so each message is held by one dispatcher at a time. Tokens that fail
+    with a retriable error are retried with exponential backoff until
+    OUTBOX_MAX_ATTEMPTS; targets FCM rejects outright are dropped. A
+    message ends "delivered" once every token and topic was sent or dropped
+    with at least one success, and "dead" otherwise.
+    """
+
+    def __init__(self, db=None, batch_size: int = OUTBOX_BATCH_SIZE, poll_interval: float = OUTBOX_POLL_SEC):
+        self._db           = db
+        self.batch_size    = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id     = f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else get_db()
+
+    def claim_batch(self) -> List[Dict]:
+        now   = datetime.utcnow()
+        batch = []
+        while len(batch) < self.batch_size:
+            msg = self.db.notification_outbox.find_one_and_update(
+                {"status": {"$in": [PENDING, SENDING]}, "next_attempt_at": {"$lte": now}},
+                {"$set": {"status"         : SENDING,
+                          "claim"          : uuid.uuid4().hex,
+                          "claimed_by"     : self.worker_id,
+                          "next_attempt_at": now + OUTBOX_LEASE},
+                 "$inc": {"attempts": 1}},
+                sort=[("next_attempt_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if msg is None:
+                break
+            batch.append(msg)
+        return batch
+
+    def deliver(self, msg: Dict) -> str:
+        """Send one claimed message and record the outcome. Returns the new status."""
+        title, body, data = msg["title"], msg["body"], msg.get("data")
+        token_results = firebase_service.fan_out(msg["tokens"], title, body, data) if msg["tokens"] else {}
+        topic_results = {t: firebase_service.send_to_topic_result(t, title, body, data)
+                         for t in msg.get("topics", [])}
+        results = list(token_results.values()) + list(topic_results.values())
+
+        def _retriable(by_target):
+            return [t for t, r in by_target.items() if not r["ok"] and not _is_permanent(r)]
+
+        retry_tokens, retry_topics = _retriable(token_results), _retriable(topic_results)
+        retriable = retry_tokens + retry_topics
+        dropped   = [t for t, r in {**token_results, **topic_results}.items() if not r["ok"] and _is_permanent(r)]
+        errors    = sorted({str(r.get("status") or r.get("error")) for r in results if not r["ok"]})
+        delivered = msg.get("delivered", 0) + sum(r["ok"] for r in results)
+
+        now    = datetime.utcnow()
+        update = {"$set": {"tokens": retry_tokens, "topics": retry_topics, "delivered": delivered,
+                           "last_error": ", ".join(errors) or None},
+                  "$push": {"failed_tokens": {"$each": dropped}},
+                  "$unset": {"claim": ""}}
+
+        if retriable and msg["attempts"] < OUTBOX_MAX_ATTEMPTS:
+            status = PENDING
+            update["$set"]["next_attempt_at"] = now + timedelta(seconds=backoff_seconds(msg["attempts"]))
+        else:
+            status = DELIVERED if delivered and not retriable else DEAD
+            update["$set"]["finished_at"] = now
+            update["$set"]["expires_at"]  = now + OUTBOX_RETENTION
+            if status == DELIVERED:
+                lag_ms = (now - msg["created_at"]).total_seconds() * 1000
+                update["$set"]["delivered_at"] = now
+                update["$set"]["lag_ms"]       = lag_ms
+                metrics.observe("notification_delivery_lag_ms", lag_ms)
+        update["$set"]["status"] = status
+
+        # Only the holder of this claim may settle it
+        result = self.db.notification_outbox.update_one({"_id": msg["_id"], "claim": msg["claim"]}, update)
+        if result.matched_count == 0:
+            print(f"⚠️ Outbox message {msg['_id']} was reclaimed before it was settled")
+        metrics.inc("notification_outbox_attempts_total", labels={"status": status})
+        if status == DEAD:
+            print(f"❌ Outbox message {msg['_id']} ({msg.get('kind')}) is dead after "
+                  f"{msg['attempts']} attempts: {update['$set']['last_error']}")
+        return status
+
+    def run_once(self) -> int:
+        """Claim and deliver one batch; returns how many messages were handled."""
+        batch = self.claim_batch()
+        for msg in batch:
+            try:
+                self.deliver(msg)
+            except Exception as e:
+                # Left in "sending"; it is reclaimed when the lease runs out
+                print(f"⚠️ Outbox delivery error ({msg['_id']}): {e}")
+        return len(batch)
+
+    def run_forever(self, stop: Optional[threading.Event] = None):
+        stop = stop or threading.Event()
+        print(f"📮 Notification dispatcher {self.worker_id} started")
+        while not stop.is_set():
+            try:
+                handled = self.run_once()
+            except Exception as e:
+                print(f"⚠️ Notification dispatcher error: {e}")
+                handled = 0
+            # A full batch means there is probably more waiting
+            if handled < self.batch_size:
+                stop.wait(self.poll_interval)
+
+
+_dispatcher_lock = threading.Lock()
+_dispatcher_pid  = None
+
+
+def ensure_dispatcher():
+    """Start the embedded dispatcher thread once per process (fork-safe)."""
+    global _dispatcher_pid
+    if not OUTBOX_EMBEDDED or _dispatcher_pid == os.getpid():
+        return
+    with _dispatcher_lock:
+        if _dispatcher_pid == os.getpid():
+            return
+        threading.Thread(target=OutboxDispatcher().run_forever,
+                         name="notification-outbox", daemon=True).start()
+        _dispatcher_pid = os.getpid()
+
+
+# ── Monitoring ────────────────────────────────────────────────────
+def outbox_stats(db, lag_sample: int = 500) -> Dict:
+    """
+    Queue depth per state, age of the oldest undelivered message and the
+    delivery lag (enqueue → FCM accepted) of the most recent deliveries.
+    """
+    now    = datetime.utcnow()
+    counts = {state: 0 for state in (PENDING, SENDING, DELIVERED, DEAD)}
+    for row in db.notification_outbox.aggregate([{"$group": {"_id": "$status", "n": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["n"]
+
+    oldest = db.notification_outbox.find_one(
+        {"status": {"$in": [PENDING, SENDING]}}, {"created_at": 1}, sort=[("created_at", 1)]
+    )
+    lags = sorted(
+        doc["lag_ms"] for doc in db.notification_outbox.find(
+            {"status": DELIVERED}, {"lag_ms": 1}
+        ).sort("delivered_at", -1).limit(lag_sample)
+    )
+
+    def _pct(q):
+        return round(lags[min(len(lags) - 1, int(q * len(lags)))], 1) if lags else None
+
+    depth = counts[PENDING] + counts[SENDING]
+    metrics.set_gauge("notification_outbox_depth", depth)
+    return {
+        "depth"                 : depth,
+        "counts"                : counts,
+        "oldest_pending_age_sec": round((now - oldest["created_at"]).total_seconds(), 1) if oldest else 0,
+        "delivery_lag_ms"       : {"p50": _pct(0.50), "p95": _pct(0.95), "p99": _pct(0.99),
+                                   "sample": len(lags)},
+    }
+
+
+if __name__ == "__main__":
+    OutboxDispatcher().run_forever()
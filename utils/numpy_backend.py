@@ -0,0 +1,83 @@
+# utils/numpy_backend.py
+
+import numpy as np
+
+# Parameter names as they appear in UrgencyModel.state_dict()
+WEIGHT_KEYS = ("embedding.weight", "fc1.weight", "fc1.bias", "fc2.weight", "fc2.bias")
+
+
+class NumpyBackend:
+    """
+    Torch-free re-implementation of UrgencyModel.forward:
+    masked mean of the token embeddings → Linear → ReLU → Linear.
+    """
+
+    name      = "numpy"
+    precision = "fp32"
+
+    def __init__(self, weights: dict):
+        self.embedding = np.ascontiguousarray(weights["embedding.weight"], dtype=np.float32)
+        # Pre-transpose so the forward pass is a plain matmul
+        self.fc1_w = np.ascontiguousarray(weights["fc1.weight"].T, dtype=np.float32)
+        self.fc1_b = np.asarray(weights["fc1.bias"], dtype=np.float32)
+        self.fc2_w = np.ascontiguousarray(weights["fc2.weight"].T, dtype=np.float32)
+        self.fc2_b = np.asarray(weights["fc2.bias"], dtype=np.float32)
+
+    @classmethod
+    def from_npz(cls, path: str, precision: str = "fp32") -> "NumpyBackend":
+        backend_cls = QuantizedNumpyBackend if precision == "int8" else cls
+        with np.load(path) as data:
+            return backend_cls({key: data[key] for key in WEIGHT_KEYS})
+
+    def weight_bytes(self) -> int:
+        return sum(a.nbytes for a in vars(self).values() if isinstance(a, np.ndarray))
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        x        = np.asarray(x, dtype=np.int64)
+        embedded = self.embedding[x]                              # (B, L, D)
+        mask     = (x != 0).astype(np.float32)[:, :, None]        # (B, L, 1)
+        summed   = (embedded * mask).sum(axis=1)                  # (B, D)
+        lengths  = np.maximum(mask.sum(axis=1), 1.0)              # (B, 1)
+        averaged = summed / lengths
+        hidden   = np.maximum(averaged @ self.fc1_w + self.fc1_b, 0.0)
+        return hidden @ self.fc2_w + self.fc2_b                   # (B, 1)
+
+    def predict(self, encoded) -> list:
+        """Raw model outputs for a batch of encoded (padded) token id rows."""
+        return self.forward(encoded).reshape(-1).tolist()
+
+
+def _quantize_rows(weight: np.ndarray):
+    """Symmetric per-output-channel int8 quantisation of a (out, in) matrix."""
+    scale = np.abs(weight).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.round(weight / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+class QuantizedNumpyBackend(NumpyBackend):
+    """
+    Reduced-precision variant: fp16 embedding table and int8 Linear
+    weights with per-output-channel scales, dequantised after the matmul.
+    """
+
+    precision = "int8"
+
+    def __init__(self, weights: dict):
+        self.embedding = np.ascontiguousarray(weights["embedding.weight"], dtype=np.float16)
+
+        fc1_q, self.fc1_scale = _quantize_rows(np.asarray(weights["fc1.weight"], dtype=np.float32))
+        fc2_q, self.fc2_scale = _quantize_rows(np.asarray(weights["fc2.weight"], dtype=np.float32))
+        self.fc1_q = np.ascontiguousarray(fc1_q.T)
+        self.fc2_q = np.ascontiguousarray(fc2_q.T)
+        self.fc1_b = np.asarray(weights["fc1.bias"], dtype=np.float32)
+        self.fc2_b = np.asarray(weights["fc2.bias"], dtype=np.float32)
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        x        = np.asarray(x, dtype=np.int64)
+        mask     = (x != 0).astype(np.float32)[:, :, None]
+        summed   = (self.embedding[x].astype(np.float32) * mask).sum(axis=1)
+        lengths  = np.maximum(mask.sum(axis=1), 1.0)
+        averaged = summed / lengths
+        hidden   = np.maximum((averaged @ self.fc1_q) * self.fc1_scale + self.fc1_b, 0.0)
+        return (hidden @ self.fc2_q) * self.fc2_scale + self.fc2_b
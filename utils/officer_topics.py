@@ -0,0 +1,102 @@
+# utils/officer_topics.py
+
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.firebase_service import firebase_service
+
+# Every officer's device is subscribed to the FCM topic of their
+# department, so a broadcast to all officers is one topic send per
+# department instead of one send per device. The topic a user's token is
+# currently subscribed to is stored on the user as `fcm_topic`; an
+# officer without it (subscription failed, or registered before topics)
+# still gets broadcasts sent straight to their token.
+OFFICER_TOPICS       = os.getenv("FCM_OFFICER_TOPICS", "True") == "True"
+OFFICER_TOPIC_PREFIX = os.getenv("FCM_OFFICER_TOPIC_PREFIX", "officers-")
+
+_TOPIC_UNSAFE = re.compile(r"[^a-zA-Z0-9\-_.~%]+")
+
+
+def officer_topic(department: Optional[str]) -> str:
+    """FCM topic name for a department (officers with none share "general")."""
+    name = _TOPIC_UNSAFE.sub("-", (department or "").strip().lower()).strip("-")
+    return f"{OFFICER_TOPIC_PREFIX}{name or 'general'}"
+
+
+def resubscribe(db, user: Dict, token: Optional[str], department: Optional[str]) -> Optional[str]:
+    """
+    Move `user` (an officer document with its current fcm_token/fcm_topic)
+    onto `token` subscribed to `department`'s topic, dropping the old
+    subscription if the token or topic changed. Passing token=None only
+    unsubscribes. Returns the topic now stored on the user, if any.
+    """
+    if not OFFICER_TOPICS:
+        return None
+
+    old_token, old_topic = user.get("fcm_token"), user.get("fcm_topic")
+    new_topic = officer_topic(department) if token else None
+    if old_token == token and old_topic == new_topic:
+        return old_topic
+
+    if old_token and old_topic:
+        firebase_service.unsubscribe_from_topic([old_token], old_topic)
+
+    subscribed = bool(new_topic) and token in firebase_service.subscribe_to_topic([token], new_topic)
+    if subscribed:
+        db.users.update_one({"_id": user["_id"]}, {"$set": {"fcm_topic": new_topic}})
+        print(f"📡 Officer {user['_id']} subscribed to topic '{new_topic}'")
+        return new_topic
+
+    db.users.update_one({"_id": user["_id"]}, {"$unset": {"fcm_topic": ""}})
+    if new_topic:
+        print(f"⚠️ Officer {user['_id']} could not be subscribed to '{new_topic}'; direct sends will be used")
+    return None
+
+
+def broadcast_targets(db) -> Tuple[List[str], List[str]]:
+    """
+    (topics, tokens) that together reach every officer with a device:
+    one topic per department that has subscribed officers, plus the tokens
+    of officers who are not subscribed to any topic.
+    """
+    query = {"role": "officer", "fcm_token": {"$exists": True, "$ne": None}}
+    if not OFFICER_TOPICS:
+        return [], [o["fcm_token"] for o in db.users.find(query, {"fcm_token": 1})]
+
+    topics = sorted(t for t in db.users.distinct("fcm_topic", query) if t)
+    tokens = [o["fcm_token"] for o in db.users.find({**query, "fcm_topic": {"$exists": False}}, {"fcm_token": 1})]
+    return topics, tokens
+
+
+def sync_officer_topics(db) -> Dict:
+    """
+    Subscribe every officer token that has no (or an outdated) topic, in
+    one batch call per department. Used to backfill existing officers and
+    to repair after failed subscriptions.
+    """
+    by_topic = {}
+    for officer in db.users.find(
+        {"role": "officer", "fcm_token": {"$exists": True, "$ne": None}},
+        {"fcm_token": 1, "fcm_topic": 1, "department": 1}
+    ):
+        topic = officer_topic(officer.get("department"))
+        if officer.get("fcm_topic") != topic:
+            by_topic.setdefault(topic, []).append(officer)
+
+    subscribed, failed = 0, 0
+    for topic, officers in by_topic.items():
+        for officer in officers:
+            if officer.get("fcm_topic"):
+                firebase_service.unsubscribe_from_topic([officer["fcm_token"]], officer["fcm_topic"])
+        ok   = set(firebase_service.subscribe_to_topic([o["fcm_token"] for o in officers], topic))
+        done = [o["_id"] for o in officers if o["fcm_token"] in ok]
+        if done:
+            db.users.update_many({"_id": {"$in": done}}, {"$set": {"fcm_topic": topic}})
+        db.users.update_many({"_id": {"$in": [o["_id"] for o in officers if o["fcm_token"] not in ok]}},
+                             {"$unset": {"fcm_topic": ""}})
+        subscribed += len(done)
+        failed     += len(officers) - len(done)
+
+    print(f"📡 Officer topic sync: {subscribed} subscribed, {failed} failed")
+    return {"subscribed": subscribed, "failed": failed, "topics": sorted(by_topic)}
@@ -0,0 +1,121 @@
+# utils/phrase_matcher.py
+
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (start word index, length in words, matched text, value, exact?)
+Match = Tuple[int, int, str, Any, bool]
+
+
+class _Node:
+    __slots__ = ("children", "fail", "depth", "outputs")
+
+    def __init__(self, depth: int):
+        self.children = {}
+        self.fail     = None
+        self.depth    = depth
+        self.outputs  = []      # (length, value) for every phrase ending here, incl. via fail links
+
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton over word tokens.
+
+    Phrases ("gas leak", "fire", ...) are split into words and compiled into
+    a trie with failure links once. find_all() then walks a tokenised text
+    in a single pass and reports every phrase occurrence, without building
+    the n-gram strings.
+
+    An optional fallback is tried for n-grams that are not phrases
+    themselves but whose first n-1 words are a trie path (every unigram
+    qualifies). Those are exactly the n-grams a suffix-only transform such
+    as stemming can turn into a phrase. The nodes come from the current
+    state's failure chain, so the pass stays linear.
+    """
+
+    def __init__(self, phrases: Dict[str, Any], max_words: int = 3):
+        self.max_words = max_words
+        self.root      = _Node(0)
+        self.size      = 0
+
+        for phrase, value in phrases.items():
+            words = phrase.split()
+            if not words or len(words) > max_words:
+                continue
+            node = self.root
+            for word in words:
+                child = node.children.get(word)
+                if child is None:
+                    child = node.children[word] = _Node(node.depth + 1)
+                node = child
+            node.outputs.append((len(words), value))
+            self.size += 1
+
+        self._link()
+
+    def _link(self):
+        self.root.fail = self.root
+        queue = deque()
+        for child in self.root.children.values():
+            child.fail = self.root
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for word, child in node.children.items():
+                fail = node.fail
+                while fail is not self.root and word not in fail.children:
+                    fail = fail.fail
+                target = fail.children.get(word)
+                child.fail = target if target is not None and target is not child else self.root
+                # Outputs of the longest proper suffix are also outputs here
+                child.outputs = child.outputs + child.fail.outputs
+                queue.append(child)
+
+    def find_all(self, words: List[str],
+                 fallback: Optional[Callable[[str], Optional[Any]]] = None,
+                 accept: Optional[Callable[[Any], bool]] = None) -> List[Match]:
+        """
+        All matches in `words`, ordered by (length, start): every unigram
+        match first, then bigrams, then trigrams, each left to right.
+        `accept` restricts exact matches to some of the phrases (when one
+        automaton serves several tables); rejected ones count as misses.
+        """
+        root, max_words = self.root, self.max_words
+        matches = []
+        node    = root
+
+        for end, word in enumerate(words):
+            prev = node
+            while node is not root and word not in node.children:
+                node = node.fail
+            node = node.children.get(word, root)
+
+            exact = 0       # bit n set → an exact n-word phrase ends at `end`
+            for length, value in node.outputs:
+                if accept is not None and not accept(value):
+                    continue
+                exact |= 1 << length
+                matches.append((end - length + 1, length, None, value, True))
+
+            if fallback is None:
+                continue
+
+            # Suffixes of the text before `word` that are trie paths
+            prefix = prev
+            while True:
+                length = prefix.depth + 1
+                if length <= max_words and length <= end + 1 and not exact & (1 << length):
+                    text  = word if length == 1 else " ".join(words[end - length + 1:end + 1])
+                    value = fallback(text)
+                    if value is not None:
+                        matches.append((end - length + 1, length, text, value, False))
+                if prefix is root:
+                    break
+                prefix = prefix.fail
+
+        matches.sort(key=lambda m: (m[1], m[0]))
+        return [
+            (start, length, text if text is not None else " ".join(words[start:start + length]), value, is_exact)
+            for start, length, text, value, is_exact in matches
+        ]
@@ -1,50 +1,27 @@
 # utils/priority_engine.py
 
-import re
-
-# Keywords mapped to urgency weight
-KEYWORD_WEIGHTS = {
-    "accident": 30,
-    "fire": 35,
-    "flood": 30,
-    "overflow": 25,
-    "blocked": 20,
-    "leak": 20,
-    "burst": 30,
-    "danger": 25,
-    "health": 20,
-    "garbage": 15,
-    "sewage": 25,
-    "electric": 30,
-    "pothole": 20,
-}
-
-# Category base urgency
-CATEGORY_BASE_SCORE = {
-    "Roads": 20,
-    "Sanitation": 25,
-    "Water Supply": 30,
-    "Electricity": 35,
-    "Drainage": 30,
-}
+from utils.keyword_rules import keyword_rules, split_words
+
+# Keyword weights and category base scores live in utils/keyword_rules.json
+# ("priority_engine" section) and share one compiled matcher with urgency_engine.
+
 
 def calculate_urgency(category: str, description: str) -> int:
     """
     Calculate urgency score (0–100)
     based on category + NLP keyword analysis
     """
+    rules = keyword_rules.get()
 
     score = 0
 
     # 1️⃣ Category base score
-    score += CATEGORY_BASE_SCORE.get(category, 10)
-
-    # 2️⃣ Keyword matching (simple NLP)
-    desc = description.lower()
+    score += rules.category_base_score.get(category, rules.default_category_score)
 
-    for keyword, weight in KEYWORD_WEIGHTS.items():
-        if re.search(rf"\b{keyword}\b", desc):
-            score += weight
+    # 2️⃣ Keyword matching (simple NLP) — each keyword counts once
+    weights = rules.priority_weights
+    matches = rules.matcher.find_all(split_words(description), accept=weights.__contains__)
+    score  += sum(weights[keyword] for keyword in {m[3] for m in matches})
 
     # 3️⃣ Length-based severity (long complaints = more serious)
     if len(description) > 100:
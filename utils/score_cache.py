@@ -0,0 +1,94 @@
+# utils/score_cache.py
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from utils.metrics import metrics
+
+
+def file_fingerprint(paths: Iterable[str]) -> str:
+    """Short hash of (path, size, mtime) for each file; changes when any file does."""
+    h = hashlib.sha256()
+    for path in paths:
+        try:
+            st = os.stat(path)
+            h.update(f"{path}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{path}:missing;".encode())
+    return h.hexdigest()[:16]
+
+
+class ScoreCache:
+    """
+    Bounded LRU of urgency scores keyed by sha256(model_version + normalised text).
+    Watches the model files and clears itself when they change.
+    """
+
+    def __init__(self, max_size: int = 4096, watch_paths: Iterable[str] = (),
+                 check_interval: float = 30.0, name: str = "ml_score_cache"):
+        self.max_size       = max_size
+        self.watch_paths    = list(watch_paths)
+        self.check_interval = check_interval
+        self.name           = name
+
+        self._lock        = threading.Lock()
+        self._data        = OrderedDict()
+        self._fingerprint = file_fingerprint(self.watch_paths)
+        self._checked_at  = time.monotonic()
+
+        metrics.register_gauge(f"{name}_size", lambda: len(self._data))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(normalised_text: str, model_version: str) -> str:
+        return hashlib.sha256(f"{model_version}\0{normalised_text}".encode("utf-8")).hexdigest()
+
+    def _check_files(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        fingerprint = file_fingerprint(self.watch_paths)
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self.clear()
+            metrics.inc(f"{self.name}_invalidations_total")
+            print("♻️  Model files changed — score cache cleared")
+
+    def get(self, key: str) -> Optional[int]:
+        if not self.enabled:
+            return None
+        self._check_files()
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+        metrics.inc(f"{self.name}_hits_total" if value is not None else f"{self.name}_misses_total")
+        return value
+
+    def put(self, key: str, value: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size"  : len(self._data),
+            "hits"  : metrics.get(f"{self.name}_hits_total"),
+            "misses": metrics.get(f"{self.name}_misses_total"),
+        }
@@ -0,0 +1,267 @@
+# utils/scoring_engine.py
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import metrics
+
+# ── Configuration ─────────────────────────────────────────────────
+# The stage mix is chosen per deployment, e.g.
+#   SCORING_STAGES=ml_text,keywords,gemini_image
+#   SCORING_COMBINER=weighted  SCORING_WEIGHTS=ml_text=0.7,keywords=0.3
+#   SCORING_STAGE_TIMEOUTS=ml_text=1.5,gemini_image=6
+# Score stages (0-100) are merged by the combiner; boost stages are added
+# on top and the sum is clamped to 0-100.
+SCORING_STAGES   = os.getenv("SCORING_STAGES", "ml_text,gemini_image")
+SCORING_COMBINER = os.getenv("SCORING_COMBINER", "max")
+SCORING_WEIGHTS  = os.getenv("SCORING_WEIGHTS", "")
+SCORING_TIMEOUTS = os.getenv("SCORING_STAGE_TIMEOUTS", "")
+SCORING_WORKERS  = int(os.getenv("SCORING_WORKERS", "8"))
+SCORING_DEADLINE = float(os.getenv("SCORING_DEADLINE_SECONDS", "8"))
+
+SCORE = "score"
+BOOST = "boost"
+
+_executor     = None
+_executor_pid = None
+
+
+def get_scoring_executor() -> ThreadPoolExecutor:
+    # Rebuilt after a fork: the parent's worker threads don't exist in the child
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ThreadPoolExecutor(
+            max_workers=SCORING_WORKERS,
+            thread_name_prefix="complaint-scoring"
+        )
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def _parse_pairs(spec: str) -> Dict[str, float]:
+    """'a=1,b=0.5' → {'a': 1.0, 'b': 0.5}"""
+    pairs = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            pairs[name.strip()] = float(value)
+    return pairs
+
+
+class Stage:
+    """
+    One scoring stage. fn(ctx) returns an int, or a dict with "value" plus
+    extra fields (e.g. the Gemini analysis note) kept in the stage record.
+
+    kind       → SCORE (0-100, merged by the combiner) or BOOST (added on top)
+    timeout    → seconds to wait for this stage, capped by the engine deadline
+    fallback   → fn(ctx) used when the stage fails or times out; None drops
+                 the stage from the combination
+    deferrable → a timed-out result is still applied later (see
+                 complaint_pipeline.apply_late_stages) instead of discarded
+    needs_image→ skipped when the complaint has no image
+    """
+
+    def __init__(self, name: str, kind: str, fn: Callable[[Dict], object], timeout: float,
+                 fallback: Optional[Callable[[Dict], int]] = None,
+                 deferrable: bool = False, needs_image: bool = False):
+        self.name        = name
+        self.kind        = kind
+        self.fn          = fn
+        self.timeout     = timeout
+        self.fallback    = fallback
+        self.deferrable  = deferrable
+        self.needs_image = needs_image
+
+
+# ── Built-in stages ───────────────────────────────────────────────
+# Heavy modules are imported inside the stage so a deployment only pays
+# for the stages it enables.
+def _ml_text(ctx: Dict) -> int:
+    from utils.ml_model import predict_score
+    return predict_score(ctx["description"])
+
+
+def _keywords(ctx: Dict) -> int:
+    from utils.urgency_engine import urgency_analyzer
+    return urgency_analyzer.analyze_text(ctx["description"], ctx.get("category") or "")["score"]
+
+
+def _rules(ctx: Dict) -> int:
+    from utils.priority_engine import calculate_urgency
+    return calculate_urgency(ctx.get("category") or "", ctx["description"])
+
+
+def _gemini_image(ctx: Dict) -> Dict:
+    from utils.image_analyzer import analyze_complaint_image
+    result = analyze_complaint_image(ctx.get("image_url"), image_bytes=ctx.get("image_bytes"))
+    return {"value": result["boost"], "analysis": result["analysis"], "severity": result["severity"]}
+
+
+def _clip_image(ctx: Dict) -> int:
+    import requests
+    from utils.urgency_engine import analyze_image_urgency
+
+    image = ctx.get("image_bytes")
+    if image is None:
+        image = requests.get(ctx["image_url"], timeout=10).content
+    return analyze_image_urgency(image, ctx.get("category") or "")
+
+
+STAGES = {
+    "ml_text"     : lambda timeout: Stage("ml_text", SCORE, _ml_text, timeout or 3.0, fallback=_keywords),
+    "keywords"    : lambda timeout: Stage("keywords", SCORE, _keywords, timeout or 1.0),
+    "rules"       : lambda timeout: Stage("rules", SCORE, _rules, timeout or 1.0),
+    "gemini_image": lambda timeout: Stage("gemini_image", BOOST, _gemini_image, timeout or SCORING_DEADLINE,
+                                          fallback=lambda ctx: 0, deferrable=True, needs_image=True),
+    "clip_image"  : lambda timeout: Stage("clip_image", BOOST, _clip_image, timeout or SCORING_DEADLINE,
+                                          fallback=lambda ctx: 0, deferrable=True, needs_image=True),
+}
+
+
+# ── Combiners (over the score stages' values) ─────────────────────
+def _weighted(values: Dict[str, int], weights: Dict[str, float]) -> int:
+    total = sum(weights.get(name, 1.0) for name in values)
+    return round(sum(v * weights.get(name, 1.0) for name, v in values.items()) / total) if total else 0
+
+
+COMBINERS = {
+    "max"     : lambda values, weights: max(values.values()),
+    "mean"    : lambda values, weights: round(sum(values.values()) / len(values)),
+    "first"   : lambda values, weights: next(iter(values.values())),
+    "weighted": _weighted,
+}
+
+
+class ScoringEngine:
+    """
+    Runs the configured stages concurrently on the scoring pool, each
+    under its own timeout and the overall deadline, and combines them into
+    one urgency. Per-stage time is exported as scoring_stage_ms{stage=...}.
+    """
+
+    def __init__(self, stages: List[Stage], combiner: str = "max",
+                 weights: Optional[Dict[str, float]] = None, deadline: float = SCORING_DEADLINE):
+        if combiner not in COMBINERS:
+            raise ValueError(f"Unknown SCORING_COMBINER '{combiner}' (expected one of {', '.join(COMBINERS)})")
+        self.stages   = stages
+        self.combiner = combiner
+        self.weights  = weights or {}
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls) -> "ScoringEngine":
+        timeouts = _parse_pairs(SCORING_TIMEOUTS)
+        stages   = []
+        for name in (n.strip() for n in SCORING_STAGES.split(",")):
+            if not name:
+                continue
+            if name not in STAGES:
+                raise ValueError(f"Unknown scoring stage '{name}' (expected one of {', '.join(STAGES)})")
+            stages.append(STAGES[name](timeouts.get(name)))
+        return cls(stages, SCORING_COMBINER, _parse_pairs(SCORING_WEIGHTS))
+
+    def combine(self, stage_records: Dict[str, Dict]) -> int:
+        scores, boost = {}, 0
+        for stage in self.stages:
+            record = stage_records.get(stage.name)
+            if record is None or record.get("value") is None:
+                continue
+            if stage.kind == SCORE:
+                scores[stage.name] = record["value"]
+            else:
+                boost += record["value"]
+        base = COMBINERS[self.combiner](scores, self.weights) if scores else 0
+        return max(0, min(100, base + boost))
+
+    def _run_stage(self, stage: Stage, ctx: Dict) -> Dict:
+        start = time.perf_counter()
+        try:
+            result = stage.fn(ctx)
+        finally:
+            metrics.observe("scoring_stage_ms", (time.perf_counter() - start) * 1000,
+                            labels={"stage": stage.name})
+        record = dict(result) if isinstance(result, dict) else {"value": result}
+        record["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return record
+
+    def _fallback(self, stage: Stage, ctx: Dict, status: str) -> Dict:
+        metrics.inc("scoring_stage_fallbacks_total", labels={"stage": stage.name, "reason": status})
+        value = None
+        if stage.fallback is not None:
+            try:
+                value = stage.fallback(ctx)
+            except Exception as e:
+                print(f"⚠️ Scoring fallback for {stage.name} failed: {e}")
+        return {"value": value, "status": status}
+
+    def score(self, ctx: Dict) -> Tuple[Dict, Dict[str, Future]]:
+        """
+        Score one complaint. ctx holds description, category, image_url and
+        image_bytes. Returns (scores, pending): scores has the urgency and a
+        record per stage; pending maps each deferrable stage that missed
+        its timeout to its still-running future.
+        """
+        start    = time.perf_counter()
+        executor = get_scoring_executor()
+        has_image = bool(ctx.get("image_url") or ctx.get("image_bytes"))
+
+        futures = {}
+        records = {}
+        for stage in self.stages:
+            if stage.needs_image and not has_image:
+                records[stage.name] = {"value": None, "status": "skipped"}
+                continue
+            futures[stage.name] = executor.submit(self._run_stage, stage, ctx)
+
+        pending = {}
+        for stage in self.stages:
+            future = futures.get(stage.name)
+            if future is None:
+                continue
+            remaining = min(stage.timeout, self.deadline) - (time.perf_counter() - start)
+            try:
+                records[stage.name] = {**future.result(timeout=max(0.0, remaining)), "status": "ok"}
+            except FutureTimeout:
+                records[stage.name] = self._fallback(stage, ctx, "pending" if stage.deferrable else "timeout")
+                if stage.deferrable:
+                    pending[stage.name] = future
+                print(f"⏱️ Scoring stage {stage.name} missed its {min(stage.timeout, self.deadline)}s budget")
+            except Exception as e:
+                print(f"⚠️ Scoring stage {stage.name} failed: {e}")
+                records[stage.name] = self._fallback(stage, ctx, "error")
+
+        urgency  = self.combine(records)
+        total_ms = (time.perf_counter() - start) * 1000
+        metrics.observe("scoring_stage_ms", total_ms, labels={"stage": "total"})
+
+        summary = ", ".join(f"{name}={r.get('value')}" for name, r in records.items())
+        print(f"📊 {summary} → Final={urgency}")
+
+        return {
+            "urgency" : urgency,
+            "combiner": self.combiner,
+            "stages"  : records,
+            "pending" : sorted(pending),
+            "total_ms": round(total_ms, 1),
+        }, pending
+
+    def rescore(self, scores: Dict, late: Dict[str, Dict]) -> int:
+        """Urgency once late stage records replace the fallbacks in `scores`."""
+        return self.combine({**scores["stages"], **late})
+
+
+_engine      = None
+_engine_lock = threading.Lock()
+
+
+def get_scoring_engine() -> ScoringEngine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ScoringEngine.from_env()
+    return _engine
@@ -0,0 +1,59 @@
+# utils/tokenizer.py
+
+import re
+from typing import Dict, List
+
+import numpy as np
+
+_NON_ALPHA = re.compile(r'[^a-z\s]+')
+
+
+class Tokenizer:
+    """
+    Text cleaning + encoding for UrgencyModel.
+
+    The cleaning regex is compiled once and whitespace is collapsed with
+    str.split() instead of a second regex. Batches are encoded in bulk:
+    all tokens are flattened, mapped to ids with one np.fromiter pass over
+    the vocabulary's bound dict.get, and scattered into a preallocated
+    (batch, max_len) int64 array with a length mask.
+    """
+
+    def __init__(self, vocab: Dict[str, int], max_len: int):
+        self.max_len = max_len
+        self.pad_id  = vocab["<PAD>"]
+        self.unk_id  = vocab["<UNK>"]
+        self._get    = vocab.get
+        self._cols   = np.arange(max_len)
+
+    @staticmethod
+    def clean(text) -> str:
+        return ' '.join(_NON_ALPHA.sub('', str(text).lower()).split())
+
+    def encode_batch(self, cleaned_texts: List[str]) -> np.ndarray:
+        """Encode already-cleaned texts into a padded (batch, max_len) array."""
+        out = np.full((len(cleaned_texts), self.max_len), self.pad_id, dtype=np.int64)
+        get, unk, max_len = self._get, self.unk_id, self.max_len
+
+        if len(cleaned_texts) == 1:
+            # Single text: a direct row write beats the mask scatter
+            words = cleaned_texts[0].split()[:max_len]
+            if words:
+                out[0, :len(words)] = [get(w, unk) for w in words]
+            return out
+
+        tokens  = []
+        lengths = np.empty(len(cleaned_texts), dtype=np.int64)
+        for row, text in enumerate(cleaned_texts):
+            words = text.split()[:max_len]
+            lengths[row] = len(words)
+            tokens.extend(words)
+
+        if tokens:
+            ids = np.fromiter((get(w, unk) for w in tokens), dtype=np.int64, count=len(tokens))
+            # Row-major boolean mask matches the order tokens were flattened in
+            out[self._cols < lengths[:, None]] = ids
+        return out
+
+    def encode(self, cleaned_text: str) -> np.ndarray:
+        return self.encode_batch([cleaned_text])[0]
@@ -0,0 +1,68 @@
+# utils/torch_backend.py
+
+import io
+
+import torch
+import torch.nn as nn
+
+
+class UrgencyModel(nn.Module):
+    def __init__(self, vocab_size, embed_dim=64):
+        super(UrgencyModel, self).__init__()
+        self.embedding = nn.Embedding(vocab_size, embed_dim, padding_idx=0)
+        self.fc1 = nn.Linear(embed_dim, 32)
+        self.relu = nn.ReLU()
+        self.fc2 = nn.Linear(32, 1)
+
+    def forward(self, x):
+        embedded = self.embedding(x)
+        mask = (x != 0).float().unsqueeze(2)
+        summed = (embedded * mask).sum(1)
+        lengths = mask.sum(1).clamp(min=1)
+        averaged = summed / lengths
+        out = self.relu(self.fc1(averaged))
+        return self.fc2(out)
+
+
+def quantize_model(model: UrgencyModel) -> UrgencyModel:
+    """
+    int8 dynamic quantisation of the Linear layers plus an fp16 embedding
+    table. forward() is unchanged: the fp16 embeddings are promoted back
+    to fp32 when multiplied by the mask.
+    """
+    model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    model.embedding.half()
+    return model
+
+
+class TorchBackend:
+    """Runs UrgencyModel with PyTorch on CPU."""
+
+    name = "torch"
+
+    def __init__(self, model: UrgencyModel, precision: str = "fp32"):
+        self.model     = model
+        self.precision = precision
+        self.model.eval()
+
+    @classmethod
+    def from_state_dict(cls, model_path: str, vocab_size: int, precision: str = "fp32") -> "TorchBackend":
+        model = UrgencyModel(vocab_size)
+        model.load_state_dict(
+            torch.load(model_path, map_location=torch.device('cpu'))
+        )
+        model.eval()
+        if precision == "int8":
+            model = quantize_model(model)
+        return cls(model, precision)
+
+    def weight_bytes(self) -> int:
+        buffer = io.BytesIO()
+        torch.save(self.model.state_dict(), buffer)
+        return buffer.tell()
+
+    def predict(self, encoded) -> list:
+        """Raw model outputs for a batch of encoded (padded) token id rows."""
+        tensor = torch.as_tensor(encoded, dtype=torch.long)
+        with torch.no_grad():
+            return self.model(tensor).view(-1).tolist()
@@ -3,246 +3,41 @@
 import requests
 import base64
 import os
-import re
-from typing import Optional, List, Dict, Set
+import time
+from io import BytesIO
+from typing import Callable, Optional, List, Dict, Set, Union
 from collections import defaultdict
 
+from utils.keyword_rules import KeywordRules, CompiledRules, keyword_rules, split_words
+from utils.circuit_breaker import CircuitBreaker
+from utils.metrics import metrics
+
+
 class UrgencyAnalyzer:
+    """
+    Keyword-based text urgency. The keyword, stemming and category tables
+    come from utils/keyword_rules.json (see utils/keyword_rules.py) and are
+    re-read when the file changes.
+    """
 
-    def __init__(self):
-        self.keyword_db = self._build_keyword_database()
-        self.stemming_rules = self._build_stemming_rules()
-
-    def _build_keyword_database(self) -> Dict[str, Dict[str, any]]:
-
-
-        keywords = {
-            # ===== CRITICAL (90-100) - LIFE THREATENING =====
-            "death": {"severity": 100, "category": "emergency", "boost": 50},
-            "died": {"severity": 100, "category": "emergency", "boost": 50},
-            "fatal": {"severity": 100, "category": "emergency", "boost": 50},
-            "casualty": {"severity": 100, "category": "emergency", "boost": 50},
-            "casualties": {"severity": 100, "category": "emergency", "boost": 50},
-
-            "fire": {"severity": 95, "category": "emergency", "boost": 45},
-            "burning": {"severity": 95, "category": "emergency", "boost": 45},
-            "flame": {"severity": 95, "category": "emergency", "boost": 45},
-            "blaze": {"severity": 95, "category": "emergency", "boost": 45},
-
-            "explosion": {"severity": 95, "category": "emergency", "boost": 45},
-            "blast": {"severity": 95, "category": "emergency", "boost": 45},
-            "explode": {"severity": 95, "category": "emergency", "boost": 45},
-            "exploded": {"severity": 95, "category": "emergency", "boost": 45},
-
-            "electrocution": {"severity": 95, "category": "emergency", "boost": 45},
-            "electrocuted": {"severity": 95, "category": "emergency", "boost": 45},
-            "electric shock": {"severity": 95, "category": "emergency", "boost": 45},
-            "live wire": {"severity": 95, "category": "emergency", "boost": 45},
-            "exposed wire": {"severity": 90, "category": "emergency", "boost": 40},
-
-            "collapse": {"severity": 95, "category": "emergency", "boost": 45},
-            "collapsed": {"severity": 95, "category": "emergency", "boost": 45},
-            "building collapse": {"severity": 100, "category": "emergency", "boost": 50},
-            "structural collapse": {"severity": 100, "category": "emergency", "boost": 50},
-
-            # ===== SEVERE (70-89) - MAJOR HAZARD =====
-            "accident": {"severity": 85, "category": "severe", "boost": 35},
-            "injured": {"severity": 85, "category": "severe", "boost": 35},
-            "injury": {"severity": 85, "category": "severe", "boost": 35},
-            "hurt": {"severity": 80, "category": "severe", "boost": 30},
-
-            "gas leak": {"severity": 90, "category": "severe", "boost": 40},
-            "gas leakage": {"severity": 90, "category": "severe", "boost": 40},
-            "lpg leak": {"severity": 90, "category": "severe", "boost": 40},
-            "smell gas": {"severity": 85, "category": "severe", "boost": 35},
-
-            "flood": {"severity": 85, "category": "severe", "boost": 35},
-            "flooding": {"severity": 85, "category": "severe", "boost": 35},
-            "waterlogged": {"severity": 85, "category": "severe", "boost": 35},
-            "waterlogging": {"severity": 85, "category": "severe", "boost": 35},
-            "submerged": {"severity": 85, "category": "severe", "boost": 35},
-
-            "overflow": {"severity": 80, "category": "severe", "boost": 30},
-            "overflowing": {"severity": 80, "category": "severe", "boost": 30},
-
-            "sewage overflow": {"severity": 85, "category": "severe", "boost": 35},
-            "sewage burst": {"severity": 85, "category": "severe", "boost": 35},
-
-            "pipe burst": {"severity": 85, "category": "severe", "boost": 35},
-            "water burst": {"severity": 85, "category": "severe", "boost": 35},
-            "burst pipe": {"severity": 85, "category": "severe", "boost": 35},
-
-            "landslide": {"severity": 90, "category": "severe", "boost": 40},
-            "mudslide": {"severity": 90, "category": "severe", "boost": 40},
-
-            "toxic": {"severity": 85, "category": "severe", "boost": 35},
-            "poisonous": {"severity": 85, "category": "severe", "boost": 35},
-            "hazardous": {"severity": 85, "category": "severe", "boost": 35},
-            "contaminated": {"severity": 80, "category": "severe", "boost": 30},
-            "contamination": {"severity": 80, "category": "severe", "boost": 30},
-
-            # ===== HIGH (50-69) - URGENT ATTENTION =====
-            "emergency": {"severity": 70, "category": "high", "boost": 25},
-            "urgent": {"severity": 70, "category": "high", "boost": 25},
-            "critical": {"severity": 70, "category": "high", "boost": 25},
-            "severe": {"severity": 70, "category": "high", "boost": 25},
-
-            "dangerous": {"severity": 65, "category": "high", "boost": 20},
-            "danger": {"severity": 65, "category": "high", "boost": 20},
-            "unsafe": {"severity": 65, "category": "high", "boost": 20},
-            "hazard": {"severity": 65, "category": "high", "boost": 20},
-
-            "major": {"severity": 60, "category": "high", "boost": 15},
-            "massive": {"severity": 60, "category": "high", "boost": 15},
-            "huge": {"severity": 60, "category": "high", "boost": 15},
-            "large": {"severity": 55, "category": "high", "boost": 10},
-
-            "broken": {"severity": 55, "category": "high", "boost": 10},
-            "damaged": {"severity": 55, "category": "high", "boost": 10},
-            "damage": {"severity": 55, "category": "high", "boost": 10},
-
-            "crack": {"severity": 55, "category": "high", "boost": 10},
-            "cracked": {"severity": 55, "category": "high", "boost": 10},
-            "cracking": {"severity": 55, "category": "high", "boost": 10},
-            "cracks": {"severity": 55, "category": "high", "boost": 10},
-
-            "deep": {"severity": 55, "category": "high", "boost": 10},
-            "wide": {"severity": 50, "category": "high", "boost": 8},
-
-            "pothole": {"severity": 50, "category": "high", "boost": 8},
-            "potholes": {"severity": 50, "category": "high", "boost": 8},
-
-            # ===== MEDIUM (30-49) - NEEDS ATTENTION =====
-            "blocked": {"severity": 45, "category": "medium", "boost": 5},
-            "blockage": {"severity": 45, "category": "medium", "boost": 5},
-            "clogged": {"severity": 45, "category": "medium", "boost": 5},
-
-            "leakage": {"severity": 45, "category": "medium", "boost": 5},
-            "leaking": {"severity": 45, "category": "medium", "boost": 5},
-            "leak": {"severity": 45, "category": "medium", "boost": 5},
-            "dripping": {"severity": 40, "category": "medium", "boost": 3},
-
-            "garbage": {"severity": 40, "category": "medium", "boost": 3},
-            "trash": {"severity": 40, "category": "medium", "boost": 3},
-            "waste": {"severity": 40, "category": "medium", "boost": 3},
-            "rubbish": {"severity": 40, "category": "medium", "boost": 3},
-
-            "dirty": {"severity": 35, "category": "medium", "boost": 2},
-            "filthy": {"severity": 40, "category": "medium", "boost": 3},
-            "unclean": {"severity": 35, "category": "medium", "boost": 2},
-
-            "smell": {"severity": 35, "category": "medium", "boost": 2},
-            "stink": {"severity": 40, "category": "medium", "boost": 3},
-            "odor": {"severity": 35, "category": "medium", "boost": 2},
-            "foul": {"severity": 40, "category": "medium", "boost": 3},
-
-            "broken light": {"severity": 35, "category": "medium", "boost": 2},
-            "not working": {"severity": 35, "category": "medium", "boost": 2},
-
-            # ===== LOW (10-29) - MINOR ISSUES =====
-            "small": {"severity": 25, "category": "low", "boost": 1},
-            "minor": {"severity": 25, "category": "low", "boost": 1},
-            "little": {"severity": 20, "category": "low", "boost": 0},
-
-            # ===== ROADS SPECIFIC =====
-            "road damage": {"severity": 55, "category": "roads", "boost": 10},
-            "pavement": {"severity": 45, "category": "roads", "boost": 5},
-            "sidewalk": {"severity": 40, "category": "roads", "boost": 3},
-            "footpath": {"severity": 40, "category": "roads", "boost": 3},
-            "highway": {"severity": 60, "category": "roads", "boost": 15},
-            "main road": {"severity": 60, "category": "roads", "boost": 15},
-            "traffic": {"severity": 50, "category": "roads", "boost": 8},
-
-            # ===== WATER SPECIFIC =====
-            "no water": {"severity": 65, "category": "water", "boost": 20},
-            "water shortage": {"severity": 65, "category": "water", "boost": 20},
-            "dry tap": {"severity": 60, "category": "water", "boost": 15},
-            "contaminated water": {"severity": 85, "category": "water", "boost": 35},
-            "dirty water": {"severity": 70, "category": "water", "boost": 25},
-            "brown water": {"severity": 70, "category": "water", "boost": 25},
-            "yellow water": {"severity": 70, "category": "water", "boost": 25},
-
-            # ===== ELECTRICITY SPECIFIC =====
-            "power cut": {"severity": 60, "category": "electricity", "boost": 15},
-            "no electricity": {"severity": 60, "category": "electricity", "boost": 15},
-            "blackout": {"severity": 65, "category": "electricity", "boost": 20},
-            "transformer": {"severity": 70, "category": "electricity", "boost": 25},
-            "sparking": {"severity": 85, "category": "electricity", "boost": 35},
-            "short circuit": {"severity": 80, "category": "electricity", "boost": 30},
-
-            # ===== DRAINAGE SPECIFIC =====
-            "manhole": {"severity": 55, "category": "drainage", "boost": 10},
-            "open manhole": {"severity": 80, "category": "drainage", "boost": 30},
-            "drain": {"severity": 45, "category": "drainage", "boost": 5},
-            "sewer": {"severity": 50, "category": "drainage", "boost": 8},
-            "sewage": {"severity": 55, "category": "drainage", "boost": 10},
-
-            # ===== TIME/DURATION INDICATORS =====
-            "days": {"severity": 0, "category": "duration", "boost": 5},
-            "weeks": {"severity": 0, "category": "duration", "boost": 10},
-            "months": {"severity": 0, "category": "duration", "boost": 15},
-            "long time": {"severity": 0, "category": "duration", "boost": 10},
-            "since": {"severity": 0, "category": "duration", "boost": 5},
-
-            # ===== IMPACT INDICATORS =====
-            "many people": {"severity": 0, "category": "impact", "boost": 15},
-            "entire area": {"severity": 0, "category": "impact", "boost": 15},
-            "whole street": {"severity": 0, "category": "impact", "boost": 15},
-            "all residents": {"severity": 0, "category": "impact", "boost": 15},
-            "community": {"severity": 0, "category": "impact", "boost": 10},
-            "neighborhood": {"severity": 0, "category": "impact", "boost": 10},
-
-            # ===== QUANTITY INDICATORS =====
-            "multiple": {"severity": 0, "category": "quantity", "boost": 8},
-            "several": {"severity": 0, "category": "quantity", "boost": 8},
-            "many": {"severity": 0, "category": "quantity", "boost": 8},
-            "numerous": {"severity": 0, "category": "quantity", "boost": 8},
-        }
+    def __init__(self, rules: KeywordRules = keyword_rules):
+        self.rules = rules
 
-        return keywords
+    @property
+    def keyword_db(self) -> Dict[str, Dict[str, any]]:
+        return self.rules.get().urgency_keywords
 
-    def _build_stemming_rules(self) -> Dict[str, str]:
-        """
-        Build stemming rules to normalize words
-        """
-        return {
-            # -ous endings
-            "hazardous": "hazard",
-            "dangerous": "danger",
-            "poisonous": "poison",
-            "infectious": "infect",
-
-            # -ed endings
-            "damaged": "damage",
-            "cracked": "crack",
-            "blocked": "block",
-            "leaked": "leak",
-            "broken": "break",
-            "collapsed": "collapse",
-
-            # -ing endings
-            "leaking": "leak",
-            "flooding": "flood",
-            "burning": "burn",
-            "cracking": "crack",
-            "overflowing": "overflow",
-
-            # -s plurals
-            "cracks": "crack",
-            "potholes": "pothole",
-            "leaks": "leak",
-            "damages": "damage",
-
-            # Special cases
-            "burnt": "burn",
-            "flooded": "flood",
-        }
+    @property
+    def stemming_rules(self) -> Dict[str, str]:
+        return self.rules.get().stemming_rules
+
+    def split_words(self, text: str) -> List[str]:
+        """Lowercase, replace punctuation with spaces and split into words"""
+        return split_words(text)
 
     def tokenize(self, text: str) -> List[str]:
         """Tokenize text into words and phrases"""
-        text = text.lower().strip()
-        text = re.sub(r'[^\w\s]', ' ', text)
-        words = text.split()
+        words = self.split_words(text)
 
         tokens = []
         tokens.extend(words)
@@ -256,65 +51,43 @@ class UrgencyAnalyzer:
         return tokens
 
     def stem_word(self, word: str) -> str:
-        """Apply stemming rules to normalize words"""
-        if word in self.stemming_rules:
-            return self.stemming_rules[word]
+        """Apply stemming rules to normalize words (memoised per rules version)"""
+        return self.rules.get().stem(word)
 
-        if word.endswith('ous') and len(word) > 4:
-            return word[:-3]
-        if word.endswith('ed') and len(word) > 3:
-            return word[:-2]
-        if word.endswith('ing') and len(word) > 4:
-            return word[:-3]
-        if word.endswith('s') and len(word) > 2 and not word.endswith('ss'):
-            return word[:-1]
+    def match_keywords(self, description: str, rules: Optional[CompiledRules] = None) -> List[Dict]:
+        """
+        Keyword matches in the same order as checking every tokenize()
+        token: unigrams, then bigrams, then trigrams, left to right. A token
+        that is not a keyword but stems to one matches that keyword.
+        """
+        rules      = rules or self.rules.get()
+        keyword_db = rules.urgency_keywords
 
-        return word
+        # A token that is not a keyword is looked up in the pre-stemmed index
+        words   = self.split_words(description)
+        matches = rules.matcher.find_all(words, fallback=rules.stem_index.get, accept=keyword_db.__contains__)
+
+        matched_keywords = []
+        for _, _, token, keyword, exact in matches:
+            keyword_data = keyword_db[keyword]
+            matched_keywords.append({
+                "word": token if exact else f"{token} (→ {keyword})",
+                "severity": keyword_data["severity"],
+                "boost": keyword_data["boost"]
+            })
+        return matched_keywords
 
     def analyze_text(self, description: str, category: str) -> Dict:
         """Analyze text and calculate urgency score"""
-        tokens = self.tokenize(description)
+        rules            = self.rules.get()
+        matched_keywords = self.match_keywords(description, rules)
 
-        matched_keywords = []
-        total_boost = 0
-        max_severity = 0
-
-        for token in tokens:
-            if token in self.keyword_db:
-                keyword_data = self.keyword_db[token]
-                matched_keywords.append({
-                    "word": token,
-                    "severity": keyword_data["severity"],
-                    "boost": keyword_data["boost"]
-                })
-                total_boost += keyword_data["boost"]
-                max_severity = max(max_severity, keyword_data["severity"])
-                continue
-
-            stemmed = self.stem_word(token)
-            if stemmed != token and stemmed in self.keyword_db:
-                keyword_data = self.keyword_db[stemmed]
-                matched_keywords.append({
-                    "word": f"{token} (→ {stemmed})",
-                    "severity": keyword_data["severity"],
-                    "boost": keyword_data["boost"]
-                })
-                total_boost += keyword_data["boost"]
-                max_severity = max(max_severity, keyword_data["severity"])
-
-        base_score = 30
-
-        category_weights = {
-            "roads": 20,
-            "water supply": 25,
-            "water": 25,
-            "drainage": 25,
-            "electricity": 30,
-            "sanitation": 15,
-            "public safety": 35
-        }
+        total_boost = sum(k["boost"] for k in matched_keywords)
+        max_severity = max((k["severity"] for k in matched_keywords), default=0)
 
-        category_boost = category_weights.get(category.lower(), 10)
+        base_score = rules.base_score
+
+        category_boost = rules.category_weights.get(category.lower(), rules.default_category_weight)
 
         if max_severity >= 80:
             final_score = min(100, base_score + max_severity)
@@ -360,6 +133,75 @@ class UrgencyAnalyzer:
         return " | ".join(reasons)
 
 
+# Built once per process — the compiled rules are shared and swapped on reload
+urgency_analyzer = UrgencyAnalyzer()
+
+
+# Image download + analysis runs beside text analysis on a bounded pool;
+# past URGENCY_DEADLINE_SECONDS the text score is returned on its own.
+URGENCY_IMAGE_WORKERS = int(os.getenv("URGENCY_IMAGE_WORKERS", "4"))
+URGENCY_DEADLINE      = float(os.getenv("URGENCY_DEADLINE_SECONDS", "8"))
+
+_image_executor     = None
+_image_executor_pid = None
+
+
+def _get_image_executor():
+    # Rebuilt after a fork: the parent's worker threads don't exist in the child
+    global _image_executor, _image_executor_pid
+    if _image_executor is None or _image_executor_pid != os.getpid():
+        from concurrent.futures import ThreadPoolExecutor
+        _image_executor = ThreadPoolExecutor(
+            max_workers=URGENCY_IMAGE_WORKERS,
+            thread_name_prefix="urgency-image"
+        )
+        _image_executor_pid = os.getpid()
+    return _image_executor
+
+
+def _timed_stage(stage: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        metrics.observe("urgency_stage_ms", (time.perf_counter() - start) * 1000, labels={"stage": stage})
+
+
+def _image_boost(category: str, image_path: Optional[str],
+                 image_url: Optional[str], image_bytes: Optional[bytes]) -> int:
+    """Image branch of calculate_urgency(): fetch the image if needed and score it."""
+    try:
+        # --- Option 0: Image bytes already in memory ---
+        if image_bytes:
+            print(f"   🖼️ Using in-memory image ({len(image_bytes) // 1024} KB)")
+            return _timed_stage("image_analysis", analyze_image_urgency, image_bytes, category)
+
+        # --- Option A: Local file path provided ---
+        if image_path and os.path.exists(image_path):
+            print(f"   🖼️ Using local image: {image_path}")
+            return _timed_stage("image_analysis", analyze_image_urgency, image_path, category)
+
+        # --- Option B: Cloudinary URL provided ---
+        if image_url:
+            print(f"   🌐 Downloading image from Cloudinary URL...")
+            response = _timed_stage("image_download", lambda: requests.get(image_url, timeout=10))
+
+            if response.status_code == 200:
+                print(f"   ✅ Image downloaded ({len(response.content) // 1024} KB)")
+                # Analysed straight from memory — no temp file
+                return _timed_stage("image_analysis", analyze_image_urgency, response.content, category)
+
+            print(f"   ❌ Failed to download image (HTTP {response.status_code})")
+            return 0
+
+    except Exception as e:
+        print(f"   ⚠️ Image analysis failed: {e}")
+        return 0
+
+    print(f"   ℹ️ No image provided — text-only analysis")
+    return 0
+
+
 # ============================================================
 # MAIN FUNCTION — Cloudinary URL + Local Path dono support
 # ============================================================
@@ -368,16 +210,29 @@ def calculate_urgency(
         description: str,
         category: str,
         image_path: Optional[str] = None,   # Local file path (optional)
-        image_url: Optional[str] = None     # ✅ Cloudinary URL (optional)
+        image_url: Optional[str] = None,    # ✅ Cloudinary URL (optional)
+        image_bytes: Optional[bytes] = None, # Raw upload already in memory (optional)
+        deadline: float = URGENCY_DEADLINE,
+        on_image_late: Optional[Callable[[int], None]] = None
 ) -> int:
     """
     Enhanced urgency calculation with advanced NLP + image analysis.
-    Accepts either a local image_path OR a Cloudinary image_url.
+    Accepts a local image_path, a Cloudinary image_url, or the image_bytes
+    themselves. Images are never written to disk.
+
+    Text and image are analysed concurrently. If the image branch is not
+    done within `deadline` seconds, the text score is returned and
+    on_image_late(image_boost) is called once the image finishes.
     """
-    analyzer = UrgencyAnalyzer()
+    analyzer = urgency_analyzer
+    start    = time.perf_counter()
+
+    image_future = None
+    if image_bytes or image_path or image_url:
+        image_future = _get_image_executor().submit(_image_boost, category, image_path, image_url, image_bytes)
 
     # Step 1: Text NLP analysis
-    text_analysis = analyzer.analyze_text(description, category)
+    text_analysis = _timed_stage("text", analyzer.analyze_text, description, category)
     urgency_score = text_analysis["score"]
 
     print(f"\n📊 URGENCY ANALYSIS:")
@@ -390,52 +245,85 @@ def calculate_urgency(
     print(f"   Reasoning: {text_analysis['reasoning']}")
 
     # Step 2: Image analysis
-    try:
-        # --- Option A: Local file path provided ---
-        if image_path and os.path.exists(image_path):
-            print(f"   🖼️ Using local image: {image_path}")
-            image_boost = analyze_image_urgency(image_path, category)
+    if image_future is None:
+        print(f"   ℹ️ No image provided — text-only analysis")
+    else:
+        from concurrent.futures import TimeoutError as FutureTimeout
+
+        remaining = deadline - (time.perf_counter() - start)
+        try:
+            image_boost = image_future.result(timeout=max(0.0, remaining))
             print(f"   Image Boost: +{image_boost}")
             urgency_score = min(100, urgency_score + image_boost)
+        except FutureTimeout:
+            metrics.inc("urgency_image_deadline_missed_total")
+            print(f"   ⏱️ Image analysis missed the {deadline}s deadline — text score only")
+            if on_image_late is not None:
+                def _deliver(future):
+                    # _image_boost() never raises; a late boost of 0 is still delivered
+                    on_image_late(future.result())
+                image_future.add_done_callback(_deliver)
+
+    metrics.observe("urgency_stage_ms", (time.perf_counter() - start) * 1000, labels={"stage": "total"})
+    print(f"   FINAL SCORE: {urgency_score}/100\n")
 
-        # --- Option B: Cloudinary URL provided ---
-        elif image_url:
-            print(f"   🌐 Downloading image from Cloudinary URL...")
-            response = requests.get(image_url, timeout=10)
+    return urgency_score
 
-            if response.status_code == 200:
-                temp_path = "/tmp/urgency_temp_image.jpg"
 
-                with open(temp_path, "wb") as f:
-                    f.write(response.content)
+# An image can be given as a file path, the raw encoded bytes, or an
+# already decoded PIL image.
+ImageSource = Union[str, bytes, "Image.Image"]
 
-                print(f"   ✅ Image downloaded ({len(response.content) // 1024} KB)")
 
-                image_boost = analyze_image_urgency(temp_path, category)
-                print(f"   Image Boost: +{image_boost}")
-                urgency_score = min(100, urgency_score + image_boost)
+def _image_bytes(image: ImageSource) -> bytes:
+    """Encoded bytes of an image source (for APIs that take the file)."""
+    if isinstance(image, (bytes, bytearray)):
+        return bytes(image)
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            return f.read()
+    buf = BytesIO()
+    image.convert('RGB').save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
 
-                # Cleanup temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            else:
-                print(f"   ❌ Failed to download image (HTTP {response.status_code})")
 
-        else:
-            print(f"   ℹ️ No image provided — text-only analysis")
+# ── HuggingFace CLIP client ───────────────────────────────────────
+# One keep-alive session per process; the breaker skips straight to the
+# local analyzer while the router is failing or slower than the budget.
+HF_CONNECT_TIMEOUT  = float(os.getenv("HF_CONNECT_TIMEOUT", "2"))
+HF_LATENCY_BUDGET   = float(os.getenv("HF_LATENCY_BUDGET", "5"))
+HF_BREAKER_FAILURES = int(os.getenv("HF_BREAKER_FAILURES", "3"))
+HF_BREAKER_RESET    = float(os.getenv("HF_BREAKER_RESET_SECONDS", "30"))
+HF_POOL_SIZE        = int(os.getenv("HF_POOL_SIZE", "10"))
 
-    except Exception as e:
-        print(f"   ⚠️ Image analysis failed: {e}")
+hf_breaker = CircuitBreaker("hf_clip", failure_threshold=HF_BREAKER_FAILURES, reset_timeout=HF_BREAKER_RESET)
 
-    print(f"   FINAL SCORE: {urgency_score}/100\n")
+_hf_session = requests.Session()
+_hf_session.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=1, pool_maxsize=HF_POOL_SIZE, max_retries=0
+))
 
-    return urgency_score
+
+def _hf_fallback_ratio() -> float:
+    calls = metrics.get("hf_clip_calls_total")
+    return metrics.get("hf_clip_fallbacks_total") / calls if calls else 0.0
+
+
+metrics.register_gauge("hf_clip_fallback_ratio", _hf_fallback_ratio)
+
+
+def _hf_fallback(image: ImageSource, category: str, reason: str) -> int:
+    metrics.inc("hf_clip_fallbacks_total")
+    metrics.inc("hf_clip_fallbacks_by_reason_total", labels={"reason": reason})
+    print(f"   🔄 HuggingFace unavailable ({reason}) — using local image analysis...")
+    return analyze_image_urgency_local(image, category)
 
 
-def analyze_image_urgency(image_path: str, category: str) -> int:
+def analyze_image_urgency(image: ImageSource, category: str) -> int:
     """
     Analyze image using Hugging Face's free inference API.
     Falls back to local pixel analysis if API unavailable.
+    `image` may be a file path, raw bytes or a decoded PIL image.
     Returns urgency boost (0-30 points).
     """
 
@@ -445,7 +333,11 @@ def analyze_image_urgency(image_path: str, category: str) -> int:
 
     if not API_TOKEN:
         print("   ⚠️ No HUGGINGFACE_TOKEN — skipping HuggingFace, using local fallback")
-        return analyze_image_urgency_local(image_path, category)
+        return analyze_image_urgency_local(image, category)
+
+    metrics.inc("hf_clip_calls_total")
+    if not hf_breaker.allow():
+        return _hf_fallback(image, category, "circuit_open")
 
     headers = {
         "Authorization": f"Bearer {API_TOKEN}",
@@ -453,8 +345,10 @@ def analyze_image_urgency(image_path: str, category: str) -> int:
     }
 
     try:
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode()
+        # Read a path once; the local fallback then decodes these same bytes
+        if isinstance(image, str):
+            image = _image_bytes(image)
+        image_data = base64.b64encode(_image_bytes(image)).decode()
 
         severity_labels = {
             "roads": [
@@ -500,7 +394,18 @@ def analyze_image_urgency(image_path: str, category: str) -> int:
 
         print(f"   🚀 Sending image to HuggingFace API...")
 
-        response = requests.post(API_URL, headers=headers, json=payload, timeout=30)  # timeout 30s
+        start    = time.perf_counter()
+        response = _hf_session.post(API_URL, headers=headers, json=payload,
+                                    timeout=(HF_CONNECT_TIMEOUT, HF_LATENCY_BUDGET))
+        elapsed  = time.perf_counter() - start
+        metrics.observe("hf_clip_latency_ms", elapsed * 1000)
+
+        if response.status_code != 200 or elapsed > HF_LATENCY_BUDGET:
+            # The read timeout is per socket read, so a trickling response can
+            # still overrun the budget — count that against the breaker too
+            hf_breaker.record_failure()
+        else:
+            hf_breaker.record_success()
 
         if response.status_code == 200:
             result = response.json()
@@ -539,81 +444,131 @@ def analyze_image_urgency(image_path: str, category: str) -> int:
                 elif moderate_confidence > 0.4:
                     return 10
 
-        else:
-            print(f"   ❌ API status {response.status_code}: {response.text[:200]}")
+            return _hf_fallback(image, category, "bad_response")
+
+        print(f"   ❌ API status {response.status_code}: {response.text[:200]}")
+        return _hf_fallback(image, category, f"http_{response.status_code}")
+
+    except requests.Timeout:
+        hf_breaker.record_failure()
+        print(f"   ⏱️ HuggingFace API exceeded {HF_LATENCY_BUDGET}s budget")
+        return _hf_fallback(image, category, "timeout")
 
     except Exception as e:
+        hf_breaker.record_failure()
         print(f"   ⚠️ HuggingFace API error: {e}")
+        return _hf_fallback(image, category, "error")
 
-    # Fallback to local analysis
-    print("   🔄 API unavailable — using local image analysis...")
-    return analyze_image_urgency_local(image_path, category)
 
+# Local analysis works on an image no larger than this; JPEGs are decoded
+# straight to roughly this size with draft mode (DCT scaling) instead of
+# being fully decoded and then shrunk.
+LOCAL_ANALYSIS_SIZE    = (400, 400)
+LOCAL_ANALYSIS_WORKERS = int(os.getenv("LOCAL_IMAGE_ANALYSIS_WORKERS", "4"))
 
-def analyze_image_urgency_local(image_path: str, category: str) -> int:
-    """
-    Local pixel-based image analysis fallback.
-    No external API needed — uses PIL + numpy.
-    """
-    try:
-        from PIL import Image
-        import numpy as np
 
-        if not os.path.exists(image_path):
-            return 0
+def _decode_for_analysis(image: ImageSource):
+    """RGB PIL image of at most LOCAL_ANALYSIS_SIZE, decoded at reduced size where possible."""
+    from PIL import Image
 
-        img = Image.open(image_path).convert('RGB')
-        img.thumbnail((400, 400))
-        img_array = np.array(img)
+    if isinstance(image, Image.Image):
+        img = image.copy()   # thumbnail() resizes in place; leave the caller's image alone
+    else:
+        img = Image.open(BytesIO(image) if isinstance(image, (bytes, bytearray)) else image)
+        if img.format == "JPEG":
+            img.draft("RGB", LOCAL_ANALYSIS_SIZE)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.thumbnail(LOCAL_ANALYSIS_SIZE)
+    return img
 
-        print(f"   🖼️ Local analysis ({img.size[0]}x{img.size[1]} px)...")
 
-        avg_brightness = np.mean(img_array)
-        darkness_score = (255 - avg_brightness) / 255
+def _image_stats(img) -> Dict[str, float]:
+    """
+    Darkness, contrast, colour spread and dark-pixel share of an RGB image,
+    from one float32 (pixels, 3) array and its grayscale projection.
+    """
+    import numpy as np
 
-        gray = np.mean(img_array, axis=2)
-        contrast = np.std(gray) / 128
+    pixels = np.asarray(img, dtype=np.float32).reshape(-1, 3)
+    gray   = pixels.mean(axis=1)
 
-        color_std = np.std(img_array, axis=(0, 1)).mean() / 128
-        dark_pixels = np.sum(np.mean(img_array, axis=2) < 80) / (img_array.shape[0] * img_array.shape[1])
+    # Two-pass std with float64 accumulation, like np.std over the uint8
+    # image; E[x²]-E[x]² in float32 loses most digits on flat images
+    channel_std = pixels.std(axis=0, dtype=np.float64)
 
-        print(f"   📊 Darkness: {darkness_score:.2f}, Contrast: {contrast:.2f}, Dark pixels: {dark_pixels:.1%}")
+    return {
+        # Mean over all channels == mean of the per-pixel gray values
+        "darkness"   : float((255 - gray.mean()) / 255),
+        "contrast"   : float(gray.std() / 128),
+        "color_std"  : float(channel_std.mean() / 128),
+        "dark_pixels": float(np.count_nonzero(gray < 80) / gray.size),
+    }
 
-        boost = 0
 
-        if category.lower() in ["roads", "road"]:
-            if contrast > 0.8 and dark_pixels > 0.15:
-                boost = 30
-            elif contrast > 0.6 or dark_pixels > 0.10:
-                boost = 20
-            elif contrast > 0.4:
-                boost = 10
+def _local_boost(stats: Dict[str, float], category: str) -> int:
+    """Map local image statistics to an urgency boost (0-30) for a category."""
+    darkness_score = stats["darkness"]
+    contrast       = stats["contrast"]
+    color_std      = stats["color_std"]
+    dark_pixels    = stats["dark_pixels"]
+
+    category = category.lower()
+
+    if category in ["roads", "road"]:
+        if contrast > 0.8 and dark_pixels > 0.15:
+            return 30
+        elif contrast > 0.6 or dark_pixels > 0.10:
+            return 20
+        elif contrast > 0.4:
+            return 10
+
+    elif category in ["drainage", "water supply", "water"]:
+        if darkness_score > 0.6 or dark_pixels > 0.25:
+            return 30
+        elif darkness_score > 0.4 or dark_pixels > 0.15:
+            return 20
+        elif dark_pixels > 0.08:
+            return 10
+
+    elif category in ["sanitation", "garbage"]:
+        if color_std > 0.7 and darkness_score > 0.3:
+            return 30
+        elif color_std > 0.5:
+            return 20
+        elif color_std > 0.3:
+            return 10
+
+    else:
+        severity = (darkness_score + contrast + color_std) / 3
+        if severity > 0.6:
+            return 30
+        elif severity > 0.45:
+            return 20
+        elif severity > 0.3:
+            return 10
+
+    return 0
+
+
+def analyze_image_urgency_local(image: ImageSource, category: str) -> int:
+    """
+    Local pixel-based image analysis fallback.
+    No external API needed — uses PIL + numpy.
+    `image` may be a file path, raw bytes or a decoded PIL image.
+    """
+    try:
+        if isinstance(image, str) and not os.path.exists(image):
+            return 0
 
-        elif category.lower() in ["drainage", "water supply", "water"]:
-            if darkness_score > 0.6 or dark_pixels > 0.25:
-                boost = 30
-            elif darkness_score > 0.4 or dark_pixels > 0.15:
-                boost = 20
-            elif dark_pixels > 0.08:
-                boost = 10
+        img   = _decode_for_analysis(image)
+        stats = _image_stats(img)
 
-        elif category.lower() in ["sanitation", "garbage"]:
-            if color_std > 0.7 and darkness_score > 0.3:
-                boost = 30
-            elif color_std > 0.5:
-                boost = 20
-            elif color_std > 0.3:
-                boost = 10
+        print(f"   🖼️ Local analysis ({img.size[0]}x{img.size[1]} px)...")
+        print(f"   📊 Darkness: {stats['darkness']:.2f}, Contrast: {stats['contrast']:.2f}, "
+              f"Dark pixels: {stats['dark_pixels']:.1%}")
 
-        else:
-            severity = (darkness_score + contrast + color_std) / 3
-            if severity > 0.6:
-                boost = 30
-            elif severity > 0.45:
-                boost = 20
-            elif severity > 0.3:
-                boost = 10
-            print(f"   📈 Generic severity: {severity:.2f} → +{boost}")
+        boost = _local_boost(stats, category)
 
         print(f"   ✅ Local boost: +{boost}")
         return boost
@@ -623,4 +578,34 @@ def analyze_image_urgency_local(image_path: str, category: str) -> int:
         return 0
     except Exception as e:
         print(f"   ❌ Local analysis error: {e}")
-        return 0
\ No newline at end of file
+        return 0
+
+
+def analyze_images_urgency_local(images: List[ImageSource],
+                                 categories: Union[str, List[str]],
+                                 max_workers: int = LOCAL_ANALYSIS_WORKERS) -> List[int]:
+    """
+    Batch form of analyze_image_urgency_local() for re-scoring many images
+    (e.g. historical complaints). `categories` is one category for all
+    images or one per image. Decoding runs on a thread pool since PIL
+    releases the GIL while decompressing. Unreadable images score 0.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if isinstance(categories, str):
+        categories = [categories] * len(images)
+    if len(categories) != len(images):
+        raise ValueError("categories must be a string or match the number of images")
+
+    def _one(image: ImageSource, category: str) -> int:
+        try:
+            if isinstance(image, str) and not os.path.exists(image):
+                return 0
+            return _local_boost(_image_stats(_decode_for_analysis(image)), category)
+        except Exception:
+            return 0
+
+    if max_workers <= 1 or len(images) <= 1:
+        return [_one(img, cat) for img, cat in zip(images, categories)]
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="local-image") as pool:
+        return list(pool.map(_one, images, categories))